@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LMS.settings')
 
 application = get_asgi_application()
+
+# Load the in-memory autocomplete index before the first request arrives.
+from api.autocomplete import book_autocomplete  # noqa: E402
+book_autocomplete.warm()
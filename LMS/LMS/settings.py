@@ -89,6 +89,41 @@ else:
         'default': config('DATABASE_DEVELOPMENT', cast=db_url)
     }
 
+# Caches. `fragments` holds rendered Book representations and evicts
+# least recently used entries past MAX_ENTRIES or after TIMEOUT seconds.
+# `idempotency` holds the responses replayed for retried borrows/returns.
+# `throttle` holds the request rate buckets; point it at a shared cache
+# so that limits hold across workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': config('FRAGMENT_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('FRAGMENT_CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    },
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'idempotency',
+        'TIMEOUT': config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('IDEMPOTENCY_MAX_KEYS', default=10000, cast=int),
+        },
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'TIMEOUT': 86400,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('THROTTLE_MAX_BUCKETS', default=100000, cast=int),
+        },
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -142,9 +177,59 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'EXCEPTION_HANDLER': 'utils.exceptionhandler.customexceptionhandler',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.IPTokenBucketThrottle',
+        'api.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': config('THROTTLE_RATE_USER', default='600/min'),
+        'ip': config('THROTTLE_RATE_IP', default='300/min'),
+        'checkout': config('THROTTLE_RATE_CHECKOUT', default='30/min'),
+        'auth': config('THROTTLE_RATE_AUTH', default='20/min'),
+        'search': config('THROTTLE_RATE_SEARCH', default='120/min'),
+        'stream': config('THROTTLE_RATE_STREAM', default='10/min'),
+    },
+
+}
 
+# Throttle scope of endpoints by URL name, or of their methods (see api.throttling)
+THROTTLE_ENDPOINT_SCOPES = {
+    'borrow_book': 'checkout',
+    'return_book': 'checkout',
+    'checkout-list': {'POST': 'checkout'},
+    'checkout-batch': 'checkout',
+    'checkout-return': 'checkout',
+    'basic_token': 'auth',
+    'jwt_obtain_pair': 'auth',
+    'book-list': {'search': 'search'},
+    'book-autocomplete': 'search',
+    'book-isbn': 'search',
+    'availability_stream': 'stream',
 }
 
+# Seconds between the checks of each worker's autocomplete index against
+# the books changed by other workers
+AUTOCOMPLETE_REFRESH_SECONDS = config('AUTOCOMPLETE_REFRESH_SECONDS', default=30, cast=int)
+
+# Catalog search backend, picked per database vendor when unset
+CATALOG_SEARCH_BACKEND = config('CATALOG_SEARCH_BACKEND', default=None)
+
+# How availability changes reach streaming clients in every worker
+# (api.notifications.PostgresBroadcast on PostgreSQL with several workers)
+AVAILABILITY_BROADCAST = config('AVAILABILITY_BROADCAST', default='api.notifications.LocalBroadcast')
+AVAILABILITY_KEEPALIVE = config('AVAILABILITY_KEEPALIVE', default=15, cast=int)
+# Availability streams a user may hold open at once in each worker
+AVAILABILITY_STREAMS_PER_USER = config('AVAILABILITY_STREAMS_PER_USER', default=3, cast=int)
+
+# Months of checkout history kept by the rotate_history command
+ARCHIVE_RETENTION_MONTHS = config('ARCHIVE_RETENTION_MONTHS', default=36, cast=int)
+
+# Where freeze_history keeps checkout history moved out of the database,
+# and how many months of history it leaves in the database
+HISTORY_COLD_STORAGE_DIR = config('HISTORY_COLD_STORAGE_DIR', default=str(BASE_DIR / 'cold_history'))
+HISTORY_HOT_MONTHS = config('HISTORY_HOT_MONTHS', default=12, cast=int)
+
 # JWT settings
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Token',),
@@ -0,0 +1,11 @@
+"""
+Settings for running the test suite: ``manage.py test`` uses them unless
+``--settings`` or ``DJANGO_SETTINGS_MODULE`` names others.
+"""
+from LMS.settings import *  # noqa: F401,F403
+from LMS.settings import BASE_DIR, DATABASES
+
+# Tests on SQLite use a file rather than the default in-memory database,
+# so the tests racing several connections share one database.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
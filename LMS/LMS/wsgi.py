@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LMS.settings')
 
 application = get_wsgi_application()
+
+# Load the in-memory autocomplete index before the first request arrives.
+from api.autocomplete import book_autocomplete  # noqa: E402
+book_autocomplete.warm()
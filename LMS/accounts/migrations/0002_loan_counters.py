@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='libraryprofile',
+            name='active_loans',
+            field=models.PositiveIntegerField(default=0, help_text='Books the user has borrowed and not returned.'),
+        ),
+        migrations.AddField(
+            model_name='libraryprofile',
+            name='lifetime_loans',
+            field=models.PositiveIntegerField(default=0, help_text='Books the user has ever borrowed.'),
+        ),
+        migrations.AddField(
+            model_name='libraryprofile',
+            name='overdue_loans',
+            field=models.PositiveIntegerField(default=0, help_text='Borrowed books past their due date.'),
+        ),
+    ]
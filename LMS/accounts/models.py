@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
 
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
@@ -136,6 +138,38 @@ class CustomUser(AbstractUser):
     class Meta:
         ordering = ['email']
 
+class LibraryProfileQuerySet(models.QuerySet):
+
+    COUNTERS = ('active_loans', 'overdue_loans', 'lifetime_loans')
+
+    def add_loans(self, counts: dict) -> int:
+        """
+        Adds ``counts`` (``{user_id: {counter: n}}``, ``n`` negative to
+        subtract) to the loan counters of those users in one UPDATE, so
+        the change commits or rolls back with the loans themselves.
+        Counters never go below zero; ``reconcile_loan_counters`` repairs
+        any drift.
+        """
+        counts = {user_id: changes for user_id, changes in counts.items() if any(changes.values())}
+        if not counts:
+            return 0
+        updates = {}
+        for counter in self.COUNTERS:
+            whens = [
+                When(user_id=user_id, then=Greatest(
+                    F(counter) + int(changes[counter]), Value(0), output_field=models.PositiveIntegerField()
+                ))
+                for user_id, changes in counts.items() if changes.get(counter)
+            ]
+            if whens:
+                updates[counter] = Case(*whens, default=F(counter))
+        return self.filter(user_id__in=counts).update(**updates)
+
+    def add_user_loans(self, user_id: int, **changes) -> int:
+        """``add_loans`` for a single user, e.g. ``add_user_loans(1, active_loans=1)``."""
+        return self.add_loans({user_id: changes})
+
+
 class LibraryProfile(models.Model):
     """
     Model for storing additional information about library users.
@@ -159,6 +193,20 @@ class LibraryProfile(models.Model):
     member_since = models.DateField(
         auto_now_add=True
     )
+    active_loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Books the user has borrowed and not returned.'
+    )
+    overdue_loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Borrowed books past their due date.'
+    )
+    lifetime_loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Books the user has ever borrowed.'
+    )
+
+    objects = LibraryProfileQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.user.email} - {self.role}, joined on {self.member_since}"
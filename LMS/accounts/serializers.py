@@ -138,3 +138,21 @@ class PasswordSerializer(serializers.ModelSerializer):
         except ValidationError as e:
             raise serializers.ValidationError({'new_password': list(e.messages)})
         return value
+
+class LoanSummarySerializer(serializers.ModelSerializer):
+    """
+    A serializer for a user's circulation summary, read from the loan
+    counters kept on their library profile.
+    """
+    role = serializers.CharField(source='profile.role', read_only=True)
+    member_since = serializers.DateField(source='profile.member_since', read_only=True)
+    active_loans = serializers.IntegerField(source='profile.active_loans', read_only=True)
+    overdue_loans = serializers.IntegerField(source='profile.overdue_loans', read_only=True)
+    lifetime_loans = serializers.IntegerField(source='profile.lifetime_loans', read_only=True)
+
+    class Meta:
+        model = get_user_model()
+        fields = [
+            'id', 'email', 'role', 'member_since',
+            'active_loans', 'overdue_loans', 'lifetime_loans'
+        ]
@@ -5,7 +5,7 @@ from rest_framework import status
 
 from django.contrib.auth import get_user_model
 
-from accounts.serializers import RegisterSerializer, UserProfileSerializer, PasswordSerializer
+from accounts.serializers import RegisterSerializer, UserProfileSerializer, PasswordSerializer, LoanSummarySerializer
 from utils.custom_permissions import IsOwnerOrReadOnly, IsOwnerOrAdmin, HasAccountOrNone
 
 User = get_user_model()
@@ -17,7 +17,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     serializer_class = RegisterSerializer
     permission_classes = [IsOwnerOrReadOnly]
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
 
     def get_permissions(self):
         """
@@ -72,3 +72,21 @@ class UserViewSet(viewsets.ModelViewSet):
         elif request.method == 'GET':
             serializer = UserProfileSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        serializer_class=LoanSummarySerializer,
+        permission_classes=[IsOwnerOrAdmin],
+    )
+    def summary(self, request, pk=None, format=None):
+        """
+        Custom action returning the user's active, overdue and lifetime
+        loan counts. They are kept on the profile as loans are made and
+        returned, so this is a single read of the user and their profile.
+        """
+        user = self.get_object()
+        if not hasattr(user, 'profile'):
+            return Response({"detail": "This user has no library profile."}, status=status.HTTP_404_NOT_FOUND)
+        serializer = self.get_serializer(user)
+        return Response(serializer.data, status=status.HTTP_200_OK)
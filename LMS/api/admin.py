@@ -1,5 +1,5 @@
 from django.contrib import admin
-from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut, CopyMovement
 
 
 class BookInfoInLine(admin.StackedInline):
@@ -70,3 +70,25 @@ class ArchivedCheckOutAdmin(admin.ModelAdmin):
         Allow deleting archived checkout records.
         """
         return True
+
+
+@admin.register(CopyMovement)
+class CopyMovementAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the copy ledger, the audit trail of every change to
+    the copies of a book.
+    """
+    list_display = ('book', 'kind', 'delta', 'user', 'created_at', 'folded')
+    list_filter = ('kind', 'folded', 'created_at')
+    search_fields = ('book__title', 'user__email')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
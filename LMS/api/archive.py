@@ -0,0 +1,150 @@
+import re
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+
+from api.models import ArchivedCheckOut
+
+
+def next_month(day: date) -> date:
+    """First day of the month after ``day``."""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def months_before(day: date, months: int) -> date:
+    """First day of the month ``months`` months before the month of ``day``."""
+    start = day.replace(day=1)
+    for _ in range(months):
+        start = (start - timedelta(days=1)).replace(day=1)
+    return start
+
+
+class ArchiveStorage:
+    """
+    How the archived checkouts table is laid out. Rows are always read and
+    written through ``ArchivedCheckOut``; the storage only decides how the
+    table is split by return month and how expired months are removed.
+
+    This plain layout keeps one table, so queries on a month use the
+    return date index and expiring deletes rows in chunks.
+    """
+    table = ArchivedCheckOut._meta.db_table
+
+    def prepare(self, until: date) -> list:
+        """
+        Makes room for checkouts returned before ``until``. Returns the
+        names of the partitions created.
+        """
+        return []
+
+    def expire(self, before: date, chunk_size: int = 1000, detach: bool = False) -> tuple:
+        """
+        Removes the checkouts returned before ``before``. Returns the
+        names of the partitions removed and the number of rows deleted
+        one by one.
+        """
+        return [], sum(ArchivedCheckOut.objects.expire(before, chunk_size))
+
+
+class PostgresArchiveStorage(ArchiveStorage):
+    """
+    One range partition per return month (created by migration 0005),
+    plus a default partition for returns no monthly partition covers yet.
+    Queries bounded on ``return_date`` only read the partitions they
+    overlap, and the history list, ordered by return date, reads the
+    newest partition first and stops once the page is full.
+
+    ``prepare`` adds the partitions for the coming months ahead of time,
+    moving any of their rows that already landed in the default partition.
+    An expired month is detached and dropped whole, which takes the same
+    time however many rows it holds; with ``detach`` the table is kept,
+    outside the archive, for copying elsewhere.
+    """
+    partition_re = re.compile(r'_p(\d{4})(\d{2})$')
+
+    @property
+    def default(self) -> str:
+        return f'{self.table}_default'
+
+    def partition_name(self, month: date) -> str:
+        return f'{self.table}_p{month:%Y%m}'
+
+    def is_partitioned(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass', [self.table])
+            return cursor.fetchone()[0] == 'p'
+
+    def partitions(self) -> dict:
+        """The monthly partitions attached to the archive, by month."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = %s::regclass',
+                [self.table]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        partitions = {}
+        for name in names:
+            match = self.partition_re.search(name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+    def prepare(self, until: date) -> list:
+        if not self.is_partitioned():
+            return super().prepare(until)
+        existing = self.partitions()
+        created = []
+        month = date.today().replace(day=1)
+        while month < until:
+            if month not in existing:
+                created.append(self.add_partition(month))
+            month = next_month(month)
+        return created
+
+    def add_partition(self, month: date) -> str:
+        name = self.partition_name(month)
+        start, end = f'{month:%Y-%m-%d}', f'{next_month(month):%Y-%m-%d}'
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Writers wait until the month's rows are out of the default
+            # partition, or the ATTACH would find them there and fail.
+            cursor.execute(f'LOCK TABLE {self.default} IN EXCLUSIVE MODE')
+            cursor.execute(f'CREATE TABLE {name} (LIKE {self.table} INCLUDING DEFAULTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {self.default} '
+                f"WHERE return_date >= '{start}' AND return_date < '{end}' RETURNING *) "
+                f'INSERT INTO {name} SELECT * FROM moved'
+            )
+            cursor.execute(
+                f'ALTER TABLE {self.table} ATTACH PARTITION {name} '
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+        return name
+
+    def expire(self, before: date, chunk_size: int = 1000, detach: bool = False) -> tuple:
+        if not self.is_partitioned():
+            return super().expire(before, chunk_size, detach)
+        removed = []
+        for month, name in sorted(self.partitions().items()):
+            if next_month(month) > before:
+                break
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {self.table} DETACH PARTITION {name}')
+                if not detach:
+                    cursor.execute(f'DROP TABLE {name}')
+            removed.append(name)
+        # What is left is in the default partition or in a month that is
+        # only partly expired.
+        _, deleted = super().expire(before, chunk_size, detach)
+        return removed, deleted
+
+
+VENDOR_STORAGES = {
+    'postgresql': PostgresArchiveStorage,
+}
+
+
+def get_archive_storage() -> ArchiveStorage:
+    """Returns the archive storage for the database vendor."""
+    return VENDOR_STORAGES.get(connection.vendor, ArchiveStorage)()
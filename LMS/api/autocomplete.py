@@ -0,0 +1,200 @@
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Count, Max
+
+from api.models import Book
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """
+    Folds case and accents and collapses punctuation and spacing, so
+    'Things Fall  Apart!' and 'things fall apart' normalize alike.
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def index_keys(title: str, author: str) -> set:
+    """
+    The keys a book is reachable under: its title and author from every
+    word onwards, so 'fall' and 'achebe' both complete to
+    'Things Fall Apart' by 'Chinua Achebe'.
+    """
+    keys = set()
+    for text in (title, author):
+        words = normalize(text).split(' ')
+        for i in range(len(words)):
+            if words[i]:
+                keys.add(' '.join(words[i:]))
+    return keys
+
+
+class PrefixIndex:
+    """
+    Sorted, array-backed prefix index of book titles and authors.
+
+    Keys live in one sorted list with the matching book ids in a parallel
+    ``array``, so a lookup is a binary search followed by a short forward
+    scan and never touches the database. The index is loaded lazily (or by
+    ``warm`` at worker startup) and afterwards kept current through
+    ``add``/``remove``, which the Book signals call once the surrounding
+    transaction commits.
+
+    Each worker process holds its own copy, which those signals only keep
+    current with the changes made in that process. At most every
+    ``AUTOCOMPLETE_REFRESH_SECONDS`` a lookup therefore compares the
+    number of books, the highest id and the latest update with the ones
+    the index was loaded at: the books updated since are read again, and
+    the index is rebuilt if the number of books still differs, as it
+    does once a book is deleted by another process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.keys = []
+        self.ids = array('q')
+        self.books = {}
+        self.version = None
+        self.checked_at = 0.0
+
+    def build(self, queryset=None) -> int:
+        """Loads every book in ``queryset`` from scratch. Returns the count."""
+        queryset = Book.objects.all() if queryset is None else queryset
+        books = {}
+        updated = None
+        for pk, title, author, updated_at in (
+            queryset.order_by().values_list('pk', 'title', 'author', 'updated_at').iterator()
+        ):
+            books[pk] = (title, author)
+            if updated is None or updated_at > updated:
+                updated = updated_at
+        pairs = sorted(
+            (key, pk)
+            for pk, (title, author) in books.items()
+            for key in index_keys(title, author)
+        )
+        with self.lock:
+            self.keys = [key for key, _ in pairs]
+            self.ids = array('q', (pk for _, pk in pairs))
+            self.books = books
+            self.version = (len(books), max(books, default=None), updated)
+            self.checked_at = time.monotonic()
+            self.loaded = True
+        return len(books)
+
+    @staticmethod
+    def current_version() -> tuple:
+        """The number of books, the highest id and the latest update, in one aggregate query."""
+        version = Book.objects.aggregate(count=Count('pk'), last=Max('pk'), updated=Max('updated_at'))
+        return version['count'], version['last'], version['updated']
+
+    def refresh(self) -> None:
+        """Catches up with the books changed by other processes since the index was loaded."""
+        version = self.current_version()
+        if version == self.version:
+            return
+        since = self.version[2]
+        # Books stamped in the same instant as the last one seen are read again.
+        changed = Book.objects.all() if since is None else Book.objects.filter(updated_at__gte=since)
+        rows = list(changed.order_by().values_list('pk', 'title', 'author'))
+        with self.lock:
+            for pk, title, author in rows:
+                self._add(pk, title, author)
+            self.version = version
+            complete = len(self.books) == version[0]
+        if not complete:
+            self.build()
+
+    def warm(self) -> None:
+        """Builds the index, ignoring a database that is not migrated yet."""
+        try:
+            self.build()
+        except DatabaseError:
+            pass
+
+    def clear(self) -> None:
+        """Empties the index; the next lookup reloads it."""
+        with self.lock:
+            self.keys = []
+            self.ids = array('q')
+            self.books = {}
+            self.version = None
+            self.loaded = False
+
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.build()
+        elif time.monotonic() - self.checked_at >= getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 30):
+            self.checked_at = time.monotonic()
+            self.refresh()
+
+    def _remove(self, pk: int) -> None:
+        title, author = self.books.pop(pk)
+        for key in index_keys(title, author):
+            i = bisect_left(self.keys, key)
+            while i < len(self.keys) and self.keys[i] == key:
+                if self.ids[i] == pk:
+                    del self.keys[i]
+                    del self.ids[i]
+                    break
+                i += 1
+
+    def _add(self, pk: int, title: str, author: str) -> None:
+        if pk in self.books:
+            self._remove(pk)
+        self.books[pk] = (title, author)
+        for key in index_keys(title, author):
+            i = bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.ids.insert(i, pk)
+
+    def add(self, books) -> None:
+        """
+        Adds or refreshes ``(pk, title, author)`` entries. Does nothing until
+        the index is loaded, since loading reads the current rows anyway.
+        """
+        with self.lock:
+            if not self.loaded:
+                return
+            for pk, title, author in books:
+                self._add(pk, title, author)
+
+    def remove(self, pk: int) -> None:
+        with self.lock:
+            if pk in self.books:
+                self._remove(pk)
+
+    def lookup(self, query: str, limit: int = 10) -> list:
+        """
+        Returns up to ``limit`` ``(pk, title, author)`` tuples whose title or
+        author has a word sequence starting with ``query``, in key order.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.ensure_loaded()
+        results = []
+        seen = set()
+        with self.lock:
+            i = bisect_left(self.keys, prefix)
+            while i < len(self.keys) and len(results) < limit and self.keys[i].startswith(prefix):
+                pk = self.ids[i]
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append((pk, *self.books[pk]))
+                i += 1
+        return results
+
+
+book_autocomplete = PrefixIndex()
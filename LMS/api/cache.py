@@ -0,0 +1,84 @@
+from django.core.cache import caches
+
+
+class FragmentCache:
+    """
+    Caches the serialized representation of individual model instances.
+
+    Representations contain absolute hyperlinks, so each cache entry holds a
+    dict of ``{base_url: representation}`` stored under one key per
+    instance. Invalidating an instance is then a single delete whatever
+    hosts it was rendered for.
+
+    Each entry also holds the version of the instance it was rendered
+    from, for callers that pass ``version``, and is ignored once the
+    instance's version has moved on. An entry can then never be served
+    stale, even from a per-process cache such as LocMemCache that never
+    hears of the invalidations made by other workers.
+
+    Eviction (LRU via ``MAX_ENTRIES`` and TTL via ``TIMEOUT``) is left to the
+    configured cache.
+    """
+
+    def __init__(self, prefix: str, alias: str = 'fragments'):
+        self.prefix = prefix
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, pk) -> str:
+        return f'{self.prefix}:{pk}'
+
+    @staticmethod
+    def base_url(request) -> str:
+        return request.build_absolute_uri('/') if request is not None else ''
+
+    def render_many(self, instances, serialize, request, version=None) -> list:
+        """
+        Returns the representations of ``instances`` in order. Cached
+        fragments are fetched with one bulk get; the misses, and the entries
+        rendered from another ``version(instance)`` than the current one,
+        are rendered together with ``serialize(list_of_instances)`` and
+        stored.
+        """
+        instances = list(instances)
+        base = self.base_url(request)
+        entries = self.cache.get_many([self.key(instance.pk) for instance in instances])
+        versions = {instance.pk: version(instance) if version else None for instance in instances}
+        for instance in instances:
+            entry = entries.get(self.key(instance.pk))
+            if entry is not None and entry['version'] != versions[instance.pk]:
+                del entries[self.key(instance.pk)]
+
+        fragments = {}
+        misses = []
+        for instance in instances:
+            fragment = entries.get(self.key(instance.pk), {'fragments': {}})['fragments'].get(base)
+            if fragment is None:
+                misses.append(instance)
+            else:
+                fragments[instance.pk] = fragment
+
+        if misses:
+            updates = {}
+            for instance, fragment in zip(misses, serialize(misses)):
+                fragments[instance.pk] = fragment
+                entry = entries.get(self.key(instance.pk), {'fragments': {}})
+                updates[self.key(instance.pk)] = {
+                    'version': versions[instance.pk],
+                    'fragments': {**entry['fragments'], base: fragment},
+                }
+            self.cache.set_many(updates)
+
+        return [fragments[instance.pk] for instance in instances]
+
+    def invalidate(self, *pks) -> None:
+        self.cache.delete_many([self.key(pk) for pk in pks])
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+book_fragments = FragmentCache('book')
@@ -0,0 +1,443 @@
+import heapq
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import Counter, namedtuple
+from datetime import date
+from itertools import islice
+from operator import attrgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from api.archive import next_month
+from api.models import ArchivedCheckOut, Book
+
+ColdCheckOut = namedtuple('ColdCheckOut', 'id user_id book_id checkout_date return_date')
+
+MAGIC = b'LMSCOLD2'
+# id, user, book, checkout and return dates (as ordinals)
+RECORD = struct.Struct('<qqqii')
+# first and last user, newest and oldest return, offset, length, rows
+BLOCK = struct.Struct('<qqiiQII')
+# user, month of the returns, rows
+COUNT = struct.Struct('<qiI')
+# index offset, number of blocks, counts offset, number of counts
+TRAILER = struct.Struct('<QIQI8s')
+
+
+def month_key(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def rank(row) -> tuple:
+    """Sort key putting history rows in list order: latest return first, then highest id."""
+    return -row.return_date.toordinal(), -row.id
+
+
+def unique(rows):
+    """Drops rows repeating the id of the one before (the same row, frozen twice or not yet deleted)."""
+    last = None
+    for row in rows:
+        if row.id != last:
+            yield row
+        last = row.id
+
+
+class Segment:
+    """
+    A read-only segment file of archived checkouts, read through a memory
+    map so only the blocks a request touches are paged in.
+
+    The file holds zlib-compressed blocks of fixed-size records sorted by
+    user, latest return first, then a sparse index with one entry per
+    block (its first and last user and its return date range), the number
+    of rows of each user and month, and a trailer pointing at both. A
+    user's rows are found by bisecting the index and inflating only the
+    blocks that can hold them; counting them needs no block at all.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        index_offset, count, self.counts_offset, self.counts, magic = TRAILER.unpack_from(
+            self.data, len(self.data) - TRAILER.size
+        )
+        if magic != MAGIC or self.data[:len(MAGIC)] != MAGIC:
+            self.data.close()
+            raise ValueError(f'{path} is not a history segment.')
+        self.blocks = [BLOCK.unpack_from(self.data, index_offset + i * BLOCK.size) for i in range(count)]
+        self.last_users = [block[1] for block in self.blocks]
+        self.newest = max((date.fromordinal(block[2]) for block in self.blocks), default=None)
+        self.rows = sum(block[6] for block in self.blocks)
+        self.month_rows = Counter()
+        end = self.counts_offset + self.counts * COUNT.size
+        for _, month, rows in COUNT.iter_unpack(self.data[self.counts_offset:end]):
+            self.month_rows[month] += rows
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def close(self) -> None:
+        self.data.close()
+
+    def read_block(self, block) -> list:
+        _, _, _, _, offset, length, count = block
+        raw = zlib.decompress(self.data[offset:offset + length])
+        return [
+            ColdCheckOut(pk, user_id, book_id, date.fromordinal(checkout), date.fromordinal(returned))
+            for pk, user_id, book_id, checkout, returned in RECORD.iter_unpack(raw)
+        ]
+
+    def user_blocks(self, user_id=None) -> list:
+        """The blocks that can hold rows of ``user_id`` (all of them when None)."""
+        if user_id is None:
+            return self.blocks
+        blocks = []
+        for block in self.blocks[bisect_left(self.last_users, user_id):]:
+            if block[0] > user_id:
+                break
+            blocks.append(block)
+        return blocks
+
+    def count_entry(self, index: int) -> tuple:
+        return COUNT.unpack_from(self.data, self.counts_offset + index * COUNT.size)
+
+    def count(self, user_id=None, month=None) -> int:
+        """
+        The number of rows of ``user_id`` (everyone's when None) returned in
+        ``month`` (any month when None), read from the counts alone.
+        """
+        if user_id is None:
+            return self.month_rows[month_key(month)] if month else self.rows
+        key = (user_id, month_key(month)) if month else (user_id,)
+        # The counts are sorted by user and month: bisect them in place.
+        low, high = 0, self.counts
+        while low < high:
+            middle = (low + high) // 2
+            if self.count_entry(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        total = 0
+        for index in range(low, self.counts):
+            entry = self.count_entry(index)
+            if entry[:len(key)] != key:
+                break
+            total += entry[2]
+        return total
+
+    def newest_return(self, user_id=None):
+        """No row of ``user_id`` (anyone's when None) was returned after this date, per the index."""
+        return max((date.fromordinal(block[2]) for block in self.user_blocks(user_id)), default=None)
+
+    def scan(self, user_id=None, start=None, end=None) -> list:
+        """
+        The rows of ``user_id`` (everyone's when None) returned on or after
+        ``start`` and before ``end``, latest return first.
+        """
+        rows = []
+        for block in self.user_blocks(user_id):
+            newest, oldest = date.fromordinal(block[2]), date.fromordinal(block[3])
+            if (start and newest < start) or (end and oldest >= end):
+                continue
+            rows.extend(
+                row for row in self.read_block(block)
+                if (user_id is None or row.user_id == user_id)
+                and (not start or row.return_date >= start)
+                and (not end or row.return_date < end)
+            )
+        if user_id is None:
+            rows.sort(key=rank)
+        return rows
+
+    @classmethod
+    def write(cls, path: Path, rows: list, block_rows: int = 512) -> None:
+        """
+        Writes ``rows`` (``ColdCheckOut``) to a new segment at ``path``,
+        through a temporary file renamed into place once it is on disk.
+        """
+        rows = sorted(rows, key=lambda row: (row.user_id, *rank(row)))
+        temporary = path.with_suffix('.tmp')
+        with open(temporary, 'wb') as file:
+            file.write(MAGIC)
+            index = []
+            for start in range(0, len(rows), block_rows):
+                block = rows[start:start + block_rows]
+                payload = zlib.compress(b''.join(
+                    RECORD.pack(
+                        row.id, row.user_id, row.book_id,
+                        row.checkout_date.toordinal(), row.return_date.toordinal()
+                    ) for row in block
+                ))
+                returns = [row.return_date.toordinal() for row in block]
+                index.append(BLOCK.pack(
+                    block[0].user_id, block[-1].user_id, max(returns), min(returns),
+                    file.tell(), len(payload), len(block)
+                ))
+                file.write(payload)
+            index_offset = file.tell()
+            file.write(b''.join(index))
+            counts = Counter((row.user_id, month_key(row.return_date)) for row in rows)
+            counts_offset = file.tell()
+            file.write(b''.join(COUNT.pack(user_id, month, n) for (user_id, month), n in sorted(counts.items())))
+            file.write(TRAILER.pack(index_offset, len(index), counts_offset, len(counts), MAGIC))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+
+class ColdStore:
+    """
+    Checkout history moved out of the database into append-only segment
+    files in one directory. ``freeze`` adds a segment per batch of rows
+    and never rewrites one; ``expire`` deletes segments whose history is
+    all past the retention period. Segments are kept open once read.
+    """
+    suffix = '.seg'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.opened = {}
+
+    def segments(self) -> list:
+        try:
+            names = sorted(name for name in os.listdir(self.path) if name.endswith(self.suffix))
+        except FileNotFoundError:
+            names = []
+        for name in set(self.opened) - set(names):
+            self.opened.pop(name).close()
+        for name in names:
+            if name not in self.opened:
+                self.opened[name] = Segment(self.path / name)
+        return [self.opened[name] for name in names]
+
+    def scan(self, user_id=None, month=None) -> list:
+        """
+        The frozen history of ``user_id`` (everyone's when None), only the
+        returns of ``month`` if given, latest return first.
+        """
+        start, end = (month, next_month(month)) if month else (None, None)
+        # A freeze whose commit failed after its segment was renamed into
+        # place leaves its rows in the database, and the next freeze writes
+        # them to a segment again.
+        scans = [segment.scan(user_id, start, end) for segment in self.segments()]
+        return list(unique(heapq.merge(*scans, key=rank)))
+
+    def count(self, user_id=None, month=None) -> int:
+        """
+        The number of rows ``scan`` returns, from the segment counts
+        without inflating a block; rows frozen twice count twice.
+        """
+        return sum(segment.count(user_id, month) for segment in self.segments())
+
+    def newest_return(self, user_id=None):
+        """A date no frozen row of ``user_id`` was returned after, from the segment indexes."""
+        return max(
+            filter(None, (segment.newest_return(user_id) for segment in self.segments())), default=None
+        )
+
+    def batches(self, start=None, end=None, batch_size: int = 500):
+        """
+        Every frozen row returned on or after ``start`` and before ``end``,
+        in lists of up to ``batch_size`` rows: segment by segment, in id
+        order within each, so only one segment's rows are held at a time.
+        Callers read the database rows as well, so rows a failed freeze
+        left there are skipped; a row frozen twice comes twice, as in
+        ``count``.
+        """
+        for segment in self.segments():
+            rows = sorted(segment.scan(None, start, end), key=attrgetter('id'))
+            for first in range(0, len(rows), batch_size):
+                batch = rows[first:first + batch_size]
+                hot = set(
+                    ArchivedCheckOut.objects.filter(pk__in=[row.id for row in batch]).values_list('pk', flat=True)
+                )
+                yield [row for row in batch if row.id not in hot]
+
+    def freeze(self, before: date, segment_rows: int = 50000):
+        """
+        Moves the archived checkouts returned before ``before`` into new
+        segments, ``segment_rows`` rows per segment and transaction: the
+        segment is written and the rows deleted, and the segment only
+        appears once its file is complete. Yields the number of rows moved
+        into each segment.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        expired = ArchivedCheckOut.objects.filter(return_date__lt=before)
+        while True:
+            with transaction.atomic():
+                rows = [
+                    ColdCheckOut(*row) for row in expired.order_by('pk').values_list(
+                        'pk', 'user_id', 'book_id', 'checkout_date', 'return_date'
+                    )[:segment_rows]
+                ]
+                if not rows:
+                    return
+                ids = [row.id for row in rows]
+                for start in range(0, len(ids), 500):
+                    expired.filter(pk__in=ids[start:start + 500])._raw_delete(ArchivedCheckOut.objects.db)
+                Segment.write(self.path / f'history-{ids[0]:012d}-{ids[-1]:012d}{self.suffix}', rows)
+            yield len(rows)
+
+    def expire(self, before: date) -> list:
+        """Deletes the segments holding only returns before ``before``. Returns their names."""
+        removed = []
+        for segment in self.segments():
+            if segment.newest is None or segment.newest < before:
+                os.remove(segment.path)
+                removed.append(segment.name)
+        self.segments()
+        return removed
+
+    def attach(self, queryset, user_id=None, month=None):
+        """
+        ``queryset`` of archived checkouts followed by the frozen ones, or
+        ``queryset`` itself while nothing is frozen.
+        """
+        if not self.segments():
+            return queryset
+        return TieredHistory(queryset, self, user_id, month)
+
+
+class TieredHistory:
+    """
+    The archived checkouts in the database merged with the frozen ones,
+    latest return first, for the history pagination. The database rows are
+    sliced there; the frozen rows are counted from the segment indexes and
+    only scanned, once per request, when a page reaches them.
+
+    Freezing takes the oldest returns, so the frozen rows normally all
+    come after the database ones: a page within the database rows then
+    reads no segment, and a page past the last of them is read from the
+    segments alone.
+    """
+    ordered = True
+
+    def __init__(self, queryset, store: ColdStore, user_id=None, month=None):
+        self.queryset = queryset.order_by('-return_date', '-id')
+        self.store = store
+        self.user_id = user_id
+        self.month = month
+        self._cold = None
+        self._hot_count = None
+        self._cold_count = None
+        self._cold_after_hot = None
+
+    @property
+    def cold(self) -> list:
+        if self._cold is None:
+            self._cold = self.store.scan(self.user_id, self.month)
+        return self._cold
+
+    def hot_count(self) -> int:
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def cold_count(self) -> int:
+        if self._cold_count is None:
+            self._cold_count = self.store.count(self.user_id, self.month)
+        return self._cold_count
+
+    def count(self) -> int:
+        return self.hot_count() + self.cold_count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def cold_before(self, day: date) -> bool:
+        """Whether every frozen row was returned before ``day``, from the segment indexes alone."""
+        if not self.cold_count():
+            return True
+        newest = self.store.newest_return(self.user_id)
+        return newest is None or newest < day
+
+    def all_cold_after_hot(self) -> bool:
+        if self._cold_after_hot is None:
+            oldest = self.queryset.last() if self.cold_count() and self.hot_count() else None
+            self._cold_after_hot = (
+                oldest is None or self.cold_before(oldest.return_date) or rank(self.cold[0]) > rank(oldest)
+            )
+        return self._cold_after_hot
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step:
+            raise TypeError('History can only be sliced.')
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            stop = self.count()
+        if self.all_cold_after_hot():
+            hot_count = self.hot_count()
+            hot = list(self.queryset[start:stop]) if start < hot_count else []
+            if stop <= hot_count:
+                return hot
+            return hot + self.materialize(self.cold[max(start - hot_count, 0):stop - hot_count])
+        hot = list(self.queryset[:stop])
+        return self.merge(hot, self.cold[:stop], start, stop)
+
+    def page_after(self, hot: list, values, reverse: bool, limit: int) -> list:
+        """
+        Completes a keyset page: ``hot`` holds up to ``limit`` database rows
+        after the position ``values`` (before it when ``reverse``) and the
+        frozen rows on the same side of it are merged in. The segments are
+        only scanned when the index cannot tell that none of them belong.
+        """
+        if values is None:
+            position = None
+        else:
+            position = rank(ColdCheckOut(int(values[1]), None, None, None, date.fromisoformat(str(values[0]))))
+        if not reverse:
+            if len(hot) >= limit and self.cold_before(hot[limit - 1].return_date):
+                return hot[:limit]
+        elif position is not None and self.cold_before(date.fromordinal(-position[0])):
+            return hot[:limit]
+        cold, ranks = self.cold, [rank(row) for row in self.cold]
+        if not reverse:
+            cold = cold[bisect_right(ranks, position):][:limit] if position is not None else cold[:limit]
+            return self.merge(hot, cold, 0, limit)
+        cold = cold[:bisect_left(ranks, position)][::-1][:limit]
+        return self.merge(hot, cold, 0, limit, reverse=True)
+
+    def merge(self, hot: list, cold: list, start: int, stop: int, reverse: bool = False) -> list:
+        rows = list(islice(unique(heapq.merge(hot, cold, key=rank, reverse=reverse)), start, stop))
+        frozen = self.materialize([row for row in rows if isinstance(row, ColdCheckOut)])
+        by_id = {row.id: row for row in frozen}
+        return [by_id[row.id] if isinstance(row, ColdCheckOut) else row for row in rows]
+
+    @staticmethod
+    def materialize(rows: list) -> list:
+        """Frozen rows as unsaved archived checkouts with their book and user, two queries per page."""
+        if not rows:
+            return []
+        books = Book.objects.in_bulk({row.book_id for row in rows})
+        users = get_user_model().objects.in_bulk({row.user_id for row in rows})
+        checkouts = []
+        for row in rows:
+            checkout = ArchivedCheckOut(
+                id=row.id, book_id=row.book_id, user_id=row.user_id,
+                checkout_date=row.checkout_date, return_date=row.return_date
+            )
+            if row.book_id in books:
+                checkout.book = books[row.book_id]
+            if row.user_id in users:
+                checkout.user = users[row.user_id]
+            checkouts.append(checkout)
+        return checkouts
+
+
+_stores = {}
+
+
+def get_cold_store() -> ColdStore:
+    """Returns the cold store in ``HISTORY_COLD_STORAGE_DIR``."""
+    path = str(settings.HISTORY_COLD_STORAGE_DIR)
+    if path not in _stores:
+        _stores[path] = ColdStore(path)
+    return _stores[path]
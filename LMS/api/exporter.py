@@ -0,0 +1,177 @@
+import csv
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from api.coldstore import get_cold_store
+from api.models import Book, CheckOut, ArchivedCheckOut
+
+OUTPUTS = ('ndjson', 'csv')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Dataset:
+    """
+    Describes one exportable table: the columns to read with ``values()``
+    (those in ``expressions`` computed by them), the date column that
+    ``since``/``until`` apply to and how ``status`` is filtered.
+    """
+
+    def __init__(self, queryset, columns, date_field, status_filter=None, expressions=None):
+        self.queryset = queryset
+        self.columns = columns
+        self.date_field = date_field
+        self.status_filter = status_filter
+        self.expressions = expressions or {}
+
+    def filtered(self, since=None, until=None, status=None):
+        """The rows to export as a ``values()`` queryset in primary key order."""
+        queryset = self.queryset.all()
+        if since:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': since})
+        if until:
+            queryset = queryset.filter(**{f'{self.date_field}__lte': until})
+        if status and self.status_filter:
+            queryset = queryset.filter(**self.status_filter(status))
+        fields = [column for column in self.columns if column not in self.expressions]
+        return queryset.order_by('pk').values(*fields, **self.expressions)
+
+    def rows(self, chunk_size=2000, **filters):
+        """
+        Yields plain dicts in primary key order. ``iterator()`` streams them
+        from the database (with a server-side cursor where supported)
+        ``chunk_size`` at a time, so memory use does not grow with the table.
+        """
+        return self.filtered(**filters).iterator(chunk_size=chunk_size)
+
+    def arows(self, chunk_size=2000, **filters):
+        """
+        Async variant of ``rows()``: ``aiterator()`` fetches each chunk in a
+        worker thread, so the event loop is free between chunks.
+        """
+        return self.filtered(**filters).aiterator(chunk_size=chunk_size)
+
+
+class HistoryDataset(Dataset):
+    """
+    The archived checkouts followed by the history frozen into the cold
+    store (see ``api.coldstore``), which is read a batch at a time with the
+    books and users of each batch.
+    """
+
+    def frozen(self, since=None, until=None, status=None):
+        """Yields lists of frozen rows, as dicts with the dataset's columns."""
+        users = get_user_model().objects
+        end = until + timedelta(days=1) if until else None
+        for rows in get_cold_store().batches(since, end):
+            titles = dict(Book.objects.filter(pk__in={row.book_id for row in rows}).values_list('pk', 'title'))
+            emails = dict(users.filter(pk__in={row.user_id for row in rows}).values_list('pk', 'email'))
+            yield [
+                {
+                    'id': row.id, 'book_id': row.book_id, 'book__title': titles.get(row.book_id),
+                    'user_id': row.user_id, 'user__email': emails.get(row.user_id),
+                    'checkout_date': row.checkout_date, 'return_date': row.return_date,
+                }
+                for row in rows
+            ]
+
+    def rows(self, chunk_size=2000, **filters):
+        yield from super().rows(chunk_size, **filters)
+        for rows in self.frozen(**filters):
+            yield from rows
+
+    async def arows(self, chunk_size=2000, **filters):
+        async for row in super().arows(chunk_size, **filters):
+            yield row
+        frozen = self.frozen(**filters)
+        while (rows := await sync_to_async(next)(frozen, None)) is not None:
+            for row in rows:
+                yield row
+
+
+def book_status_filter(status):
+    return {'info__status': status == 'available'}
+
+
+DATASETS = {
+    'books': Dataset(
+        Book.objects.with_pending(),
+        ['id', 'title', 'author', 'ISBN', 'isbn13', 'published_date',
+         'info__copies', 'info__status', 'info__date_added'],
+        date_field='info__date_added',
+        status_filter=book_status_filter,
+        # Copies on the shelf, counting returns not folded in yet.
+        expressions={'info__copies': F('available_copies')},
+    ),
+    'checkouts': Dataset(
+        CheckOut.objects.all(),
+        ['id', 'book_id', 'book__title', 'user_id', 'user__email',
+         'checkout_date', 'due_date', 'return_date', 'status'],
+        date_field='checkout_date',
+        status_filter=lambda status: {'status': status},
+    ),
+    'history': HistoryDataset(
+        ArchivedCheckOut.objects.all(),
+        ['id', 'book_id', 'book__title', 'user_id', 'user__email',
+         'checkout_date', 'return_date'],
+        date_field='return_date',
+    ),
+}
+
+STATUSES = {
+    'books': ['available', 'unavailable'],
+    'checkouts': [choice for choice, _ in CheckOut.Status.choices],
+    'history': [],
+}
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(columns):
+    encoder = DjangoJSONEncoder()
+    return [], lambda row: encoder.encode(row) + '\n'
+
+
+def csv_lines(columns):
+    writer = csv.writer(Echo())
+    return [writer.writerow(columns)], lambda row: writer.writerow([row[column] for column in columns])
+
+
+RENDERERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
+
+
+def export(name, output='ndjson', **filters):
+    """Yields the ``name`` dataset rendered as ``output``, line by line."""
+    dataset = DATASETS[name]
+    header, render = RENDERERS[output](dataset.columns)
+    yield from header
+    for row in dataset.rows(**filters):
+        yield render(row)
+
+
+async def aexport(name, output='ndjson', **filters):
+    """
+    Async variant of ``export()`` for ASGI servers, which would otherwise
+    read a synchronous iterator to the end before sending the first line.
+    """
+    dataset = DATASETS[name]
+    header, render = RENDERERS[output](dataset.columns)
+    for line in header:
+        yield line
+    async for row in dataset.arows(**filters):
+        yield render(row)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+IN_FLIGHT = 'in-flight'
+
+
+class IdempotencyStore:
+    """
+    Remembers the responses of POSTs sent with an ``Idempotency-Key``
+    header, so a client retrying after a lost response gets the original
+    answer back instead of borrowing or returning a second time.
+
+    Keys are scoped to the user and stored with a fingerprint of the
+    method, path and body; reusing a key for a different request is an
+    error. Only successful responses are kept: a failed request changed
+    nothing and is simply run again on retry.
+
+    Eviction (TTL via ``TIMEOUT`` and size via ``MAX_ENTRIES``) is left to
+    the configured cache. A per-process cache such as LocMemCache only
+    recognises retries that land on the same worker; point the alias at a
+    shared cache to recognise them everywhere.
+    """
+    header = 'Idempotency-Key'
+    max_key_length = 255
+
+    def __init__(self, alias: str = 'idempotency', lock_timeout: int = 60):
+        self.alias = alias
+        self.lock_timeout = lock_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, user_id, idempotency_key: str) -> str:
+        digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+        return f'idempotency:{user_id}:{digest}'
+
+    @staticmethod
+    def fingerprint(request) -> str:
+        payload = json.dumps([request.method, request.path, request.data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def begin(self, key: str) -> bool:
+        """Claims ``key`` for a request about to run; False if it is taken."""
+        return self.cache.add(key, IN_FLIGHT, self.lock_timeout)
+
+    def get(self, key: str):
+        return self.cache.get(key)
+
+    def save(self, key: str, fingerprint: str, response) -> None:
+        self.cache.set(key, {
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+        })
+
+    def release(self, key: str) -> None:
+        self.cache.delete(key)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+idempotency_store = IdempotencyStore()
+
+
+def idempotent(view):
+    """
+    Honours ``Idempotency-Key`` on POSTs to a function view or viewset
+    method. A retry is answered from the store with the first response
+    and an ``Idempotent-Replayed`` header, without touching the database;
+    a retry that arrives while the first attempt is still running gets a
+    409.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        idempotency_key = request.headers.get(idempotency_store.header)
+        if request.method != 'POST' or idempotency_key is None:
+            return view(*args, **kwargs)
+
+        if not idempotency_key or len(idempotency_key) > idempotency_store.max_key_length:
+            return Response(
+                {"error": f"{idempotency_store.header} must be 1 to {idempotency_store.max_key_length} characters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        key = idempotency_store.key(request.user.pk, idempotency_key)
+        fingerprint = idempotency_store.fingerprint(request)
+        if not idempotency_store.begin(key):
+            stored = idempotency_store.get(key)
+            if not isinstance(stored, dict):
+                return Response(
+                    {"error": "A request with this Idempotency-Key is still being processed."},
+                    status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'}
+                )
+            if stored['fingerprint'] != fingerprint:
+                return Response(
+                    {"error": "This Idempotency-Key was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            idempotency_store.release(key)
+            raise
+        if status.is_success(response.status_code):
+            idempotency_store.save(key, fingerprint, response)
+        else:
+            idempotency_store.release(key)
+        return response
+
+    return wrapper
@@ -0,0 +1,230 @@
+import csv
+import json
+from datetime import date
+from itertools import islice
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from api.models import Book, BookInfo, CopyMovement, canonical_isbn13
+from api.search import get_search_backend
+from api.cache import book_fragments
+from api.autocomplete import book_autocomplete
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename: str, default: str = 'csv') -> str:
+    """Guesses the feed format from a file name."""
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_records(stream, fmt: str):
+    """
+    Yields ``(line_number, record)`` pairs from a text stream without reading
+    it all into memory. A record that cannot be parsed is yielded as an
+    exception so it is reported against its line instead of aborting.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('Each line must be a JSON object.')
+            except ValueError as error:
+                record = error
+            yield line_number, record
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+class CatalogImporter:
+    """
+    Loads books from a CSV or JSON Lines feed in chunks.
+
+    Every chunk is validated and normalized in Python, checked for duplicate
+    titles/ISBNs against the feed so far and against the database with one
+    query, then written with one ``bulk_create`` for Book and one for
+    BookInfo. This skips the per-row ``save()``/signal chain, so the search
+    index and fragment cache are refreshed explicitly. Rows that fail are
+    reported and never abort the rest of the import.
+
+    Recognised columns: ``title``, ``author``, ``ISBN`` (or ``isbn``),
+    ``published_date`` (YYYY-MM-DD) and ``copies`` (or ``book_copies``).
+    """
+
+    def __init__(self, chunk_size: int = 1000, max_errors: int = 1000):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.created = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []
+        self._titles = set()
+        self._isbns = set()
+
+    def run(self, stream, fmt: str) -> dict:
+        records = iter_records(stream, fmt)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def add_error(self, line: int, errors) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def clean(self, record: dict):
+        """
+        Returns ``(book, copies)`` built from a raw record, or raises
+        ValueError with a dict of field errors.
+        """
+        errors = {}
+        record = {key.strip(): value for key, value in record.items() if key}
+
+        title = (record.get('title') or '').strip()
+        author = (record.get('author') or '').strip()
+        isbn = str(record.get('ISBN') or record.get('isbn') or '').strip()
+        for field, value in (('title', title), ('author', author), ('ISBN', isbn)):
+            max_length = Book._meta.get_field(field).max_length
+            if not value:
+                errors[field] = 'This field is required.'
+            elif len(value) > max_length:
+                errors[field] = f'Ensure this field has no more than {max_length} characters.'
+
+        isbn13 = canonical_isbn13(isbn)
+        if isbn and not isbn13:
+            errors['ISBN'] = f"The ISBN {isbn} is invalid."
+
+        published_date = record.get('published_date') or None
+        if published_date:
+            try:
+                published_date = date.fromisoformat(str(published_date).strip())
+            except ValueError:
+                errors['published_date'] = 'Date must be in YYYY-MM-DD format.'
+            else:
+                if published_date > date.today():
+                    errors['published_date'] = 'Unpublished books are not allowed.'
+
+        copies = record.get('copies', record.get('book_copies')) or 0
+        try:
+            copies = int(copies)
+            if copies < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors['copies'] = 'Copies must be a positive integer.'
+        else:
+            # Past the column's range the whole chunk's INSERT would fail
+            # (SQLite alone would store it).
+            field = BookInfo._meta.get_field('copies')
+            _, max_copies = connection.ops.integer_field_ranges[field.get_internal_type()]
+            if copies > max_copies:
+                errors['copies'] = f'Ensure this value is less than or equal to {max_copies}.'
+
+        if errors:
+            raise ValueError(errors)
+
+        book = Book(title=title, author=author, ISBN=isbn, isbn13=isbn13, published_date=published_date)
+        book.normalize_book_title()
+        book.normalize_author_name()
+        return book, copies
+
+    def import_chunk(self, chunk: list) -> None:
+        candidates = []
+        for line, record in chunk:
+            if isinstance(record, Exception):
+                self.add_error(line, {'record': str(record)})
+                continue
+            try:
+                book, copies = self.clean(record)
+            except ValueError as error:
+                self.add_error(line, error.args[0])
+                continue
+            candidates.append((line, book, copies))
+
+        if not candidates:
+            return
+        existing = Book.objects.filter(
+            Q(title__in=[book.title for _, book, _ in candidates]) |
+            Q(isbn13__in=[book.isbn13 for _, book, _ in candidates])
+        ).order_by().values_list('title', 'isbn13')
+        for title, isbn13 in existing:
+            self._titles.add(title)
+            self._isbns.add(isbn13)
+
+        rows = []
+        for line, book, copies in candidates:
+            if book.title in self._titles or book.isbn13 in self._isbns:
+                self.duplicates += 1
+                if len(self.errors) < self.max_errors:
+                    message = f"'{book.title}' ({book.ISBN}) already exists."
+                    self.errors.append({'line': line, 'errors': {'duplicate': message}})
+                continue
+            self._titles.add(book.title)
+            self._isbns.add(book.isbn13)
+            rows.append((line, book, copies))
+
+        if not rows:
+            return
+        try:
+            with transaction.atomic():
+                self.write(rows)
+        except IntegrityError:
+            # Another writer got in between the duplicate check and the
+            # insert; fall back to row by row so only the clashing rows fail.
+            for row in rows:
+                row[1].pk = None
+                try:
+                    with transaction.atomic():
+                        self.write([row])
+                except IntegrityError as error:
+                    self.add_error(row[0], {'record': str(error)})
+
+    def write(self, rows: list) -> None:
+        books = Book.objects.bulk_create([book for _, book, _ in rows])
+        if not connection.features.can_return_rows_from_bulk_insert:
+            pks = dict(Book.objects.filter(
+                isbn13__in=[book.isbn13 for book in books]
+            ).values_list('isbn13', 'pk'))
+            for book in books:
+                book.pk = pks[book.isbn13]
+
+        infos = []
+        for (_, _, copies), book in zip(rows, books):
+            info = BookInfo(book=book, copies=copies)
+            info.update_status()
+            infos.append(info)
+        BookInfo.objects.bulk_create(infos)
+        # The initial stock opens each book's copy ledger.
+        CopyMovement.objects.bulk_create(
+            CopyMovement(book=info.book, kind=CopyMovement.Kind.RESTOCK, delta=info.copies, folded=True)
+            for info in infos if info.copies
+        )
+
+        get_search_backend().index_books(books)
+        book_fragments.invalidate(*[book.pk for book in books])
+        entries = [(book.pk, book.title, book.author) for book in books]
+        transaction.on_commit(lambda: book_autocomplete.add(entries))
+        self.created += len(books)
@@ -0,0 +1,111 @@
+import statistics
+import threading
+import time
+import uuid
+from datetime import date
+
+import isbnlib
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, connection
+
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+
+User = get_user_model()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    """
+    Hammers one title with concurrent checkouts from many threads, each on
+    its own database connection, and checks that no more copies were lent
+    than the title had. Creates its own book and borrowers and removes them
+    afterwards, so it can run against a copy of production data.
+
+    Exits with an error if any copy was oversold or the p99 latency of a
+    checkout exceeds ``--max-p99-ms``.
+    """
+    help = 'Benchmark concurrent checkouts of a single title.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--copies', type=int, default=10, help='Copies of the contended title.')
+        parser.add_argument('--borrowers', type=int, default=100, help='Distinct users trying to borrow it.')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent worker threads.')
+        parser.add_argument('--max-p99-ms', type=float, default=1000.0, help='Fail above this p99 latency.')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:12]
+        body = f'978{int(tag[:8], 16) % 10 ** 9:09d}'
+        book = Book.objects.create(
+            title=f'Benchmark {tag}', author='Benchmark', ISBN=body + isbnlib.check_digit13(body)
+        )
+        BookInfo.objects.filter(book=book).update(copies=options['copies'], status=options['copies'] > 0)
+        users = User.objects.bulk_create(
+            User(email=f'bench-{tag}-{i}@example.invalid', password='!')
+            for i in range(options['borrowers'])
+        )
+
+        threads = max(1, min(options['threads'], len(users)))
+        barrier = threading.Barrier(threads)
+        results = []
+
+        def worker(batch):
+            # Line every thread up so the first requests really do collide.
+            barrier.wait()
+            try:
+                for user in batch:
+                    start = time.perf_counter()
+                    try:
+                        CheckOut.objects.create(book_id=book.pk, user=user)
+                        outcome = 'borrowed'
+                    except (ValidationError, IntegrityError):
+                        outcome = 'rejected'
+                    except OperationalError:
+                        outcome = 'error'
+                    results.append((outcome, (time.perf_counter() - start) * 1000))
+            finally:
+                connection.close()
+
+        try:
+            workers = [
+                threading.Thread(target=worker, args=(users[i::threads],))
+                for i in range(threads)
+            ]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            borrowed = CheckOut.objects.filter(book=book).count()
+            remaining = BookInfo.objects.get(book=book).copies
+        finally:
+            self.cleanup(book, users)
+
+        outcomes = [outcome for outcome, _ in results]
+        latencies = [latency for _, latency in results]
+        p50, p99 = statistics.median(latencies), percentile(latencies, 0.99)
+        oversold = max(0, borrowed - options['copies'])
+        self.stdout.write(
+            f"borrowed={outcomes.count('borrowed')} rejected={outcomes.count('rejected')} "
+            f"errors={outcomes.count('error')} checkouts={borrowed} copies_left={remaining} "
+            f"oversold={oversold} p50={p50:.1f}ms p99={p99:.1f}ms"
+        )
+
+        if oversold or borrowed + remaining != options['copies'] or outcomes.count('borrowed') != borrowed:
+            raise CommandError('Copies were oversold or lost.')
+        if p99 > options['max_p99_ms']:
+            raise CommandError(f"p99 latency {p99:.1f}ms exceeds {options['max_p99_ms']}ms.")
+
+    def cleanup(self, book, users):
+        CheckOut.objects.filter(book=book).update(
+            status=CheckOut.Status.RETURNED, return_date=date.today()
+        )
+        CheckOut.objects.filter(book=book).delete()
+        ArchivedCheckOut.objects.filter(book=book).delete()
+        book.delete()
+        User.objects.filter(pk__in=[user.pk for user in users]).delete()
@@ -0,0 +1,77 @@
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve, reverse
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from api.management.commands.benchmark_checkout import percentile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Measures what throttling adds to a request: every throttle in
+    ``DEFAULT_THROTTLE_CLASSES`` is checked for a stream of borrow requests
+    spread over many users and client IPs, the way a view checks them, and
+    the time taken per request is reported. Uses the configured throttle
+    cache and removes its own buckets afterwards.
+
+    Exits with an error if the mean overhead exceeds ``--max-us``.
+    """
+    help = 'Benchmark the per-request overhead of throttling.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000, help='Requests to check.')
+        parser.add_argument('--clients', type=int, default=2000, help='Distinct users and IPs sending them.')
+        parser.add_argument('--max-us', type=float, default=50.0, help='Fail above this mean overhead.')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().int % 10 ** 6
+        path = reverse('borrow_book', kwargs={'pk': 1})
+        match = resolve(path)
+        view = match.func.cls()
+        factory = APIRequestFactory()
+
+        requests = []
+        for i in range(max(1, options['clients'])):
+            django_request = factory.post(path, REMOTE_ADDR=f'198.18.{i // 256 % 256}.{i % 256}')
+            django_request.resolver_match = match
+            request = Request(django_request)
+            # Unsaved users: throttles only look at the primary key.
+            request.user = User(pk=-(tag * 10 ** 6 + i), email=f'bench-{i}@example.invalid')
+            requests.append(request)
+
+        throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+        buckets = set()
+        timings = []
+        refused = 0
+        try:
+            for n in range(options['requests']):
+                request = requests[n % len(requests)]
+                start = time.perf_counter()
+                throttles = [throttle() for throttle in throttle_classes]
+                allowed = all(throttle.allow_request(request, view) for throttle in throttles)
+                timings.append((time.perf_counter() - start) * 1_000_000)
+                refused += not allowed
+                buckets.update(
+                    (throttle.cache, throttle.key) for throttle in throttles if getattr(throttle, 'key', None)
+                )
+        finally:
+            for cache, key in buckets:
+                cache.delete(key)
+
+        if not timings:
+            raise CommandError('No requests were checked.')
+        mean = statistics.fmean(timings)
+        self.stdout.write(
+            f"throttles={len(throttle_classes)} requests={len(timings)} refused={refused} "
+            f"mean={mean:.1f}us p50={statistics.median(timings):.1f}us p99={percentile(timings, 0.99):.1f}us"
+        )
+        if mean > options['max_us']:
+            raise CommandError(f"Mean throttling overhead {mean:.1f}us exceeds {options['max_us']}us.")
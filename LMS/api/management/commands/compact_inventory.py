@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import CopyMovement
+
+
+class Command(BaseCommand):
+    """
+    Folds pending copy movements (returns not yet counted) into
+    ``BookInfo.copies``, a chunk of books per transaction. Meant to run
+    from a scheduler every few minutes; overlapping runs are harmless.
+    """
+    help = 'Fold pending copy movements into the copies of each book.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of books folded per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        folded = batches = 0
+        for count in CopyMovement.objects.compact(options['chunk_size']):
+            folded += count
+            batches += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded {folded} movement(s) in {batches} batch(es)."
+        ))
@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import exporter
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date: {value}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    """
+    Streams a whole table as NDJSON or CSV to stdout or a file, reading the
+    database in chunks so memory stays flat however many rows there are.
+    """
+    help = 'Export books, active checkouts or checkout history as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exporter.DATASETS))
+        parser.add_argument('--output', choices=exporter.OUTPUTS, default='ndjson')
+        parser.add_argument('--since', type=parse_date, help='Earliest date (YYYY-MM-DD).')
+        parser.add_argument('--until', type=parse_date, help='Latest date (YYYY-MM-DD).')
+        parser.add_argument('--status', help='Availability or checkout status to keep.')
+        parser.add_argument('--file', help='Write to this path instead of stdout.')
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        statuses = exporter.STATUSES[dataset]
+        if options['status'] and options['status'] not in statuses:
+            raise CommandError(f"Status must be one of: {', '.join(statuses) or 'none for this export'}.")
+
+        lines = exporter.export(
+            dataset,
+            options['output'],
+            since=options['since'],
+            until=options['until'],
+            status=options['status'],
+        )
+        if options['file']:
+            with open(options['file'], 'w', newline='') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import similar, stats
+
+
+class Command(BaseCommand):
+    """
+    Adds the checkouts recorded since the last run to the book
+    co-occurrence matrix and re-ranks the recommendations of the books
+    they touched. Meant to run from a scheduler every few minutes;
+    overlapping runs wait for each other.
+    """
+    help = 'Fold new checkouts into the "also borrowed" recommendations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of ledger movements folded per transaction.'
+        )
+        parser.add_argument(
+            '--settle-seconds', type=float, default=stats.SETTLE.total_seconds(),
+            help='Leave movements younger than this for the next run.'
+        )
+        parser.add_argument(
+            '--top-k', type=int, default=similar.TOP_K,
+            help='Recommendations kept per book.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        if options['settle_seconds'] < 0:
+            raise CommandError('--settle-seconds cannot be negative.')
+        if options['top_k'] < 1:
+            raise CommandError('--top-k must be at least 1.')
+
+        folded = batches = 0
+        settle = timedelta(seconds=options['settle_seconds'])
+        for count in similar.fold(options['chunk_size'], settle, options['top_k']):
+            folded += count
+            batches += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded {folded} checkout(s) in {batches} batch(es)."
+        ))
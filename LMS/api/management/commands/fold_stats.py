@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import stats
+
+
+class Command(BaseCommand):
+    """
+    Adds the checkouts and returns recorded since the last run to the
+    circulation statistics tables. Meant to run from a scheduler every few
+    minutes; overlapping runs wait for each other.
+    """
+    help = 'Fold new checkouts and returns into the circulation statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of ledger movements folded per transaction.'
+        )
+        parser.add_argument(
+            '--settle-seconds', type=float, default=stats.SETTLE.total_seconds(),
+            help='Leave movements younger than this for the next run.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        if options['settle_seconds'] < 0:
+            raise CommandError('--settle-seconds cannot be negative.')
+
+        folded = batches = 0
+        settle = timedelta(seconds=options['settle_seconds'])
+        for count in stats.fold(options['chunk_size'], settle):
+            folded += count
+            batches += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded {folded} movement(s) in {batches} batch(es)."
+        ))
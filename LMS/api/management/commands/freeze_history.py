@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import months_before
+from api.coldstore import get_cold_store
+from api.management.commands.mark_overdue import parse_date
+
+
+class Command(BaseCommand):
+    """
+    Moves checkout history older than ``--keep-months`` out of the
+    database into compressed segment files in ``HISTORY_COLD_STORAGE_DIR``,
+    where the history list still finds it. Meant to run from a scheduler,
+    monthly, before ``rotate_history``.
+    """
+    help = 'Move old checkout history from the database into cold storage segments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=settings.HISTORY_HOT_MONTHS,
+            help='Months of history to leave in the database, counting the current one.'
+        )
+        parser.add_argument(
+            '--as-of', type=parse_date,
+            help='Move the history as on this date (YYYY-MM-DD). Defaults to today.'
+        )
+        parser.add_argument(
+            '--segment-rows', type=int, default=50000,
+            help='Number of rows written per segment and transaction.'
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months must be at least 1.')
+        if options['segment_rows'] < 1:
+            raise CommandError('--segment-rows must be at least 1.')
+
+        before = months_before(options['as_of'] or date.today(), options['keep_months'] - 1)
+        moved = segments = 0
+        for count in get_cold_store().freeze(before, options['segment_rows']):
+            moved += count
+            segments += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} checkout(s) returned before {before.isoformat()} into {segments} segment(s)."
+        ))
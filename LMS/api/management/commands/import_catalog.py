@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import CatalogImporter, FORMATS, detect_format
+
+
+class Command(BaseCommand):
+    """
+    Streams a CSV or JSON Lines acquisition feed into the catalog with bulk
+    inserts. Invalid and duplicate rows are reported without stopping.
+    """
+    help = 'Bulk import books from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the CSV or JSONL file.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Feed format. Defaults to the file extension.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of rows validated and inserted per batch.'
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        importer = CatalogImporter(chunk_size=options['chunk_size'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', errors='replace', newline='') as stream:
+                report = importer.run(stream, fmt)
+        except OSError as error:
+            raise CommandError(error)
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} book(s), skipped {report['duplicates']} "
+            f"duplicate(s), {report['failed']} row(s) failed."
+        ))
@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import CheckOut
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date: {value}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    """
+    Marks every pending checkout past its due date as overdue with chunked
+    UPDATEs. Meant to run from a scheduler every few minutes; overlapping
+    runs are harmless.
+    """
+    help = 'Flip pending checkouts past their due date to overdue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--as-of', type=parse_date,
+            help='Treat loans due before this date (YYYY-MM-DD) as overdue. Defaults to today.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of checkouts updated per statement.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        updated = batches = 0
+        for count in CheckOut.objects.mark_overdue(options['as_of'], options['chunk_size']):
+            updated += count
+            batches += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {updated} checkout(s) overdue in {batches} batch(es)."
+        ))
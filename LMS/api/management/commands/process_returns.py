@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.returns import ReturnProcessor, parse_line
+
+
+class Command(BaseCommand):
+    """
+    Processes a file of returns set-wise, one per line: ``user_id,book_id``
+    or a book barcode. Lines that cannot be returned are reported without
+    stopping.
+    """
+    help = 'Return many checkouts at once from a file of user,book pairs or barcodes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the returns file, or '-' for stdin.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of returns written per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        processor = ReturnProcessor(chunk_size=options['chunk_size'])
+        try:
+            if options['path'] == '-':
+                report = processor.run(parse_line(line) for line in sys.stdin if line.strip())
+            else:
+                with open(options['path'], encoding='utf-8-sig') as stream:
+                    report = processor.run(parse_line(line) for line in stream if line.strip())
+        except OSError as error:
+            raise CommandError(error)
+
+        for error in report['errors']:
+            self.stderr.write(f"item {error['item']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Returned {report['returned']} checkout(s), {report['failed']} item(s) failed."
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Empties the catalog search index and re-indexes every book. Use after
+    bulk loads that bypassed the Book save signals.
+    """
+    help = 'Rebuild the catalog full-text search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of books read from the database per batch.'
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            count = backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} book(s) with {backend.__class__.__name__}."
+        ))
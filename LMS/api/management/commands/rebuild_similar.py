@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import similar
+
+
+class Command(BaseCommand):
+    """
+    Derives the book co-occurrence matrix and the recommendations again
+    from the active, archived and frozen checkouts. Use after the tables
+    are first created; ``fold_similar`` keeps them current after that.
+    """
+    help = 'Rebuild the "also borrowed" recommendations from the checkout history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of patrons whose books are paired per batch.'
+        )
+        parser.add_argument(
+            '--top-k', type=int, default=similar.TOP_K,
+            help='Recommendations kept per book.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        if options['top_k'] < 1:
+            raise CommandError('--top-k must be at least 1.')
+
+        counted = similar.rebuild(options['chunk_size'], options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt recommendations from {counted} patron and book pair(s)."
+        ))
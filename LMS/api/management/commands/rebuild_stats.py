@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import stats
+
+
+class Command(BaseCommand):
+    """
+    Derives the circulation statistics tables again from the active,
+    archived and frozen checkouts. Use after the tables are first created, or if they
+    are ever suspected to be off; ``fold_stats`` keeps them current after
+    that.
+    """
+    help = 'Rebuild the circulation statistics from the checkout history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of checkouts read from the database per batch.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        counted = stats.rebuild(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt circulation statistics from {counted} checkout(s)."
+        ))
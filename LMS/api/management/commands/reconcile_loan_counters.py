@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import loans
+
+
+class Command(BaseCommand):
+    """
+    Recounts every user's active, overdue and lifetime loans from the
+    checkouts and corrects the counters that drifted. Run it after
+    upgrading, to fill in the counters of existing loans, and whenever
+    checkouts were changed by hand.
+    """
+    help = 'Correct the loan counters on library profiles from the checkouts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of profiles recounted per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        checked = corrected = 0
+        for profiles, drifted in loans.reconcile(options['chunk_size']):
+            checked += profiles
+            corrected += drifted
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} profile(s), corrected {corrected}."
+        ))
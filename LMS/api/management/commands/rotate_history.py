@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import get_archive_storage, months_before, next_month
+from api.coldstore import get_cold_store
+from api.management.commands.mark_overdue import parse_date
+
+
+class Command(BaseCommand):
+    """
+    Applies the retention policy of the checkout history: creates the
+    archive partitions for the coming months and removes the months older
+    than ``--keep-months``. On PostgreSQL an expired month is a partition
+    detached (and dropped) whole; elsewhere its rows are deleted in chunks.
+    Cold storage segments holding only expired months are deleted too.
+    Meant to run from a scheduler, at least monthly.
+    """
+    help = 'Prepare upcoming checkout history partitions and remove expired ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=settings.ARCHIVE_RETENTION_MONTHS,
+            help='Months of history to keep, counting the current one.'
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=2,
+            help='Months after the current one to create partitions for.'
+        )
+        parser.add_argument(
+            '--detach', action='store_true',
+            help='Keep expired partitions as standalone tables instead of dropping them.'
+        )
+        parser.add_argument(
+            '--as-of', type=parse_date,
+            help='Apply the policy as on this date (YYYY-MM-DD). Defaults to today.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of rows deleted per statement where rows are deleted one by one.'
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months must be at least 1.')
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead cannot be negative.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        today = options['as_of'] or date.today()
+        until = today.replace(day=1)
+        for _ in range(options['months_ahead'] + 1):
+            until = next_month(until)
+        before = months_before(today, options['keep_months'] - 1)
+
+        storage = get_archive_storage()
+        created = storage.prepare(until)
+        removed, deleted = storage.expire(before, options['chunk_size'], options['detach'])
+        segments = get_cold_store().expire(before)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} partition(s); removed {len(removed)} partition(s), "
+            f"{len(segments)} cold segment(s) and deleted {deleted} row(s) returned before {before.isoformat()}."
+        ))
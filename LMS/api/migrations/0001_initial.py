@@ -0,0 +1,70 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(help_text='Title of the book.', max_length=200, unique=True)),
+                ('author', models.CharField(help_text='Author of the book.', max_length=75)),
+                ('ISBN', models.CharField(help_text='ISBN of the Book (10 or 13 characters).', max_length=13, unique=True)),
+                ('isbn13', models.CharField(editable=False, help_text='Canonical ISBN-13 derived from ISBN, used for exact lookups.', max_length=13, null=True, unique=True)),
+                ('published_date', models.DateField(blank=True, help_text='Publication date of the book.', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last time the book was changed.')),
+            ],
+            options={
+                'verbose_name': 'Book',
+                'verbose_name_plural': 'Books',
+                'ordering': ['-published_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCheckOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkout_date', models.DateField(help_text='Date of book checkout.')),
+                ('return_date', models.DateField(help_text='Date of book return.')),
+                ('user', models.ForeignKey(help_text='User who borrowed the book and returned.', on_delete=django.db.models.deletion.RESTRICT, related_name='usercheckouthistory', to=settings.AUTH_USER_MODEL)),
+                ('book', models.ForeignKey(help_text='A book that was borrowed and returned.', on_delete=django.db.models.deletion.RESTRICT, related_name='bookcheckouthistory', to='api.book')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('copies', models.PositiveSmallIntegerField(default=0, help_text='Number of available copies in Library.')),
+                ('date_added', models.DateTimeField(auto_now_add=True, help_text='Date book was added to inventory.')),
+                ('status', models.BooleanField(default=False, help_text='Availability status of the Book.')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last time copies or status changed.')),
+                ('book', models.OneToOneField(help_text='Associated book whose information is stored.', on_delete=django.db.models.deletion.CASCADE, related_name='info', to='api.book')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CheckOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkout_date', models.DateField(auto_now_add=True, help_text='Date book was checked out.')),
+                ('due_date', models.DateField(blank=True, help_text='Date book should be returned.', null=True)),
+                ('return_date', models.DateField(blank=True, help_text='Date book was returned.', null=True)),
+                ('status', models.CharField(choices=[('missing', 'Missing'), ('pending', 'Pending'), ('returned', 'Returned'), ('overdue', 'Overdue')], default='pending', help_text='Checkout status.', max_length=20)),
+                ('book', models.ForeignKey(help_text='Book to be borrowed.', on_delete=django.db.models.deletion.RESTRICT, related_name='bookcheckouts', to='api.book')),
+                ('user', models.ForeignKey(help_text='User borrowing the book.', on_delete=django.db.models.deletion.RESTRICT, related_name='usercheckouts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'book')},
+            },
+        ),
+    ]
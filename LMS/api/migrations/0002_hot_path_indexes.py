@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:22
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedcheckout',
+            index=models.Index(fields=['-return_date', '-id'], name='archived_return_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcheckout',
+            index=models.Index(fields=['user', '-return_date'], name='archived_user_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-published_date'], name='book_published_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='book_title_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinfo',
+            index=models.Index(fields=['status', '-copies', '-book'], name='bookinfo_status_copies_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['-checkout_date', '-id'], name='checkout_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['user', '-checkout_date'], name='checkout_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['status', 'due_date'], name='checkout_status_due_idx'),
+        ),
+    ]
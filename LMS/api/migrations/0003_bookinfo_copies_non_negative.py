@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='bookinfo',
+            constraint=models.CheckConstraint(condition=models.Q(('copies__gte', 0)), name='bookinfo_copies_non_negative'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_bookinfo_copies_non_negative'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CopyMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('checkout', 'Checkout'), ('return', 'Return'), ('restock', 'Restock'), ('writeoff', 'Write-off')], help_text='What moved the copies.', max_length=10)),
+                ('delta', models.SmallIntegerField(help_text='Copies added (positive) or taken (negative).')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the change happened.')),
+                ('folded', models.BooleanField(default=False, help_text='Whether the change is included in BookInfo.copies yet.')),
+                ('book', models.ForeignKey(help_text='Book whose copies changed.', on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='api.book')),
+                ('user', models.ForeignKey(blank=True, help_text='Patron or staff member behind the change, if any.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='copymovements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('folded', False)), fields=['book'], name='movement_pending_book_idx'), models.Index(fields=['book', '-created_at'], name='movement_book_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import migrations
+
+
+def next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def partition_archive(apps, schema_editor):
+    """
+    Rebuilds the archive as a table partitioned by return month on
+    PostgreSQL, with one partition per month that has returns (plus this
+    month and the next) and a default partition catching anything else.
+    PostgreSQL requires the partition key in the primary key, so ids come
+    from a sequence and the key is (id, return_date). Other databases keep
+    the plain table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    table = apps.get_model('api', 'ArchivedCheckOut')._meta.db_table
+    book_table = apps.get_model('api', 'Book')._meta.db_table
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    old = f'{table}_unpartitioned'
+    sequence = f'{table}_row_id_seq'
+    columns = 'id, checkout_date, return_date, book_id, user_id'
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE {table} RENAME TO {old}')
+    execute(f'CREATE SEQUENCE {sequence}')
+    execute(
+        f'CREATE TABLE {table} ('
+        f"id bigint NOT NULL DEFAULT nextval('{sequence}'), "
+        'checkout_date date NOT NULL, '
+        'return_date date NOT NULL, '
+        f'book_id bigint NOT NULL REFERENCES {book_table} (id) DEFERRABLE INITIALLY DEFERRED, '
+        f'user_id bigint NOT NULL REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED, '
+        'PRIMARY KEY (id, return_date)'
+        ') PARTITION BY RANGE (return_date)'
+    )
+    execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', return_date)::date FROM {old}")
+        months = {row[0] for row in cursor.fetchall()}
+    this_month = date.today().replace(day=1)
+    months |= {this_month, next_month(this_month)}
+    for month in sorted(months):
+        execute(
+            f'CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"
+        )
+
+    execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {old}')
+    execute(f"SELECT setval('{sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {table}")
+    execute(f'DROP TABLE {old}')
+
+    execute(f'CREATE INDEX archived_return_date_idx ON {table} (return_date DESC, id DESC)')
+    execute(f'CREATE INDEX archived_user_return_idx ON {table} (user_id, return_date DESC)')
+    execute(f'CREATE INDEX {table}_book_id_idx ON {table} (book_id)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_copy_movement_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The model is unchanged, only its storage is; going back keeps the
+        # partitioned table, which Django reads and writes the same way.
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
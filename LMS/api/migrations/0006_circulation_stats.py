@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_partition_archived_checkouts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.', unique=True)),
+                ('loans', models.PositiveIntegerField(default=0, help_text='Checkouts that month.')),
+                ('returns', models.PositiveIntegerField(default=0, help_text='Returns that month.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatsWatermark',
+            fields=[
+                ('name', models.CharField(help_text='Name of the tables kept up to date.', max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0, help_text='Id of the last movement folded in.')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the tables were last brought up to date.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(help_text='Author as spelled on the books.', max_length=75, unique=True)),
+                ('loans', models.PositiveIntegerField(default=0, help_text="Checkouts of the author's books.")),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-loans', 'author'], name='author_stats_loans_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookStats',
+            fields=[
+                ('book', models.OneToOneField(help_text='Book the count is for.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.book')),
+                ('loans', models.PositiveIntegerField(default=0, help_text='Checkouts of the book.')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-loans', 'book'], name='book_stats_loans_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day the loans started or the returns happened.')),
+                ('loans', models.PositiveIntegerField(default=0, help_text='Checkouts of the book that day.')),
+                ('returns', models.PositiveIntegerField(default=0, help_text='Returns of the book that day.')),
+                ('book', models.ForeignKey(help_text='Book the counts are for.', on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='api.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('book', 'day'), name='book_daily_stats_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('loans', models.PositiveIntegerField(default=0, help_text='Checkouts by the user that month.')),
+                ('user', models.ForeignKey(help_text='Patron the count is for.', on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='user_monthly_stats_unique')],
+            },
+        ),
+    ]
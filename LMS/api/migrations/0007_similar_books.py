@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_circulation_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BorrowedBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book', models.ForeignKey(help_text='Book the patron borrowed.', on_delete=django.db.models.deletion.CASCADE, related_name='borrowers', to='api.book')),
+                ('user', models.ForeignKey(help_text='Patron who borrowed the book.', on_delete=django.db.models.deletion.CASCADE, related_name='borrowed_books', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'book'), name='borrowed_book_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CoBorrowing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Patrons who borrowed both books.')),
+                ('book', models.ForeignKey(help_text='Book the row of the matrix is for.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.book')),
+                ('other', models.ForeignKey(help_text='Book borrowed by the same patrons.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('book', 'other'), name='co_borrowing_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(help_text='Position among the recommendations, from 1.')),
+                ('borrowed_together', models.PositiveIntegerField(help_text='Patrons who borrowed both books.')),
+                ('book', models.ForeignKey(help_text='Book the recommendation is for.', on_delete=django.db.models.deletion.CASCADE, related_name='similar_books', to='api.book')),
+                ('similar', models.ForeignKey(help_text='Book recommended with it.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('book', 'rank'), name='similar_book_rank_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """``RunSQL`` that only runs on one database vendor and is a no-op elsewhere."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    """
+    Storage of the catalog search backends (see api.search), which used to
+    be created after every migrate. The tables already exist on databases
+    migrated before, so they are only created when missing.
+
+    The PostgreSQL side table has no foreign key to api_book: books leave
+    the index through the Book delete signal, and a key would make the
+    TRUNCATE of api_book by ``flush`` fail.
+    """
+
+    dependencies = [
+        ('api', '0007_similar_books'),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            'sqlite',
+            sql=[
+                "CREATE VIRTUAL TABLE IF NOT EXISTS api_book_fts "
+                "USING fts5(title, author, isbn, tokenize='unicode61 remove_diacritics 2')",
+            ],
+            reverse_sql=['DROP TABLE IF EXISTS api_book_fts'],
+        ),
+        VendorRunSQL(
+            'postgresql',
+            sql=[
+                'CREATE TABLE IF NOT EXISTS api_book_search ('
+                'book_id bigint PRIMARY KEY, document tsvector NOT NULL)',
+                'ALTER TABLE api_book_search DROP CONSTRAINT IF EXISTS api_book_search_book_id_fkey',
+                'CREATE INDEX IF NOT EXISTS api_book_search_document_gin ON api_book_search USING GIN (document)',
+            ],
+            reverse_sql=['DROP TABLE IF EXISTS api_book_search'],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_catalog_search_storage'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookinfo',
+            name='bookinfo_status_copies_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bookinfo',
+            index=models.Index(condition=models.Q(('status', True)), fields=['-copies', '-book'], name='bookinfo_available_copies_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Adds strong ETags to list and detail responses, and Last-Modified to
+    detail responses, computed from the ``updated_at`` versions of the rows
+    being returned rather than from the rendered body.
+
+    ``If-None-Match``/``If-Modified-Since`` are checked once the rows are
+    loaded and before anything is serialized, so an unchanged page costs
+    its queries and nothing else.
+
+    Views list the related objects whose versions show up in the
+    representation in ``version_relations``, and any annotated timestamps
+    that do in ``version_annotations``.
+    """
+    version_relations = ()
+    version_annotations = ()
+
+    def get_versions(self, instance) -> list:
+        """Timestamps that change whenever the representation of ``instance`` does."""
+        versions = [instance.updated_at]
+        for relation in self.version_relations:
+            related = getattr(instance, relation, None)
+            versions.append(related.updated_at if related is not None else None)
+        versions.extend(getattr(instance, name, None) for name in self.version_annotations)
+        return versions
+
+    def compute_etag(self, instances, *state) -> str:
+        """
+        Hashes the request URL, the output format, any extra ``state`` (such
+        as pagination links) and the versions of every instance.
+        """
+        digest = hashlib.sha1()
+        digest.update(self.request.build_absolute_uri().encode())
+        digest.update(getattr(self.request, 'accepted_media_type', '').encode())
+        for value in state:
+            digest.update(f'|{value}'.encode())
+        for instance in instances:
+            versions = ','.join(v.isoformat() if v else '' for v in self.get_versions(instance))
+            digest.update(f'|{instance.pk}:{versions}'.encode())
+        return quote_etag(digest.hexdigest())
+
+    def render(self, instances):
+        return self.get_serializer(instances, many=True).data
+
+    def conditional_response(self, render, etag, last_modified=None):
+        """
+        Returns a 304 when the client's validators still match, otherwise
+        the response built by ``render()``, with the validators attached.
+        """
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows = list(queryset)
+            return self.conditional_response(
+                lambda: Response(self.render(rows)), self.compute_etag(rows)
+            )
+
+        state = [self.paginator.get_next_link(), self.paginator.get_previous_link()]
+        django_page = getattr(self.paginator, 'page', None)
+        if hasattr(django_page, 'paginator'):
+            state.append(django_page.paginator.count)
+        return self.conditional_response(
+            lambda: self.get_paginated_response(self.render(page)),
+            self.compute_etag(page, *state)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = max(v for v in self.get_versions(instance) if v)
+        return self.conditional_response(
+            lambda: Response(self.render([instance])[0]),
+            self.compute_etag([instance]),
+            last_modified
+        )
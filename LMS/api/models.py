@@ -1,11 +1,38 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Exists, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Upper
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from rest_framework.reverse import reverse
+from accounts.models import LibraryProfile
+from collections import Counter
 from datetime import datetime, timedelta
 import isbnlib
 
 
+def canonical_isbn13(value: str) -> str:
+    """
+    Returns the hyphen-free ISBN-13 form of an ISBN-10 or ISBN-13, or an
+    empty string if the value is not a valid ISBN.
+    """
+    if not value or not (isbnlib.is_isbn10(value) or isbnlib.is_isbn13(value)):
+        return ''
+    return isbnlib.to_isbn13(value)
+
+
+class BookQuerySet(models.QuerySet):
+
+    def with_pending(self):
+        """
+        Annotates the copy movements not yet folded into ``info.copies``
+        and ``available_copies``, the copies on the shelf counting them.
+        """
+        return self.annotate(**pending_annotations('pk')).annotate(
+            available_copies=F('info__copies') + F('pending_copies')
+        )
+
+
 class Book(models.Model):
     """Model for storing book details."""
     title: str = models.CharField(
@@ -22,11 +49,22 @@ class Book(models.Model):
         unique=True,
         help_text="ISBN of the Book (10 or 13 characters)."
     )
+    isbn13: str = models.CharField(
+        max_length=13,
+        unique=True,
+        null=True,
+        editable=False,
+        help_text="Canonical ISBN-13 derived from ISBN, used for exact lookups."
+    )
     published_date: models.DateField = models.DateField(
         blank=True,
         null=True,
         help_text="Publication date of the book."
     )
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        help_text="Last time the book was changed."
+    )
 
     def __str__(self) -> str:
         return f"{self.title.title()} by {self.author.title()}"
@@ -35,9 +73,10 @@ class Book(models.Model):
         return reverse('book-detail', kwargs={'pk': self.pk})
 
     def validate_ISBN(self) -> None:
-        """Validates the ISBN using isbnlib."""
+        """Validates the ISBN using isbnlib and stores its canonical ISBN-13."""
         if self.ISBN and not (isbnlib.is_isbn10(self.ISBN) or isbnlib.is_isbn13(self.ISBN)):
             raise ValidationError("Invalid ISBN")
+        self.isbn13 = canonical_isbn13(self.ISBN) or None
 
     def normalize_book_title(self) -> None:
         """Converts book title to title case."""
@@ -53,10 +92,135 @@ class Book(models.Model):
         self.normalize_book_title()
         super().save(*args, **kwargs)
 
+    objects = BookQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Book"
         verbose_name_plural = "Books"
         ordering = ['-published_date']
+        indexes = [
+            # Default ordering of the catalog.
+            models.Index(fields=['-published_date'], name='book_published_date_idx'),
+            # Case-insensitive title lookups; title__iexact compiles to
+            # UPPER("title") = UPPER(...) on PostgreSQL.
+            models.Index(Upper('title'), name='book_title_upper_idx'),
+        ]
+
+
+class BookInfoQuerySet(models.QuerySet):
+    """
+    Copies change through the ``CopyMovement`` ledger. Returns are only
+    appended and folded into ``copies`` later, so they never wait on the
+    row; checkouts are applied at once with a conditional UPDATE, since
+    only the row lock can stop two borrowers from taking the last copy.
+    Stock counts are rare and set the row directly. ``status`` is kept
+    true whenever copies plus pending movements are above zero.
+    """
+
+    def _take(self, book_id: int, count: int) -> bool:
+        return bool(self.filter(book_id=book_id, copies__gte=count).update(
+            copies=F('copies') - count,
+            status=Case(
+                When(copies__gt=count, then=Value(True)),
+                When(Exists(CopyMovement.objects.pending().filter(book_id=OuterRef('book_id'))), then=Value(True)),
+                default=Value(False),
+            ),
+            updated_at=timezone.now(),
+        ))
+
+    def reserve_copy(self, book_id: int, user_id: int = None, record: bool = True) -> bool:
+        """
+        Takes one copy of a book in a single conditional UPDATE and reports
+        whether one was available. The row lock taken by the UPDATE
+        serializes concurrent borrowers of the same title, and the
+        ``copies > 0`` condition is re-checked once the lock is granted, so
+        two requests can never both take the last copy. When the folded
+        count has run out, pending returns are folded in and the UPDATE
+        tried once more.
+
+        The checkout is recorded in the ledger unless ``record`` is false,
+        for callers that record many at once.
+        """
+        if not self._take(book_id, 1) and not (self.fold([book_id]) and self._take(book_id, 1)):
+            return False
+        if record:
+            CopyMovement.objects.using(self.db).create(
+                book_id=book_id, user_id=user_id, kind=CopyMovement.Kind.CHECKOUT, delta=-1, folded=True
+            )
+        return True
+
+    def release_copy(self, book_id: int, user_id: int = None) -> bool:
+        """
+        Puts one copy of a book back by appending a return to the ledger.
+        The info row is only written when the book was unavailable, to
+        flip its status.
+        """
+        CopyMovement.objects.using(self.db).create(
+            book_id=book_id, user_id=user_id, kind=CopyMovement.Kind.RETURN, delta=1
+        )
+        self.filter(book_id=book_id, status=False).update(status=True, updated_at=timezone.now())
+        return True
+
+    def set_copies(self, book_id: int, copies: int, user_id: int = None) -> None:
+        """
+        Sets the copies of a book after a stock count, recording the
+        difference as a restock or write-off.
+        """
+        with transaction.atomic(using=self.db):
+            self.fold([book_id])
+            current = self.select_for_update().values_list('copies', flat=True).get(book_id=book_id)
+            if copies == current:
+                return
+            self.filter(book_id=book_id).update(copies=copies, status=copies > 0, updated_at=timezone.now())
+            CopyMovement.objects.using(self.db).create(
+                book_id=book_id,
+                user_id=user_id,
+                kind=CopyMovement.Kind.RESTOCK if copies > current else CopyMovement.Kind.WRITEOFF,
+                delta=copies - current,
+                folded=True,
+            )
+
+    def fold(self, book_ids) -> int:
+        """
+        Adds the pending movements of ``book_ids`` into their copies and
+        marks them folded, returning how many were folded. The info rows
+        are locked first, in book id order, so a concurrent fold of the
+        same books waits and then finds nothing left to fold; returns
+        appended meanwhile are not locked out and wait for the next fold.
+        """
+        with transaction.atomic(using=self.db):
+            locked = list(
+                self.select_for_update().filter(book_id__in=book_ids)
+                .order_by('book_id').values_list('book_id', flat=True)
+            )
+            rows = list(
+                CopyMovement.objects.using(self.db).pending()
+                .filter(book_id__in=locked).values_list('pk', 'book_id', 'delta')
+            )
+            if not rows:
+                return 0
+            totals = Counter()
+            for _, book_id, delta in rows:
+                totals[book_id] += delta
+            # Pending movements only ever add copies, so every book folded
+            # here ends up available.
+            self.filter(book_id__in=totals).update(
+                copies=F('copies') + Case(
+                    *[When(book_id=book_id, then=Value(total)) for book_id, total in totals.items()],
+                    default=Value(0),
+                    output_field=models.PositiveSmallIntegerField(),
+                ),
+                status=True,
+                updated_at=timezone.now(),
+            )
+            ids = [pk for pk, _, _ in rows]
+            for start in range(0, len(ids), 500):
+                CopyMovement.objects.using(self.db).filter(pk__in=ids[start:start + 500]).update(folded=True)
+        return len(rows)
+
+    def with_pending(self):
+        """Annotates the copy movements not yet folded into ``copies``."""
+        return self.annotate(**pending_annotations('book_id'))
 
 
 class BookInfo(models.Model):
@@ -79,13 +243,26 @@ class BookInfo(models.Model):
         default=False,
         help_text="Availability status of the Book."
     )
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        help_text="Last time copies or status changed."
+    )
 
     def __str__(self) -> str:
         return f"{self.book.title}, copies: {self.copies}"
 
     def update_status(self) -> bool:
-        """Updates availability status based on copies."""
-        self.status = self.copies >= 1
+        """
+        Updates availability status based on copies, counting the returns
+        still pending in the ledger (read from ``with_pending()`` when the
+        row was loaded with it).
+        """
+        pending = getattr(self, 'pending_copies', None)
+        if pending is None and self.pk:
+            pending = CopyMovement.objects.pending().filter(book_id=self.book_id).aggregate(
+                total=Sum('delta')
+            )['total']
+        self.status = self.copies + (pending or 0) >= 1
         return self.status
 
     def update_book_copies_post_return(self) -> int:
@@ -103,10 +280,247 @@ class BookInfo(models.Model):
         self.update_status()
         return self.copies
 
+    @property
+    def available_copies(self) -> int:
+        """
+        Copies on the shelf: the folded count plus pending movements, when
+        the row was loaded with ``with_pending()``.
+        """
+        return self.copies + (getattr(self, 'pending_copies', None) or 0)
+
     def save(self, *args, **kwargs) -> None:
-        self.update_status()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'copies', 'status'} & set(update_fields):
+            self.update_status()
         super().save(*args, **kwargs)
 
+    objects = BookInfoQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # PositiveSmallIntegerField already implies this on most
+            # backends; spelled out so no backend can store an oversold title.
+            models.CheckConstraint(condition=Q(copies__gte=0), name='bookinfo_copies_non_negative'),
+        ]
+        indexes = [
+            # Available books ordered by copies (BookViewSet) and the keyset
+            # tie-breaker used when paging through them. Partial, so the
+            # planner needs no equality on status to read it in order.
+            models.Index(
+                fields=['-copies', '-book'], condition=Q(status=True), name='bookinfo_available_copies_idx'
+            ),
+        ]
+
+
+class CopyMovementQuerySet(models.QuerySet):
+
+    def pending(self):
+        return self.filter(folded=False)
+
+    def compact(self, chunk_size: int = 1000):
+        """
+        Folds every pending movement into ``BookInfo.copies``,
+        ``chunk_size`` books per transaction. Yields the number of
+        movements folded by each transaction.
+        """
+        while True:
+            book_ids = list(
+                self.pending().order_by('book_id').values_list('book_id', flat=True).distinct()[:chunk_size]
+            )
+            if not book_ids:
+                return
+            yield BookInfo.objects.using(self.db).fold(book_ids)
+
+
+class CopyMovement(models.Model):
+    """
+    Append-only ledger of every change to the copies of a book. Returns
+    stay pending until folded into ``BookInfo.copies``; checkouts,
+    restocks and write-offs are applied as they happen and recorded
+    already folded.
+    """
+    class Kind(models.TextChoices):
+        CHECKOUT = 'checkout', 'Checkout'
+        RETURN = 'return', 'Return'
+        RESTOCK = 'restock', 'Restock'
+        WRITEOFF = 'writeoff', 'Write-off'
+
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='movements',
+        help_text='Book whose copies changed.'
+    )
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='copymovements',
+        help_text='Patron or staff member behind the change, if any.'
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=Kind.choices,
+        help_text='What moved the copies.'
+    )
+    delta = models.SmallIntegerField(
+        help_text='Copies added (positive) or taken (negative).'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text='When the change happened.'
+    )
+    folded = models.BooleanField(
+        default=False,
+        help_text='Whether the change is included in BookInfo.copies yet.'
+    )
+
+    objects = CopyMovementQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.delta:+d} of book {self.book_id}"
+
+    class Meta:
+        indexes = [
+            # Pending movements of a book, read on every availability read
+            # and by compaction; small because folded rows drop out.
+            models.Index(fields=['book'], condition=Q(folded=False), name='movement_pending_book_idx'),
+            # A book's audit trail, newest first.
+            models.Index(fields=['book', '-created_at'], name='movement_book_created_idx'),
+        ]
+
+
+def pending_annotations(book_ref: str) -> dict:
+    """
+    ``pending_copies`` (the sum of a book's pending movements) and
+    ``pending_at`` (when the latest was made) as subqueries on the book
+    referenced by ``book_ref``.
+    """
+    pending = CopyMovement.objects.pending().filter(book_id=OuterRef(book_ref)).order_by().values('book_id')
+    return {
+        'pending_copies': Coalesce(Subquery(pending.annotate(total=Sum('delta')).values('total')), 0),
+        'pending_at': Subquery(pending.annotate(latest=Max('created_at')).values('latest')),
+    }
+
+
+class CheckOutQuerySet(models.QuerySet):
+
+    def return_and_archive(self, user_id: int, book_id: int) -> 'ArchivedCheckOut':
+        """
+        Returns the book ``book_id`` borrowed by ``user_id`` in one
+        transaction: locks the checkout found through the (user, book)
+        unique index, puts the copy back, writes the archive row and deletes
+        the checkout. Raises ``CheckOut.DoesNotExist`` if there is nothing
+        to return.
+
+        The delete skips the CheckOut delete signals, which would put the
+        copy back and archive the checkout a second time, so the user's
+        loan counters are updated here.
+        """
+        with transaction.atomic(using=self.db):
+            checkout_id, checkout_date, return_date, status = self.select_for_update().values_list(
+                'pk', 'checkout_date', 'return_date', 'status'
+            ).get(user_id=user_id, book_id=book_id)
+            BookInfo.objects.using(self.db).release_copy(book_id, user_id)
+            LibraryProfile.objects.using(self.db).add_user_loans(
+                user_id, active_loans=-1, overdue_loans=-(status == CheckOut.Status.OVERDUE)
+            )
+            archived = ArchivedCheckOut.objects.using(self.db).create(
+                book_id=book_id,
+                user_id=user_id,
+                checkout_date=checkout_date,
+                return_date=return_date or datetime.now().date()
+            )
+            self.filter(pk=checkout_id)._raw_delete(self.db)
+        return archived
+
+
+    def borrow_many(self, user, book_ids: list, atomic: bool = True) -> tuple:
+        """
+        Checks out several books to ``user`` in one transaction. Books are
+        read with one query, copies reserved with a conditional UPDATE each
+        (in book id order, so concurrent batches lock rows in the same
+        order), the checkouts and their ledger entries written with one
+        bulk insert each and the user's loan counters moved with one UPDATE.
+
+        With ``atomic`` nothing is borrowed unless every book can be;
+        otherwise every book that can be borrowed is. Returns
+        ``(checkouts, errors)``, both dicts keyed by book id.
+        """
+        books = Book.objects.using(self.db).select_related('info').in_bulk(book_ids)
+        borrowed = set(self.filter(user=user, book_id__in=book_ids).values_list('book_id', flat=True))
+        errors = {}
+        for book_id in book_ids:
+            if book_id not in books:
+                errors[book_id] = "Book not found."
+            elif book_id in borrowed:
+                errors[book_id] = "Book already borrowed."
+            elif not books[book_id].info.status:
+                errors[book_id] = "Book not available for checkout."
+        if atomic and errors:
+            return {}, errors
+
+        checkouts = {}
+        try:
+            with transaction.atomic(using=self.db):
+                for book_id in sorted(set(book_ids) - set(errors)):
+                    if not BookInfo.objects.using(self.db).reserve_copy(book_id, record=False):
+                        errors[book_id] = "No copies available for checkout."
+                        continue
+                    checkout = self.model(book=books[book_id], user=user)
+                    checkout.due_date = checkout.get_due_date()
+                    checkouts[book_id] = checkout
+                if atomic and errors:
+                    transaction.set_rollback(True, using=self.db)
+                    return {}, errors
+                self.bulk_create(checkouts.values())
+                CopyMovement.objects.using(self.db).bulk_create(
+                    CopyMovement(book_id=book_id, user=user, kind=CopyMovement.Kind.CHECKOUT, delta=-1, folded=True)
+                    for book_id in checkouts
+                )
+                LibraryProfile.objects.using(self.db).add_user_loans(
+                    user.pk, active_loans=len(checkouts), lifetime_loans=len(checkouts)
+                )
+        except IntegrityError:
+            # A concurrent request borrowed one of these books for the same user.
+            return {}, {**errors, **{book_id: "Book already borrowed." for book_id in checkouts}}
+        return checkouts, errors
+
+
+    def mark_overdue(self, as_of=None, chunk_size: int = 1000):
+        """
+        Flips pending checkouts due before ``as_of`` (today by default) to
+        overdue, ``chunk_size`` rows per UPDATE so no statement holds locks
+        on more rows than that, and adds them to their users' overdue
+        counters in the same transaction. Yields the number of rows each
+        UPDATE changed.
+
+        Each chunk is found through the (status, due_date) index and locked
+        before the UPDATE, which repeats the status condition, so runs that
+        overlap (or a return landing in between) never flip a row twice or
+        flip a row that is no longer pending. The counters are taken from
+        the rows read, so a chunk whose UPDATE changed fewer rows than that
+        (which the locks rule out, except on databases where
+        ``select_for_update`` locks nothing) is rolled back and read again.
+        """
+        as_of = as_of or datetime.now().date()
+        due = self.filter(status=CheckOut.Status.PENDING, due_date__lt=as_of).order_by()
+        while True:
+            with transaction.atomic(using=self.db):
+                rows = list(due.select_for_update().values_list('pk', 'user_id')[:chunk_size])
+                if not rows:
+                    return
+                count = due.filter(pk__in=[pk for pk, _ in rows]).update(status=CheckOut.Status.OVERDUE)
+                if count != len(rows):
+                    transaction.set_rollback(True, using=self.db)
+                    continue
+                overdue = Counter(user_id for _, user_id in rows)
+                LibraryProfile.objects.using(self.db).add_loans(
+                    {user_id: {'overdue_loans': n} for user_id, n in overdue.items()}
+                )
+            yield count
+
 
 class CheckOut(models.Model):
     """Tracks active book checkouts."""
@@ -149,12 +563,18 @@ class CheckOut(models.Model):
         help_text='Checkout status.'
     )
 
+    objects = CheckOutQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.book.title} borrowed by {self.user.email} on {self.checkout_date}"
 
     def get_due_date(self) -> datetime:
-        """Calculates due date based on a grace period."""
-        return self.checkout_date + timedelta(days=15)
+        """
+        Calculates due date based on a grace period. Before the first save
+        ``checkout_date`` is not set yet and today's date is used, which is
+        what ``auto_now_add`` will store.
+        """
+        return (self.checkout_date or datetime.now().date()) + timedelta(days=15)
 
     def can_checkout(self) -> None:
         """Validates if the book is available for checkout."""
@@ -177,23 +597,87 @@ class CheckOut(models.Model):
         else:
             raise ValueError(f"Invalid status: {status}")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+
+    def overdue_change(self) -> int:
+        """
+        1 if saving would make the loan overdue, -1 if it would stop being
+        overdue and 0 otherwise (or if the stored status is not known).
+        """
+        saved = getattr(self, '_saved_status', None)
+        if saved is None:
+            return 0
+        return (self.status == self.Status.OVERDUE) - (saved == self.Status.OVERDUE)
+
     def delete(self, *args, **kwargs):
         if self.status != self.Status.RETURNED:
             raise ValidationError("Book has not been returned.")
         super().delete(*args, **kwargs)
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            self.can_checkout()
-        super().save(*args, **kwargs)
+        if self.pk:
+            change = self.overdue_change()
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if change:
+                    LibraryProfile.objects.add_user_loans(self.user_id, overdue_loans=change)
+            self._saved_status = self.status
+            return
+        self.can_checkout()
+        if not self.due_date:
+            self.due_date = self.get_due_date()
+        # The post_save signal reserves a copy; if none is left by then the
+        # insert is rolled back with it.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._saved_status = self.status
 
     class Meta:
         unique_together = ['user', 'book']
-        
+        indexes = [
+            # Staff-wide list, newest first, with the keyset tie-breaker.
+            models.Index(fields=['-checkout_date', '-id'], name='checkout_date_idx'),
+            # A member's own checkouts, newest first.
+            models.Index(fields=['user', '-checkout_date'], name='checkout_user_date_idx'),
+            # Overdue sweeps: pending loans past their due date.
+            models.Index(fields=['status', 'due_date'], name='checkout_status_due_idx'),
+        ]
+
+
+class ArchivedCheckOutQuerySet(models.QuerySet):
+
+    def returned_in(self, month):
+        """
+        Checkouts returned in the month of ``month``, as a range on
+        ``return_date`` that PostgreSQL prunes to that month's partition.
+        """
+        start = month.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return self.filter(return_date__gte=start, return_date__lt=end)
+
+    def expire(self, before, chunk_size: int = 1000):
+        """
+        Deletes checkouts returned before ``before``, ``chunk_size`` rows
+        per DELETE found through the return date index. Yields the number
+        of rows each DELETE removed.
+        """
+        expired = self.filter(return_date__lt=before).order_by()
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                return
+            yield expired.filter(pk__in=ids)._raw_delete(self.db)
 
 
 class ArchivedCheckOut(models.Model):
-    """Tracks completed checkouts for archival purposes."""
+    """
+    Tracks completed checkouts for archival purposes. On PostgreSQL the
+    table is partitioned by return month (see ``api.archive``).
+    """
     book = models.ForeignKey(
         Book,
         on_delete=models.RESTRICT,
@@ -212,3 +696,217 @@ class ArchivedCheckOut(models.Model):
     return_date = models.DateField(
         help_text='Date of book return.'
     )
+
+    objects = ArchivedCheckOutQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Staff-wide history, most recent first, with the keyset tie-breaker.
+            models.Index(fields=['-return_date', '-id'], name='archived_return_date_idx'),
+            # A member's own history, most recent first.
+            models.Index(fields=['user', '-return_date'], name='archived_user_return_idx'),
+        ]
+
+
+class BookDailyStats(models.Model):
+    """Loans and returns of a book on one day."""
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        help_text='Book the counts are for.'
+    )
+    day = models.DateField(
+        help_text='Day the loans started or the returns happened.'
+    )
+    loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Checkouts of the book that day.'
+    )
+    returns = models.PositiveIntegerField(
+        default=0,
+        help_text='Returns of the book that day.'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'day'], name='book_daily_stats_unique'),
+        ]
+
+
+class BookStats(models.Model):
+    """All-time loans of a book."""
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        help_text='Book the count is for.'
+    )
+    loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Checkouts of the book.'
+    )
+
+    class Meta:
+        indexes = [
+            # Most borrowed titles.
+            models.Index(fields=['-loans', 'book'], name='book_stats_loans_idx'),
+        ]
+
+
+class UserMonthlyStats(models.Model):
+    """Loans of a user in one month."""
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='monthly_stats',
+        help_text='Patron the count is for.'
+    )
+    month = models.DateField(
+        help_text='First day of the month.'
+    )
+    loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Checkouts by the user that month.'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='user_monthly_stats_unique'),
+        ]
+
+
+class MonthlyStats(models.Model):
+    """Library-wide loans and returns in one month."""
+    month = models.DateField(
+        unique=True,
+        help_text='First day of the month.'
+    )
+    loans = models.PositiveIntegerField(
+        default=0,
+        help_text='Checkouts that month.'
+    )
+    returns = models.PositiveIntegerField(
+        default=0,
+        help_text='Returns that month.'
+    )
+
+
+class AuthorStats(models.Model):
+    """All-time loans of the books of an author."""
+    author = models.CharField(
+        max_length=75,
+        unique=True,
+        help_text='Author as spelled on the books.'
+    )
+    loans = models.PositiveIntegerField(
+        default=0,
+        help_text="Checkouts of the author's books."
+    )
+
+    class Meta:
+        indexes = [
+            # Busiest authors.
+            models.Index(fields=['-loans', 'author'], name='author_stats_loans_idx'),
+        ]
+
+
+class StatsWatermark(models.Model):
+    """
+    How far into the ``CopyMovement`` ledger the tables folded from it
+    (circulation statistics, recommendations) have been brought.
+    """
+    name = models.CharField(
+        max_length=50,
+        primary_key=True,
+        help_text='Name of the tables kept up to date.'
+    )
+    position = models.BigIntegerField(
+        default=0,
+        help_text='Id of the last movement folded in.'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text='When the tables were last brought up to date.'
+    )
+
+
+class BorrowedBook(models.Model):
+    """A book a user has borrowed at least once, whatever became of the checkout."""
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='borrowed_books',
+        help_text='Patron who borrowed the book.'
+    )
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='borrowers',
+        help_text='Book the patron borrowed.'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'book'], name='borrowed_book_unique'),
+        ]
+
+
+class CoBorrowing(models.Model):
+    """
+    One non-zero cell of the book-by-book co-occurrence matrix: how many
+    patrons borrowed both books. Every pair is stored both ways round, so
+    a book's row is read through the unique index.
+    """
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text='Book the row of the matrix is for.'
+    )
+    other = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text='Book borrowed by the same patrons.'
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        help_text='Patrons who borrowed both books.'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'other'], name='co_borrowing_unique'),
+        ]
+
+
+class SimilarBook(models.Model):
+    """
+    One of the books most often borrowed by the patrons of a book, kept
+    ranked from the co-occurrence matrix by ``api.similar``.
+    """
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='similar_books',
+        help_text='Book the recommendation is for.'
+    )
+    similar = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text='Book recommended with it.'
+    )
+    rank = models.PositiveSmallIntegerField(
+        help_text='Position among the recommendations, from 1.'
+    )
+    borrowed_together = models.PositiveIntegerField(
+        help_text='Patrons who borrowed both books.'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='similar_book_rank_unique'),
+        ]
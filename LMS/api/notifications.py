@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from api.models import BookInfo
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One client's stream of availability events. Events are handed over to
+    the client's event loop from whatever thread delivers them; a slow
+    client only ever holds ``maxsize`` events, dropping the oldest.
+    """
+
+    def __init__(self, book_ids, loop, maxsize: int = 100, user_id=None):
+        self.book_ids = frozenset(book_ids)
+        self.loop = loop
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, event: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def push(self, event: dict) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The client's loop is gone; it unsubscribes on its way out.
+            pass
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class AvailabilityHub:
+    """
+    In-process fan-out of book availability to subscribed clients.
+
+    ``deliver`` receives ids of books whose copies may have changed, reads
+    their current copies and status once for every client in this process
+    and pushes an event to each client watching a book whose state really
+    changed. Books nobody watches cost nothing.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.last = {}
+        self.streams = Counter()
+        self.started = False
+
+    def streams_of(self, user_id) -> int:
+        """The number of subscriptions ``user_id`` holds open in this process."""
+        with self.lock:
+            return self.streams[user_id]
+
+    def subscribe(self, book_ids, loop=None, user_id=None) -> Subscription:
+        subscription = Subscription(book_ids, loop or asyncio.get_running_loop(), user_id=user_id)
+        with self.lock:
+            if user_id is not None:
+                self.streams[user_id] += 1
+            for book_id in subscription.book_ids:
+                self.subscribers[book_id].add(subscription)
+            start = not self.started
+            self.started = True
+        if start:
+            get_broadcast().start(self)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            if subscription.user_id is not None:
+                self.streams[subscription.user_id] -= 1
+                if not self.streams[subscription.user_id]:
+                    del self.streams[subscription.user_id]
+            for book_id in subscription.book_ids:
+                watchers = self.subscribers.get(book_id)
+                if watchers is None:
+                    continue
+                watchers.discard(subscription)
+                if not watchers:
+                    del self.subscribers[book_id]
+                    self.last.pop(book_id, None)
+
+    def watched(self) -> list:
+        """Ids of the books someone in this process is watching."""
+        with self.lock:
+            return list(self.subscribers)
+
+    def deliver(self, book_ids) -> None:
+        with self.lock:
+            watched = {int(book_id) for book_id in book_ids if int(book_id) in self.subscribers}
+        if not watched:
+            return
+        for book_id, copies, status in snapshot(watched):
+            event = {'book': book_id, 'copies': copies, 'status': status}
+            with self.lock:
+                if self.last.get(book_id) == (copies, status):
+                    continue
+                self.last[book_id] = (copies, status)
+                watchers = list(self.subscribers.get(book_id, ()))
+            for subscription in watchers:
+                subscription.push(event)
+
+
+def snapshot(book_ids) -> list:
+    """Current ``(book_id, copies, status)`` of the given books."""
+    return list(
+        BookInfo.objects.with_pending().filter(book_id__in=book_ids)
+        .annotate(available=F('copies') + F('pending_copies'))
+        .order_by('book_id').values_list('book_id', 'available', 'status')
+    )
+
+
+class BaseBroadcast:
+    """
+    Carries "these books changed" messages between worker processes.
+
+    ``publish`` is called once a change is committed; ``start`` is called
+    the first time a client subscribes in a process and must arrange for
+    every published message, from any worker, to reach ``hub.deliver``.
+    """
+
+    def publish(self, book_ids: list) -> None:
+        raise NotImplementedError
+
+    def start(self, hub: AvailabilityHub) -> None:
+        """Starts receiving messages for ``hub``."""
+
+
+class LocalBroadcast(BaseBroadcast):
+    """
+    Delivers straight to this process's hub. Enough for a single worker
+    and for tests; with several workers each only sees its own changes.
+    """
+
+    def publish(self, book_ids: list) -> None:
+        hub.deliver(book_ids)
+
+
+class PostgresBroadcast(BaseBroadcast):
+    """
+    Broadcasts through PostgreSQL LISTEN/NOTIFY, so every worker sharing
+    the database hears every change. Listening uses a dedicated connection
+    on a daemon thread per process.
+    """
+    channel = 'book_availability'
+    max_backoff = 60
+
+    def publish(self, book_ids: list) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(list(book_ids))])
+
+    def start(self, hub: AvailabilityHub) -> None:
+        threading.Thread(target=self.listen, args=(hub,), daemon=True, name='availability-listener').start()
+
+    def listen(self, hub: AvailabilityHub) -> None:
+        """
+        Runs for the life of the process. When the connection fails it is
+        closed and opened again after a pause that doubles up to
+        ``max_backoff`` seconds. Notifications sent in between are lost, so
+        every watched book is read again once listening resumes.
+        """
+        backoff, reconnecting = 1, False
+        while True:
+            listener = None
+            try:
+                listener = connection.get_new_connection(connection.get_connection_params())
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                backoff = 1
+                if reconnecting:
+                    hub.deliver(hub.watched())
+                self.receive(listener, hub)
+            except Exception:
+                logger.exception('Availability listener failed, reconnecting in %ss', backoff)
+            finally:
+                if listener is not None:
+                    try:
+                        listener.close()
+                    except Exception:
+                        pass
+            reconnecting = True
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def receive(self, listener, hub: AvailabilityHub) -> None:
+        """Hands notifications on to ``hub`` until ``listener`` fails."""
+        while True:
+            if select.select([listener], [], [], 60) == ([], [], []):
+                continue
+            listener.poll()
+            changed = set()
+            while listener.notifies:
+                try:
+                    changed.update(json.loads(listener.notifies.pop(0).payload))
+                except ValueError:
+                    logger.warning('Ignoring malformed availability notification')
+            try:
+                hub.deliver(changed)
+            except Exception:
+                logger.exception('Failed to deliver availability changes')
+
+
+_broadcast = None
+
+
+def get_broadcast() -> BaseBroadcast:
+    """
+    Returns the broadcast named by ``AVAILABILITY_BROADCAST`` (a dotted
+    path), ``LocalBroadcast`` by default. One instance per process.
+    """
+    global _broadcast
+    if _broadcast is None:
+        path = getattr(settings, 'AVAILABILITY_BROADCAST', None)
+        _broadcast = import_string(path)() if path else LocalBroadcast()
+    return _broadcast
+
+
+def notify_availability(*book_ids) -> None:
+    """
+    Tells subscribers, in every worker, that the copies of these books may
+    have changed. Sent once the surrounding transaction commits so the new
+    values are visible when they are read.
+    """
+    if book_ids:
+        transaction.on_commit(lambda: get_broadcast().publish(list(book_ids)))
+
+
+def format_event(event: dict) -> str:
+    """Renders an event as a Server-Sent Events message."""
+    return f"id: {event['book']}\nevent: availability\ndata: {json.dumps(event)}\n\n"
+
+
+hub = AvailabilityHub()
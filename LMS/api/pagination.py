@@ -0,0 +1,179 @@
+import base64
+import json
+from functools import reduce
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(pagination.PageNumberPagination):
+    """
+    Page number pagination that switches to keyset (cursor) pagination when
+    the client asks for it with ``?pagination=cursor`` or sends a ``cursor``.
+
+    Keyset pages filter on the ordering values of the last row seen instead
+    of counting and offsetting, so page 1000 costs the same single query as
+    page 1. ``keyset_ordering`` must end in a unique tie-breaker and none of
+    its fields may be null.
+    """
+    keyset_ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def use_keyset(self, request) -> bool:
+        params = request.query_params
+        return self.cursor_query_param in params or params.get(self.mode_query_param) == 'cursor'
+
+    def follows_keyset(self, queryset) -> bool:
+        """
+        Whether ``queryset`` is unordered or ordered by the start of the
+        keyset ordering. Lists in another order, such as search results
+        by relevance or ``?ordering=``, keep numbered pages, since keyset
+        pages would re-sort them.
+        """
+        ordering = tuple(getattr(getattr(queryset, 'query', None), 'order_by', ()))
+        return ordering == tuple(self.keyset_ordering[:len(ordering)])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request) and self.follows_keyset(queryset)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+
+        # One extra row tells us whether there is another page this way.
+        rows = self.fetch(queryset, cursor['v'] if cursor else None, reverse, page_size + 1)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else bool(cursor)
+        self.has_previous = bool(cursor) if not reverse else has_more
+        return rows
+
+    def fetch(self, queryset, values, reverse: bool, limit: int) -> list:
+        """
+        Up to ``limit`` rows after the position ``values`` in keyset order
+        (before it when ``reverse``, nearest first), or from the start when
+        there is no position yet.
+        """
+        ordering = self.keyset_ordering
+        if reverse:
+            ordering = [self.flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.keyset_filter(values, reverse))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return list(queryset[:limit])
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def flip(field: str) -> str:
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def keyset_filter(self, values: list, reverse: bool) -> Q:
+        """
+        Rows strictly after ``values`` in keyset order, expanded as
+        ``a > x OR (a = x AND b > y) OR ...`` with per-field direction.
+        """
+        clauses = []
+        for index, field in enumerate(self.keyset_ordering):
+            descending = field.startswith('-') != reverse
+            name = field.lstrip('-')
+            lookup = 'lt' if descending else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for previous, value in zip(self.keyset_ordering[:index], values[:index]):
+                clause &= Q(**{previous.lstrip('-'): value})
+            clauses.append(clause)
+        return reduce(lambda left, right: left | right, clauses)
+
+    def position(self, row) -> list:
+        return [
+            attrgetter(field.lstrip('-').replace('__', '.'))(row)
+            for field in self.keyset_ordering
+        ]
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        payload = json.dumps({'v': self.position(row), 'r': int(reverse)}, cls=DjangoJSONEncoder)
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.base_url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            if len(cursor['v']) != len(self.keyset_ordering):
+                raise ValueError
+            cursor['r'] = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+
+class BookPagination(KeysetPagination):
+    """Books by available copies, most first."""
+    keyset_ordering = ('-info__copies', '-info__book_id')
+
+
+class CheckOutPagination(KeysetPagination):
+    """Active checkouts, newest first."""
+    keyset_ordering = ('-checkout_date', '-id')
+
+
+class TransactionHistoryPagination(KeysetPagination):
+    """
+    Archived checkouts, most recently returned first, including the frozen
+    ones when the view hands over a ``TieredHistory``.
+    """
+    keyset_ordering = ('-return_date', '-id')
+
+    def fetch(self, queryset, values, reverse: bool, limit: int) -> list:
+        if not hasattr(queryset, 'page_after'):
+            return super().fetch(queryset, values, reverse, limit)
+        hot = super().fetch(queryset.queryset, values, reverse, limit)
+        try:
+            return queryset.page_after(hot, values, reverse, limit)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
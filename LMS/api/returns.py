@@ -0,0 +1,157 @@
+from collections import Counter, defaultdict
+from datetime import date
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import LibraryProfile
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut, CopyMovement, canonical_isbn13
+from api.cache import book_fragments
+from api.notifications import notify_availability
+
+
+def parse_line(line: str) -> dict:
+    """
+    Turns one line of a return file into an item: ``user_id,book_id`` or a
+    book barcode (the ISBN printed on it).
+    """
+    fields = [field.strip() for field in line.split(',')]
+    if len(fields) == 2:
+        return {'user': fields[0], 'book': fields[1]}
+    return {'barcode': line.strip()}
+
+
+class ReturnProcessor:
+    """
+    Returns many checkouts set-wise. Each chunk of items is handled in one
+    transaction with a fixed number of statements whatever its size: the
+    matching checkouts are read (and locked) with one SELECT, the copies
+    put back with one bulk INSERT into the copy ledger (and one UPDATE
+    making unavailable books available again), archive rows written with
+    one bulk INSERT, the checkouts removed with one DELETE and the patrons'
+    loan counters moved with one UPDATE.
+
+    An item is either ``{"user": id, "book": id}`` or ``{"barcode": isbn}``.
+    A barcode only identifies the book, so it is returned for whoever has
+    it borrowed and reported as ambiguous if several patrons do. Items that
+    cannot be returned are reported with their position and do not stop
+    the rest.
+    """
+
+    def __init__(self, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+        self.returned = 0
+        self.errors = []
+
+    def run(self, items) -> dict:
+        items = enumerate(items, start=1)
+        while chunk := list(islice(items, self.chunk_size)):
+            self.process(chunk)
+        return {
+            'returned': self.returned,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda error: error['item']),
+        }
+
+    def fail(self, index: int, error: str) -> None:
+        self.errors.append({'item': index, 'error': error})
+
+    def normalize(self, chunk: list) -> list:
+        """Validates items into ``(index, user_id, book_id, isbn13)``."""
+        normalized = []
+        for index, item in chunk:
+            if not isinstance(item, dict):
+                self.fail(index, "Expected an object with user and book, or barcode.")
+            elif item.get('barcode'):
+                isbn13 = canonical_isbn13(str(item['barcode']).replace('-', '').strip())
+                if isbn13:
+                    normalized.append((index, None, None, isbn13))
+                else:
+                    self.fail(index, "Barcode is not a valid ISBN.")
+            else:
+                try:
+                    normalized.append((index, int(item['user']), int(item['book']), None))
+                except (KeyError, TypeError, ValueError):
+                    self.fail(index, "Expected an object with user and book, or barcode.")
+        return normalized
+
+    def process(self, chunk: list) -> None:
+        items = self.normalize(chunk)
+        isbns = {isbn13 for _, _, _, isbn13 in items if isbn13}
+        books_by_isbn = dict(
+            Book.objects.filter(isbn13__in=isbns).values_list('isbn13', 'pk')
+        ) if isbns else {}
+
+        # Only the exact pairs given: other loans of the same patrons or of
+        # the same books are not locked. Rows are locked in primary key order.
+        pairs = sorted({(user_id, book_id) for _, user_id, book_id, _ in items if user_id is not None})
+        lookup = reduce(
+            or_, (Q(user_id=user_id, book_id=book_id) for user_id, book_id in pairs),
+            Q(book_id__in=sorted(set(books_by_isbn.values())))
+        )
+
+        with transaction.atomic():
+            rows = CheckOut.objects.select_for_update().filter(lookup).order_by('pk').values_list(
+                'pk', 'user_id', 'book_id', 'checkout_date', 'return_date', 'status'
+            )
+
+            by_pair = {}
+            by_book = defaultdict(list)
+            for row in rows:
+                by_pair[(row[1], row[2])] = row
+                by_book[row[2]].append(row)
+
+            matched = {}
+            for index, user_id, book_id, isbn13 in items:
+                if isbn13:
+                    if isbn13 not in books_by_isbn:
+                        self.fail(index, "No book with this barcode.")
+                        continue
+                    candidates = [row for row in by_book[books_by_isbn[isbn13]] if row[0] not in matched]
+                    if len(candidates) > 1:
+                        self.fail(index, "Several patrons have this book; give the user as well.")
+                        continue
+                    row = candidates[0] if candidates else None
+                else:
+                    row = by_pair.get((user_id, book_id))
+                if row is None or row[0] in matched:
+                    self.fail(index, "No active checkout to return.")
+                    continue
+                matched[row[0]] = row
+
+            if not matched:
+                return
+            self.write(list(matched.values()))
+
+    def write(self, rows: list) -> None:
+        today = date.today()
+        books = {book_id for _, _, book_id, _, _, _ in rows}
+        CopyMovement.objects.bulk_create(
+            CopyMovement(user_id=user_id, book_id=book_id, kind=CopyMovement.Kind.RETURN, delta=1)
+            for _, user_id, book_id, _, _, _ in rows
+        )
+        BookInfo.objects.filter(book_id__in=books, status=False).update(status=True, updated_at=timezone.now())
+        ArchivedCheckOut.objects.bulk_create(
+            ArchivedCheckOut(
+                user_id=user_id,
+                book_id=book_id,
+                checkout_date=checkout_date,
+                return_date=return_date or today,
+            )
+            for _, user_id, book_id, checkout_date, return_date, _ in rows
+        )
+        # Deleted without the CheckOut delete signals, which would put the
+        # copies back and archive every row a second time.
+        CheckOut.objects.filter(pk__in=[row[0] for row in rows])._raw_delete(CheckOut.objects.db)
+        loans = defaultdict(Counter)
+        for _, user_id, _, _, _, status in rows:
+            loans[user_id]['active_loans'] -= 1
+            loans[user_id]['overdue_loans'] -= status == CheckOut.Status.OVERDUE
+        LibraryProfile.objects.add_loans(loans)
+        book_fragments.invalidate(*books)
+        notify_availability(*books)
+        self.returned += len(rows)
@@ -0,0 +1,224 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+from api.models import Book
+
+# Only word characters ever reach the database query syntax, so user input
+# cannot inject FTS5/tsquery operators.
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query: str) -> list:
+    """Splits a raw search string into lower case search terms."""
+    return [token.lower() for token in TOKEN_RE.findall(query or '')]
+
+
+def isbn_search_key(isbn: str) -> str:
+    """Strips separators from an ISBN so '0-8436-1072-7' indexes as one term."""
+    return re.sub(r'[^0-9Xx]', '', isbn or '')
+
+
+class BaseSearchBackend:
+    """
+    Interface for catalog search backends.
+
+    A backend keeps whatever storage it needs (created by a migration, see
+    ``0008_catalog_search_storage``) in sync through
+    ``index_book``/``remove_book`` and turns a search string into a
+    filtered, ranked Book queryset in ``search``.
+    """
+    rank_annotation = 'search_rank'
+
+    def index_book(self, book: Book) -> None:
+        """Adds or refreshes a single book in the index."""
+
+    def index_books(self, books) -> None:
+        """Adds or refreshes a batch of books in the index."""
+        for book in books:
+            self.index_book(book)
+
+    def remove_book(self, book_id: int) -> None:
+        """Removes a single book from the index."""
+
+    def clear(self) -> None:
+        """Empties the index."""
+
+    def rebuild(self, queryset=None, batch_size: int = 1000) -> int:
+        """Re-indexes every book in ``queryset``. Returns the number indexed."""
+        queryset = Book.objects.all() if queryset is None else queryset
+        self.clear()
+        count = 0
+        batch = []
+        for book in queryset.only('pk', 'title', 'author', 'ISBN').iterator(chunk_size=batch_size):
+            batch.append(book)
+            if len(batch) == batch_size:
+                self.index_books(batch)
+                count += len(batch)
+                batch = []
+        self.index_books(batch)
+        return count + len(batch)
+
+    def search(self, queryset, query: str):
+        raise NotImplementedError
+
+
+class SubstringSearchBackend(BaseSearchBackend):
+    """
+    Portable fallback matching every term against title, author or ISBN
+    with ``icontains``. This is what DRF's SearchFilter does; it needs no
+    extra storage but cannot use an index and does not rank results.
+    """
+
+    def search(self, queryset, query: str):
+        for term in tokenize(query):
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(author__icontains=term) | Q(ISBN__icontains=term)
+            )
+        return queryset
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    Full-text search on an FTS5 virtual table keyed by the book id.
+
+    Results are ranked with bm25, weighting title over author over ISBN.
+    Every search term is matched as a prefix so partially typed words work.
+    """
+    table = 'api_book_fts'
+    weights = (10.0, 5.0, 1.0)
+
+    def index_book(self, book: Book) -> None:
+        self.index_books([book])
+
+    def index_books(self, books) -> None:
+        books = list(books)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [[book.pk] for book in books]
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, author, isbn) VALUES (%s, %s, %s, %s)",
+                [[book.pk, book.title, book.author, isbn_search_key(book.ISBN)] for book in books]
+            )
+
+    def remove_book(self, book_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [book_id])
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def build_query(self, terms: list) -> str:
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query: str):
+        terms = tokenize(query)
+        if not terms:
+            return queryset
+        match = self.build_query(terms)
+        book_id = f'"{Book._meta.db_table}"."id"'
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        ).annotate(**{
+            # bm25 scores are negative, the best match has the lowest score.
+            self.rank_annotation: RawSQL(
+                f"SELECT bm25({self.table}, {weights}) FROM {self.table} "
+                f"WHERE {self.table} MATCH %s AND rowid = {book_id}",
+                [match]
+            )
+        }).order_by(self.rank_annotation, *queryset.query.order_by)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Full-text search on a ``tsvector`` side table with a GIN index.
+
+    The document is weighted title (A), author (B), ISBN (C) and ranked
+    with ``ts_rank``. Terms are matched as prefixes.
+    """
+    table = 'api_book_search'
+    config = 'simple'
+
+    def index_book(self, book: Book) -> None:
+        self.index_books([book])
+
+    def index_books(self, books) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (book_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'C')) "
+                "ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document",
+                [[book.pk, book.title, book.author, isbn_search_key(book.ISBN)] for book in books]
+            )
+
+    def remove_book(self, book_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE book_id = %s", [book_id])
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def build_query(self, terms: list) -> str:
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def search(self, queryset, query: str):
+        terms = tokenize(query)
+        if not terms:
+            return queryset
+        tsquery = self.build_query(terms)
+        book_id = f'"{Book._meta.db_table}"."id"'
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT book_id FROM {self.table} "
+                f"WHERE document @@ to_tsquery('{self.config}', %s)",
+                [tsquery]
+            )
+        ).annotate(**{
+            self.rank_annotation: RawSQL(
+                f"SELECT ts_rank(document, to_tsquery('{self.config}', %s)) "
+                f"FROM {self.table} WHERE book_id = {book_id}",
+                [tsquery]
+            )
+        }).order_by(f'-{self.rank_annotation}', *queryset.query.order_by)
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend() -> BaseSearchBackend:
+    """
+    Returns the configured search backend. ``CATALOG_SEARCH_BACKEND`` may name
+    a backend class by dotted path; otherwise one is picked for the database
+    vendor, falling back to substring matching.
+    """
+    path = getattr(settings, 'CATALOG_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, SubstringSearchBackend)()
+
+
+class CatalogSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for DRF's SearchFilter that delegates to the
+    catalog search backend and orders results by relevance.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not tokenize(query):
+            return queryset
+        return get_search_backend().search(queryset, query)
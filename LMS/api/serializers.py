@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut, canonical_isbn13
+from api.cache import book_fragments
+from api.notifications import notify_availability
 
 import isbnlib
 from datetime import datetime
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 from rest_framework import status
 
@@ -31,9 +34,10 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Book
         fields = [
-            'url', 'title', 'author', 'ISBN', 'published_date',
+            'url', 'title', 'author', 'ISBN', 'isbn13', 'published_date',
             'book_copies', 'can_checkout', 'book_info'
         ]
+        read_only_fields = ['isbn13']
 
     def validate_book_copies(self, value):
         """
@@ -45,10 +49,17 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
 
     def validate_ISBN(self, value):
         """
-        Validates the ISBN to ensure it is either a valid ISBN-10 or ISBN-13.
+        Validates the ISBN to ensure it is either a valid ISBN-10 or ISBN-13
+        and that no other book has the same ISBN in another form.
         """
         if not (isbnlib.is_isbn13(value) or isbnlib.is_isbn10(value)):
             raise serializers.ValidationError(f"The ISBN {value} is invalid.")
+
+        duplicates = Book.objects.filter(isbn13=canonical_isbn13(value))
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(f"A book with the ISBN {value} already exists.")
         return value
 
     def validate_published_date(self, value):
@@ -67,9 +78,8 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
         instance = super().create(validated_data)
 
         if extra_info:
-            book_info = BookInfo.objects.get(book=instance)
-            book_info.copies = extra_info['copies']
-            book_info.save()
+            BookInfo.objects.set_copies(instance.pk, extra_info['copies'], self.user_id())
+            instance.info.refresh_from_db()
 
         return instance
 
@@ -84,14 +94,65 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
             setattr(instance, field, value)
 
         # Update book_info if provided
-        if extra_info:
-            book_info = BookInfo.objects.get(book=instance)
-            book_info.copies = extra_info.get('copies', book_info.copies)
-            book_info.save()
+        if extra_info and 'copies' in extra_info:
+            BookInfo.objects.set_copies(instance.pk, extra_info['copies'], self.user_id())
+            instance.info.refresh_from_db()
 
         instance.save()
         return instance
 
+    def user_id(self):
+        request = self.context.get('request')
+        return request.user.pk if request is not None and request.user.is_authenticated else None
+
+    def to_representation(self, instance):
+        """
+        ``book_copies`` includes returns not yet folded into the stored
+        count when the book was loaded with ``with_pending()``.
+        """
+        data = super().to_representation(instance)
+        pending = getattr(instance, 'pending_copies', None)
+        if pending and data.get('book_copies') is not None:
+            data['book_copies'] += pending
+        return data
+
+
+class ISBNLookupSerializer(serializers.Serializer):
+    """
+    Validates a batch of ISBNs to resolve to books.
+    """
+    isbns = serializers.ListField(
+        child=serializers.CharField(max_length=32),
+        allow_empty=False,
+        max_length=500
+    )
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    """
+    Validates the search box text and result count of an autocomplete query.
+    """
+    q = serializers.CharField(max_length=100, allow_blank=True, trim_whitespace=False)
+    limit = serializers.IntegerField(min_value=1, max_value=25, default=10)
+
+
+class ExportFilterSerializer(serializers.Serializer):
+    """
+    Validates the output type and filters of a data export.
+    """
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    status = serializers.CharField(required=False)
+
+    def validate_status(self, value):
+        statuses = self.context.get('statuses', [])
+        if value not in statuses:
+            raise serializers.ValidationError(
+                f"Status must be one of: {', '.join(statuses) or 'none for this export'}."
+            )
+        return value
+
 
 class BookInfoSerializer(serializers.HyperlinkedModelSerializer):
     """
@@ -115,6 +176,41 @@ class BookInfoSerializer(serializers.HyperlinkedModelSerializer):
             "url": {"view_name": "bookinfo-detail", "lookup_field": "pk"}
         }
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['copies'] = instance.available_copies
+        return data
+
+    def update(self, instance, validated_data):
+        """
+        A new ``copies`` value is a stock count: it goes through the copy
+        ledger as a restock or write-off rather than overwriting the row.
+        """
+        copies = validated_data.pop('copies', None)
+        if copies is not None:
+            request = self.context.get('request')
+            BookInfo.objects.set_copies(instance.book_id, copies, request.user.pk if request else None)
+            instance.refresh_from_db()
+            book_fragments.invalidate(instance.book_id)
+            notify_availability(instance.book_id)
+        if validated_data:
+            return super().update(instance, validated_data)
+        return instance
+
+
+class BookField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves a book id to a Book with its info joined in. A view that has
+    already loaded the book can pass it as ``context['book']`` and it is
+    reused instead of fetched again.
+    """
+
+    def to_internal_value(self, data):
+        book = self.context.get('book')
+        if book is not None and str(book.pk) == str(data):
+            return book
+        return super().to_internal_value(data)
+
 
 class CheckOutSerializer(serializers.ModelSerializer):
     """
@@ -122,6 +218,7 @@ class CheckOutSerializer(serializers.ModelSerializer):
     Manages the borrowing process of books.
     """
 
+    book = BookField(queryset=Book.objects.select_related('info'))
     book_title = serializers.ReadOnlyField(source='book.title')
     user = serializers.ReadOnlyField(source='user.email')
 
@@ -136,13 +233,10 @@ class CheckOutSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         """
-        Ensures the book is available for checkout and checks if the user has already checked out the book.
+        Ensures the book is available for checkout. The book comes from
+        ``BookField`` with its info already loaded.
         """
-        book_id = attrs['book']  # Get the book ID
-        try:
-            book = Book.objects.get(id=book_id.id)  # Retrieve the Book instance
-        except Book.DoesNotExist:
-            raise serializers.ValidationError({"book": "Sorry, the book does not exist."})
+        book = attrs['book']
 
         # Check if the book is available
         if not book.info.status:
@@ -154,14 +248,11 @@ class CheckOutSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """
-        Overrides the create method to handle book instance and ensure the book exists.
+        Inserts the checkout, with its due date already set, and reserves a
+        copy in the same transaction (see ``CheckOut.save``).
         """
-        book_id = validated_data.pop('book')  # Get the book ID
-        user = validated_data['user']  # Get the user
-        try:
-            book_instance = Book.objects.get(id=book_id.id)  
-        except Book.DoesNotExist:
-            raise serializers.ValidationError({"book": "Sorry, the book does not exist."})
+        book_instance = validated_data.pop('book')
+        user = validated_data['user']
 
         # Attempt to create the checkout instance
         try:
@@ -173,6 +264,11 @@ class CheckOutSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"checkout": "Sorry You might have borrowed this Book already."}
             )
+        except DjangoValidationError:
+            # The last copy went to a concurrent borrower after validate().
+            raise serializers.ValidationError(
+                {"book": f"The book '{book_instance.title}' is currently unavailable for checkout."}
+            )
         return checkout_instance
 
 
@@ -230,6 +326,63 @@ class CheckOutSerializer(serializers.ModelSerializer):
     
     
     
+
+class BatchCheckOutSerializer(serializers.Serializer):
+    """
+    Validates a batch of book ids to borrow in one request.
+    """
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=50
+    )
+    atomic = serializers.BooleanField(
+        default=True,
+        help_text="Borrow every book or none of them. Set to false to borrow whatever is available."
+    )
+
+    def validate_books(self, value):
+        # Keep the first occurrence of each id, in the order given.
+        return list(dict.fromkeys(value))
+
+
+class BatchReturnSerializer(serializers.Serializer):
+    """
+    Accepts a batch of returns: ``{"user": id, "book": id}`` pairs or
+    ``{"barcode": isbn}`` items. Items are checked one by one when they are
+    processed so a bad item does not reject the whole batch.
+    """
+    items = serializers.ListField(
+        child=serializers.JSONField(),
+        allow_empty=False,
+        max_length=5000
+    )
+
+
+class StatsFilterSerializer(serializers.Serializer):
+    """
+    Validates the size of the circulation statistics lists.
+    """
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=10,
+        help_text="Number of titles and authors to list."
+    )
+    months = serializers.IntegerField(
+        min_value=1, max_value=120, default=12,
+        help_text="Number of recent months to list."
+    )
+
+
+class HistoryFilterSerializer(serializers.Serializer):
+    """
+    Validates the filters of the checkout history list.
+    """
+    month = serializers.DateField(
+        input_formats=['%Y-%m'],
+        required=False,
+        help_text="Only checkouts returned in this month (YYYY-MM)."
+    )
+
 
 class TransactionHistorySerializer(serializers.ModelSerializer):
     """
@@ -1,19 +1,76 @@
 from django.dispatch import receiver
 from django.db.models.signals import post_save, pre_delete, post_delete, pre_save
+from accounts.models import LibraryProfile
 from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
-from django.core.exceptions import MultipleObjectsReturned
+from api.search import get_search_backend
+from api.cache import book_fragments
+from api.autocomplete import book_autocomplete
+from api.notifications import notify_availability
+from django.db import transaction
+from django.core.exceptions import ValidationError
 
 @receiver(post_save, sender=Book)
 def create_or_update_book_info(sender, instance, created, **kwargs):
     """
-    A signal to create a book info entry after a book was created
+    A signal to create a book info entry after a book was created. On
+    later saves only ``updated_at`` is written: copies and status change
+    through the copy ledger, and writing back the loaded row could undo
+    a checkout or return made meanwhile.
     """
     if created:
         BookInfo.objects.get_or_create(
             book=instance
             )
     elif hasattr(instance, 'info'):
-        instance.info.save()
+        instance.info.save(update_fields=['updated_at'])
+
+@receiver(post_save, sender=Book)
+def index_book_for_search(sender, instance, **kwargs):
+    """
+    Keep the catalog search index in step with the saved book
+    """
+    get_search_backend().index_book(instance)
+
+@receiver(post_delete, sender=Book)
+def remove_book_from_search(sender, instance, **kwargs):
+    """
+    Drop a deleted book from the catalog search index
+    """
+    get_search_backend().remove_book(instance.pk)
+
+@receiver(post_save, sender=Book)
+def add_book_to_autocomplete(sender, instance, **kwargs):
+    """
+    Refresh the book's autocomplete entry once the save is committed
+    """
+    entry = (instance.pk, instance.title, instance.author)
+    transaction.on_commit(lambda: book_autocomplete.add([entry]))
+
+@receiver(post_delete, sender=Book)
+def remove_book_from_autocomplete(sender, instance, **kwargs):
+    """
+    Drop a deleted book from autocomplete once the delete is committed
+    """
+    pk = instance.pk
+    transaction.on_commit(lambda: book_autocomplete.remove(pk))
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_fragment(sender, instance, **kwargs):
+    """
+    Drop the cached representation of a saved or deleted book
+    """
+    book_fragments.invalidate(instance.pk)
+
+@receiver(post_save, sender=BookInfo)
+@receiver(post_delete, sender=BookInfo)
+def invalidate_book_info_fragment(sender, instance, **kwargs):
+    """
+    Book representations embed copies and status, so drop the cached
+    representation of the book whenever its info changes
+    """
+    book_fragments.invalidate(instance.book_id)
+    notify_availability(instance.book_id)
 
 @receiver(post_save, sender=CheckOut)
 def set_due_date(sender, instance, **kwargs):
@@ -30,22 +87,19 @@ def update_book_copies_and_status(sender, instance, created, **kwargs):
     A signal to update the number of book copies available post_checkout
     """
     if created:
-        borrowed_book_info = BookInfo.objects.get(
-            book = instance.book
-        )
-        borrowed_book_info.update_book_copies_post_checkout()
-        borrowed_book_info.save()
+        if not BookInfo.objects.reserve_copy(instance.book_id, instance.user_id):
+            raise ValidationError("No copies available for checkout.")
+        book_fragments.invalidate(instance.book_id)
+        notify_availability(instance.book_id)
 
 @receiver(pre_delete, sender=CheckOut)
 def update_book_copies_pre_delete_return(sender, instance, using, origin, **kwargs):
     """
     This signal updates the copies of a book once it is returned
     """
-    borrowed_book_info = BookInfo.objects.get(
-        book = instance.book
-    )
-    borrowed_book_info.update_book_copies_post_return()
-    borrowed_book_info.save()
+    BookInfo.objects.release_copy(instance.book_id, instance.user_id)
+    book_fragments.invalidate(instance.book_id)
+    notify_availability(instance.book_id)
 
 @receiver(pre_delete, sender= CheckOut)
 def create_archived_checkout(sender, instance, using, origin, **kwargs):
@@ -53,26 +107,34 @@ def create_archived_checkout(sender, instance, using, origin, **kwargs):
     Create entries in Archived Checkout Model Table post deletion
     """
     ArchivedCheckOut.objects.create(
-        book = instance.book,
-        user = instance.user,
+        book_id = instance.book_id,
+        user_id = instance.user_id,
         checkout_date = instance.checkout_date,
         return_date = instance.return_date
     )
 
-@receiver(post_delete, sender= CheckOut)
-def confirm_archived_checkout_instance(sender, instance, **kwargs):
-    try:
-        ArchivedCheckOut.objects.get_or_create(
-        book = instance.book,
-        user = instance.user,
-        checkout_date = instance.checkout_date,
-        return_date = instance.return_date    
-    )
-    except MultipleObjectsReturned:
-        ArchivedCheckOut.objects.filter(
-            book = instance.book,
-            user = instance.user,
-            checkout_date = instance.checkout_date,
-            return_date = instance.return_date           
-        ).first()
+@receiver(post_save, sender=CheckOut)
+def count_new_loan(sender, instance, created, **kwargs):
+    """
+    Add a new checkout to the user's loan counters, in its transaction
+    """
+    if created:
+        LibraryProfile.objects.add_user_loans(
+            instance.user_id,
+            active_loans=1,
+            lifetime_loans=1,
+            overdue_loans=instance.status == CheckOut.Status.OVERDUE,
+        )
 
+@receiver(pre_delete, sender=CheckOut)
+def count_ended_loan(sender, instance, using, origin, **kwargs):
+    """
+    Take a removed checkout off the user's loan counters, going by the
+    status it was stored with
+    """
+    status = getattr(instance, '_saved_status', None) or instance.status
+    LibraryProfile.objects.using(using).add_user_loans(
+        instance.user_id,
+        active_loans=-1,
+        overdue_loans=-(status == CheckOut.Status.OVERDUE),
+    )
@@ -0,0 +1,141 @@
+import heapq
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.coldstore import get_cold_store
+from api.models import (
+    ArchivedCheckOut, BorrowedBook, CheckOut, CoBorrowing, CopyMovement, SimilarBook, StatsWatermark,
+)
+from api.stats import SETTLE, add
+
+WATERMARK = 'similar'
+
+# Recommendations kept per book.
+TOP_K = 10
+
+
+def co_occurrences(fresh: list, seen, matrix: Counter) -> None:
+    """
+    Adds to ``matrix`` the pairs a patron's newly borrowed books ``fresh``
+    make with each other and with the books ``seen`` before, both ways.
+    """
+    for index, book_id in enumerate(fresh):
+        for other in chain(seen, fresh[:index]):
+            matrix[book_id, other] += 1
+            matrix[other, book_id] += 1
+
+
+def record(borrowed: dict) -> set:
+    """
+    Adds the books in ``borrowed`` (``{user_id: {book_id, ...}}``) that the
+    patrons had not borrowed before to ``BorrowedBook`` and their pairs to
+    the co-occurrence matrix, a SELECT and bulk writes for the whole
+    batch. Returns the books whose row of the matrix changed.
+
+    A patron borrowing a book again adds nothing, so folding the same
+    checkout twice is harmless.
+    """
+    seen = defaultdict(set)
+    for user_id, book_id in BorrowedBook.objects.filter(user_id__in=borrowed).values_list('user_id', 'book_id'):
+        seen[user_id].add(book_id)
+    matrix = Counter()
+    new = []
+    for user_id, books in borrowed.items():
+        fresh = sorted(books - seen[user_id])
+        co_occurrences(fresh, seen[user_id], matrix)
+        new.extend(BorrowedBook(user_id=user_id, book_id=book_id) for book_id in fresh)
+    BorrowedBook.objects.bulk_create(new)
+    add(CoBorrowing, ('book_id', 'other_id'), {key: {'count': n} for key, n in matrix.items()})
+    return {book_id for book_id, _ in matrix}
+
+
+def rank_neighbours(book_ids, top_k: int = TOP_K, batch_size: int = 200) -> None:
+    """
+    Rewrites the ``top_k`` recommendations of ``book_ids`` from their rows
+    of the matrix: most patrons in common first, then lowest id.
+    """
+    book_ids = sorted(book_ids)
+    for start in range(0, len(book_ids), batch_size):
+        batch = book_ids[start:start + batch_size]
+        rows = defaultdict(list)
+        for book_id, other_id, count in (
+            CoBorrowing.objects.filter(book_id__in=batch).values_list('book_id', 'other_id', 'count')
+        ):
+            rows[book_id].append((count, -other_id))
+        SimilarBook.objects.filter(book_id__in=batch).delete()
+        SimilarBook.objects.bulk_create(
+            SimilarBook(book_id=book_id, similar_id=-other, rank=index, borrowed_together=count)
+            for book_id in batch
+            for index, (count, other) in enumerate(heapq.nlargest(top_k, rows[book_id]), start=1)
+        )
+
+
+def fold(chunk_size: int = 1000, settle: timedelta = SETTLE, top_k: int = TOP_K):
+    """
+    Adds the checkouts recorded in the copy ledger since the watermark to
+    the co-occurrence matrix and re-ranks the books they touched,
+    ``chunk_size`` movements per transaction. Yields the number of
+    movements folded by each transaction.
+    """
+    while True:
+        with transaction.atomic():
+            watermark, _ = StatsWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+            movements = list(
+                CopyMovement.objects.filter(
+                    pk__gt=watermark.position,
+                    kind=CopyMovement.Kind.CHECKOUT,
+                    created_at__lt=timezone.now() - settle,
+                ).order_by('pk').values_list('pk', 'user_id', 'book_id')[:chunk_size]
+            )
+            if not movements:
+                return
+            borrowed = defaultdict(set)
+            for _, user_id, book_id in movements:
+                if user_id is not None:
+                    borrowed[user_id].add(book_id)
+            rank_neighbours(record(borrowed), top_k)
+            watermark.position = movements[-1][0]
+            watermark.save()
+        yield len(movements)
+
+
+def rebuild(chunk_size: int = 500, top_k: int = TOP_K) -> int:
+    """
+    Empties the matrix and derives it again from the active, archived and
+    frozen checkouts, ``chunk_size`` patrons at a time, then ranks every
+    book and sets the watermark to the end of the copy ledger. Returns the
+    number of distinct patron and book pairs counted.
+    """
+    with transaction.atomic():
+        watermark, _ = StatsWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        position = CopyMovement.objects.aggregate(last=Max('pk'))['last'] or 0
+        for model in (SimilarBook, CoBorrowing, BorrowedBook):
+            model.objects.all()._raw_delete(model.objects.db)
+
+        borrowed = defaultdict(set)
+        for model in (CheckOut, ArchivedCheckOut):
+            for user_id, book_id in model.objects.order_by().values_list('user_id', 'book_id').iterator():
+                borrowed[user_id].add(book_id)
+        for segment in get_cold_store().segments():
+            for row in segment.scan():
+                borrowed[row.user_id].add(row.book_id)
+
+        touched = set()
+        users = sorted(borrowed)
+        for start in range(0, len(users), chunk_size):
+            touched |= record({user_id: borrowed[user_id] for user_id in users[start:start + chunk_size]})
+        rank_neighbours(touched, top_k)
+
+        watermark.position = position
+        watermark.save()
+    return sum(len(books) for books in borrowed.values())
+
+
+def similar_to(book_id: int) -> list:
+    """The recommendations of a book, best first, with the recommended books, in one indexed query."""
+    return list(SimilarBook.objects.filter(book_id=book_id).select_related('similar').order_by('rank'))
@@ -0,0 +1,188 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from api.coldstore import get_cold_store
+from api.models import (
+    ArchivedCheckOut, AuthorStats, Book, BookDailyStats, BookStats, CheckOut, CopyMovement,
+    MonthlyStats, StatsWatermark, UserMonthlyStats,
+)
+
+WATERMARK = 'circulation'
+
+# Movements younger than this are left for the next fold: ids are handed
+# out before commit, so a slow transaction can still commit an id below
+# the watermark. Nothing in the checkout and return paths runs that long.
+SETTLE = timedelta(seconds=30)
+
+
+class Tally:
+    """
+    Loan and return counts for every statistics table, to be added to the
+    stored rows in one go.
+    """
+
+    def __init__(self):
+        self.book_days = defaultdict(Counter)
+        self.books = Counter()
+        self.user_months = Counter()
+        self.months = defaultdict(Counter)
+        self.authors = Counter()
+
+    def loan(self, book_id, user_id, author, day) -> None:
+        month = day.replace(day=1)
+        self.book_days[book_id, day]['loans'] += 1
+        self.books[book_id] += 1
+        if user_id is not None:
+            self.user_months[user_id, month] += 1
+        self.months[month]['loans'] += 1
+        self.authors[author] += 1
+
+    def returned(self, book_id, day) -> None:
+        self.book_days[book_id, day]['returns'] += 1
+        self.months[day.replace(day=1)]['returns'] += 1
+
+    def write(self) -> None:
+        add(BookDailyStats, ('book_id', 'day'), self.book_days)
+        add(BookStats, ('book_id',), {(book_id,): {'loans': n} for book_id, n in self.books.items()})
+        add(UserMonthlyStats, ('user_id', 'month'), {key: {'loans': n} for key, n in self.user_months.items()})
+        add(MonthlyStats, ('month',), {(month,): counts for month, counts in self.months.items()})
+        add(AuthorStats, ('author',), {(author,): {'loans': n} for author, n in self.authors.items()})
+
+
+def add(model, key_fields: tuple, counts: dict, batch_size: int = 200) -> None:
+    """
+    Adds ``counts`` (``{key: {field: n}}``) to the rows of ``model`` with
+    those keys, creating the missing ones: a SELECT, an UPDATE and an
+    INSERT per batch of keys. Callers hold the watermark lock, so nothing
+    else writes these rows meanwhile.
+    """
+    keys = list(counts)
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        lookup = reduce(or_, (Q(**dict(zip(key_fields, key))) for key in batch))
+        existing = {
+            tuple(getattr(row, field) for field in key_fields): row
+            for row in model.objects.filter(lookup)
+        }
+        fields = set()
+        changed, created = [], []
+        for key in batch:
+            row = existing.get(key)
+            if row is None:
+                created.append(model(**dict(zip(key_fields, key)), **counts[key]))
+                continue
+            for field, n in counts[key].items():
+                setattr(row, field, getattr(row, field) + n)
+                fields.add(field)
+            changed.append(row)
+        if changed:
+            model.objects.bulk_update(changed, sorted(fields))
+        model.objects.bulk_create(created)
+
+
+def fold(chunk_size: int = 1000, settle: timedelta = SETTLE):
+    """
+    Adds the checkouts and returns recorded in the copy ledger since the
+    watermark to the statistics tables, ``chunk_size`` movements per
+    transaction, moving the watermark along. Yields the number of
+    movements folded by each transaction.
+    """
+    while True:
+        with transaction.atomic():
+            watermark, _ = StatsWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+            movements = list(
+                CopyMovement.objects.filter(
+                    pk__gt=watermark.position,
+                    kind__in=[CopyMovement.Kind.CHECKOUT, CopyMovement.Kind.RETURN],
+                    created_at__lt=timezone.now() - settle,
+                ).order_by('pk').values_list(
+                    'pk', 'kind', 'book_id', 'user_id', 'book__author', 'created_at'
+                )[:chunk_size]
+            )
+            if not movements:
+                return
+            tally = Tally()
+            for _, kind, book_id, user_id, author, created_at in movements:
+                day = timezone.localdate(created_at)
+                if kind == CopyMovement.Kind.CHECKOUT:
+                    tally.loan(book_id, user_id, author, day)
+                else:
+                    tally.returned(book_id, day)
+            tally.write()
+            watermark.position = movements[-1][0]
+            watermark.save()
+        yield len(movements)
+
+
+def rebuild(chunk_size: int = 2000) -> int:
+    """
+    Empties the statistics tables and derives them again from the active,
+    archived and frozen checkouts, then sets the watermark to the end of
+    the copy ledger. Returns the number of checkouts counted.
+
+    History deleted by ``rotate_history`` and frozen checkouts of books
+    deleted since are no longer counted. Checkouts made while this runs
+    may be counted twice, so run it when the library is quiet.
+    """
+    with transaction.atomic():
+        watermark, _ = StatsWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        position = CopyMovement.objects.aggregate(last=Max('pk'))['last'] or 0
+        for model in (BookDailyStats, BookStats, UserMonthlyStats, MonthlyStats, AuthorStats):
+            model.objects.all()._raw_delete(model.objects.db)
+
+        tally = Tally()
+        counted = 0
+        fields = ('book_id', 'user_id', 'book__author', 'checkout_date')
+        for book_id, user_id, author, checkout_date in (
+            CheckOut.objects.order_by().values_list(*fields).iterator(chunk_size=chunk_size)
+        ):
+            tally.loan(book_id, user_id, author, checkout_date)
+            counted += 1
+        for book_id, user_id, author, checkout_date, return_date in (
+            ArchivedCheckOut.objects.order_by().values_list(*fields, 'return_date').iterator(chunk_size=chunk_size)
+        ):
+            tally.loan(book_id, user_id, author, checkout_date)
+            tally.returned(book_id, return_date)
+            counted += 1
+        for rows in get_cold_store().batches():
+            authors = dict(Book.objects.filter(pk__in={row.book_id for row in rows}).values_list('pk', 'author'))
+            for row in rows:
+                if row.book_id not in authors:
+                    continue
+                tally.loan(row.book_id, row.user_id, authors[row.book_id], row.checkout_date)
+                tally.returned(row.book_id, row.return_date)
+                counted += 1
+        tally.write()
+
+        watermark.position = position
+        watermark.save()
+    return counted
+
+
+def summary(limit: int = 10, months: int = 12) -> dict:
+    """
+    The most borrowed titles, the busiest authors and the loans and
+    returns of the latest ``months`` months, each read from its summary
+    table through an index, so the cost does not grow with the history.
+    """
+    watermark = StatsWatermark.objects.filter(name=WATERMARK).first()
+    books = BookStats.objects.select_related('book').order_by('-loans', 'book')[:limit]
+    authors = AuthorStats.objects.order_by('-loans', 'author')[:limit]
+    recent = MonthlyStats.objects.order_by('-month')[:months]
+    return {
+        'most_borrowed': [
+            {'book': row.book_id, 'title': row.book.title, 'loans': row.loans} for row in books
+        ],
+        'busiest_authors': [{'author': row.author, 'loans': row.loans} for row in authors],
+        'loans_per_month': [
+            {'month': f'{row.month:%Y-%m}', 'loans': row.loans, 'returns': row.returns}
+            for row in reversed(list(recent))
+        ],
+        'updated_at': watermark.updated_at if watermark else None,
+    }
@@ -0,0 +1,79 @@
+import io
+import datetime
+import tempfile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from api.archive import get_archive_storage, months_before, next_month
+from api.models import Book, ArchivedCheckOut
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class MonthArithmeticTestCase(SimpleTestCase):
+
+    def test_next_month(self):
+        self.assertEqual(next_month(datetime.date(2024, 1, 31)), datetime.date(2024, 2, 1))
+        self.assertEqual(next_month(datetime.date(2024, 12, 1)), datetime.date(2025, 1, 1))
+
+    def test_months_before(self):
+        self.assertEqual(months_before(datetime.date(2024, 3, 31), 0), datetime.date(2024, 3, 1))
+        self.assertEqual(months_before(datetime.date(2024, 3, 31), 14), datetime.date(2023, 1, 1))
+
+
+@override_settings(HISTORY_COLD_STORAGE_DIR=tempfile.gettempdir() + '/lms-no-cold-history')
+class HistoryRetentionTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        cls.book = Book.objects.create(title='Archived Book', author='Author', ISBN=make_isbn(1))
+        ArchivedCheckOut.objects.bulk_create(
+            ArchivedCheckOut(
+                book=cls.book, user=cls.user,
+                checkout_date=datetime.date(2023, month, 1), return_date=datetime.date(2023, month, day)
+            )
+            for month in range(1, 13) for day in (1, 15, 28)
+        )
+
+    def rotate(self, **options):
+        out = io.StringIO()
+        call_command('rotate_history', '--as-of=2023-12-20', stdout=out, **options)
+        return out.getvalue()
+
+    def test_expired_months_are_removed(self):
+        output = self.rotate(keep_months=3)
+        self.assertIn('returned before 2023-10-01', output)
+        months = sorted({row.month for row in ArchivedCheckOut.objects.values_list('return_date', flat=True)})
+        self.assertEqual(months, [10, 11, 12])
+        if connection.vendor == 'postgresql':
+            self.assertIn('removed 9 partition(s), 0 cold segment(s) and deleted 0 row(s)', output)
+        else:
+            self.assertIn('deleted 27 row(s)', output)
+
+        self.assertIn('deleted 0 row(s)', self.rotate(keep_months=3))
+
+    def test_rows_are_deleted_in_chunks(self):
+        counts = list(ArchivedCheckOut.objects.expire(datetime.date(2023, 3, 1), chunk_size=4))
+        self.assertEqual(counts, [4, 2])
+        self.assertEqual(ArchivedCheckOut.objects.count(), 30)
+
+    def test_month_query(self):
+        returned = ArchivedCheckOut.objects.returned_in(datetime.date(2023, 2, 17))
+        self.assertEqual(
+            sorted(returned.values_list('return_date', flat=True)),
+            [datetime.date(2023, 2, day) for day in (1, 15, 28)]
+        )
+
+    def test_storage_matches_the_database(self):
+        storage = get_archive_storage()
+        self.assertEqual(storage.table, ArchivedCheckOut._meta.db_table)
+        if connection.vendor != 'postgresql':
+            self.assertEqual(storage.prepare(datetime.date(2030, 1, 1)), [])
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.rotate(keep_months=0)
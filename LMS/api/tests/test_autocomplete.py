@@ -0,0 +1,142 @@
+import io
+import json
+from django.test import TestCase
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from api.models import Book
+from api.autocomplete import PrefixIndex, book_autocomplete, normalize
+from api.importer import CatalogImporter
+from api.tests.test_queries import make_isbn
+
+
+class PrefixIndexTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.things = Book.objects.create(title='things fall apart', author='chinua achebe', ISBN=make_isbn(1))
+        cls.arrow = Book.objects.create(title='arrow of god', author='chinua achebe', ISBN=make_isbn(2))
+        cls.sun = Book.objects.create(title='half of a yellow sun', author='Chimamanda Ngozi Adichie', ISBN=make_isbn(3))
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.build()
+
+    def titles(self, query, limit=10):
+        return [title for _, title, _ in self.index.lookup(query, limit)]
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Things  Fall, Apart! '), 'things fall apart')
+        self.assertEqual(normalize('Ngũgĩ wa Thiong’o'), 'ngugi wa thiong o')
+
+    def test_matches_title_and_author_word_prefixes(self):
+        self.assertEqual(self.titles('thi'), ['Things Fall Apart'])
+        self.assertEqual(self.titles('FALL ap'), ['Things Fall Apart'])
+        self.assertEqual(self.titles('achebe'), ['Things Fall Apart', 'Arrow Of God'])
+        self.assertEqual(self.titles('yellow s'), ['Half Of A Yellow Sun'])
+        self.assertEqual(self.titles('zzz'), [])
+        self.assertEqual(self.titles('  '), [])
+
+    def test_each_book_is_returned_once_and_limit_applies(self):
+        self.assertEqual(self.titles('chi'), ['Half Of A Yellow Sun', 'Things Fall Apart', 'Arrow Of God'])
+        self.assertEqual(len(self.titles('chi', limit=2)), 2)
+
+    def test_lookup_does_not_query_the_database(self):
+        with self.assertNumQueries(0):
+            self.index.lookup('arr')
+
+    def test_add_refreshes_and_remove_drops(self):
+        self.index.add([(self.arrow.pk, 'Arrow Of Fire', 'Chinua Achebe')])
+        self.assertEqual(self.titles('arrow of'), ['Arrow Of Fire'])
+        self.assertEqual(self.titles('god'), [])
+        self.index.remove(self.arrow.pk)
+        self.assertEqual(self.titles('arrow'), [])
+        self.assertEqual(self.titles('achebe'), ['Things Fall Apart'])
+
+    def test_changes_made_by_other_processes_are_picked_up(self):
+        # The Book signals only keep ``book_autocomplete`` current, so this
+        # index stands for the one of another worker.
+        with self.settings(AUTOCOMPLETE_REFRESH_SECONDS=0):
+            Book.objects.create(title='petals of blood', author='ngugi wa thiongo', ISBN=make_isbn(10))
+            self.assertEqual(self.titles('petals'), ['Petals Of Blood'])
+            self.arrow.title = 'arrow of fire'
+            self.arrow.save()
+            self.assertEqual(self.titles('arrow of'), ['Arrow Of Fire'])
+            self.sun.delete()
+            self.assertEqual(self.titles('yellow'), [])
+            with self.assertNumQueries(1):
+                self.assertEqual(self.titles('achebe'), ['Things Fall Apart', 'Arrow Of Fire'])
+
+    def test_add_is_ignored_until_loaded(self):
+        index = PrefixIndex()
+        index.add([(999, 'Ghost', 'Nobody')])
+        with self.assertNumQueries(1):
+            self.assertEqual(index.lookup('ghost'), [])
+
+
+class AutocompleteSignalTestCase(TestCase):
+
+    def setUp(self):
+        book_autocomplete.build()
+        self.addCleanup(book_autocomplete.clear)
+
+    def titles(self, query):
+        return [title for _, title, _ in book_autocomplete.lookup(query)]
+
+    def test_index_follows_committed_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title='petals of blood', author='ngugi wa thiongo', ISBN=make_isbn(10))
+        self.assertEqual(self.titles('petals'), ['Petals Of Blood'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = 'weep not child'
+            book.save()
+        self.assertEqual(self.titles('petals'), [])
+        self.assertEqual(self.titles('weep'), ['Weep Not Child'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertEqual(self.titles('weep'), [])
+
+    def test_uncommitted_saves_are_not_indexed(self):
+        Book.objects.create(title='petals of blood', author='ngugi wa thiongo', ISBN=make_isbn(10))
+        self.assertEqual(self.titles('petals'), [])
+
+    def test_imported_books_are_indexed(self):
+        feed = json.dumps({'title': 'the river between', 'author': 'ngugi', 'ISBN': make_isbn(11)})
+        with self.captureOnCommitCallbacks(execute=True):
+            CatalogImporter().run(io.StringIO(feed), 'jsonl')
+        self.assertEqual(self.titles('river'), ['The River Between'])
+
+
+class AutocompleteViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title='things fall apart', author='chinua achebe', ISBN=make_isbn(1))
+        Book.objects.create(title='arrow of god', author='chinua achebe', ISBN=make_isbn(2))
+        book_autocomplete.clear()
+        self.addCleanup(book_autocomplete.clear)
+        self.url = reverse('book-autocomplete')
+
+    def test_suggestions(self):
+        response = self.client.get(path=self.url, data={'q': 'thin'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        result = response.data['results'][0]
+        self.assertEqual(result['id'], self.book.pk)
+        self.assertEqual(result['title'], 'Things Fall Apart')
+        self.assertTrue(result['url'].endswith(f'/api/books/{self.book.pk}/'))
+
+    def test_loads_once_then_serves_from_memory(self):
+        with self.assertNumQueries(1):
+            self.client.get(path=self.url, data={'q': 'a'})
+        with self.assertNumQueries(0):
+            response = self.client.get(path=self.url, data={'q': 'achebe', 'limit': 1})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(path=self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(path=self.url, data={'q': 'a', 'limit': 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(path=self.url, data={'q': ''})
+        self.assertEqual(response.data['results'], [])
@@ -0,0 +1,76 @@
+from unittest import mock
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.utils import timezone
+from api.models import Book, BookInfo
+from api.serializers import BookSerializer
+from api.cache import book_fragments
+
+
+class BookFragmentCacheTestCase(APITestCase):
+
+    def setUp(self):
+        book_fragments.clear()
+        self.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0205080057')
+        self.book.info.copies = 5
+        self.book.info.save()
+        self.other = Book.objects.create(title='Other Book', author='Author B', ISBN='9780676978124')
+        self.other.info.copies = 2
+        self.other.info.save()
+        self.list_url = reverse('book-list')
+        self.detail_url = reverse('book-detail', kwargs={'pk': self.book.pk})
+
+    def count_renders(self):
+        return mock.patch.object(
+            BookSerializer, 'to_representation',
+            autospec=True, side_effect=BookSerializer.to_representation
+        )
+
+    def test_list_is_served_from_fragments(self):
+        first = self.client.get(path=self.list_url)
+        with self.count_renders() as rendered:
+            second = self.client.get(path=self.list_url)
+        self.assertEqual(rendered.call_count, 0)
+        self.assertEqual(first.data, second.data)
+
+    def test_only_misses_are_rendered(self):
+        self.client.get(path=self.detail_url)
+        with self.count_renders() as rendered:
+            response = self.client.get(path=self.list_url)
+        self.assertEqual(rendered.call_count, 1)
+        self.assertEqual(rendered.call_args[0][1], self.other)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_info_change_invalidates_fragment(self):
+        self.client.get(path=self.detail_url)
+        self.book.info.copies = 1
+        self.book.info.save()
+        response = self.client.get(path=self.detail_url)
+        self.assertEqual(response.data['book_copies'], 1)
+
+    def test_book_change_invalidates_fragment(self):
+        self.client.get(path=self.detail_url)
+        self.book.title = 'renamed book'
+        self.book.save()
+        response = self.client.get(path=self.detail_url)
+        self.assertEqual(response.data['title'], 'Renamed Book')
+
+    def test_fragments_are_kept_per_host(self):
+        self.client.get(path=self.detail_url)
+        response = self.client.get(path=self.detail_url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['url'].startswith('http://localhost/'))
+
+    def test_changes_missed_by_this_worker_are_not_served(self):
+        first = self.client.get(path=self.detail_url)
+        # Another worker's write: it invalidates its own cache, not this one.
+        with mock.patch.object(book_fragments, 'invalidate'):
+            BookInfo.objects.reserve_copy(self.book.pk)
+        response = self.client.get(path=self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['book_copies'], 4)
+
+        BookInfo.objects.filter(book=self.book).update(copies=3, updated_at=timezone.now())
+        response = self.client.get(path=self.list_url)
+        self.assertEqual(response.data['results'][0]['book_copies'], 3)
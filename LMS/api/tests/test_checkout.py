@@ -0,0 +1,301 @@
+import io
+import datetime
+from unittest import mock
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from api.models import Book, BookInfo, BookInfoQuerySet, CheckOut, ArchivedCheckOut, CopyMovement
+from api.serializers import CheckOutSerializer
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class CopyReservationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        cls.other = User.objects.create_user(email='user2@email.com', password='password123')
+        cls.book = Book.objects.create(title='Contended Title', author='Author', ISBN=make_isbn(1))
+        cls.book.info.copies = 1
+        cls.book.info.save()
+
+    def test_reserve_copy_takes_the_last_copy_once(self):
+        self.assertTrue(BookInfo.objects.reserve_copy(self.book.pk))
+        self.assertFalse(BookInfo.objects.reserve_copy(self.book.pk))
+        info = BookInfo.objects.get(book=self.book)
+        self.assertEqual(info.copies, 0)
+        self.assertFalse(info.status)
+
+    def test_release_copy_makes_the_book_available(self):
+        BookInfo.objects.reserve_copy(self.book.pk)
+        BookInfo.objects.release_copy(self.book.pk)
+        info = BookInfo.objects.with_pending().get(book=self.book)
+        self.assertEqual(info.copies, 0)
+        self.assertEqual(info.available_copies, 1)
+        self.assertTrue(info.status)
+
+    def test_reserve_copy_folds_pending_returns_when_out_of_copies(self):
+        BookInfo.objects.reserve_copy(self.book.pk)
+        BookInfo.objects.release_copy(self.book.pk)
+        self.assertTrue(BookInfo.objects.reserve_copy(self.book.pk))
+        info = BookInfo.objects.with_pending().get(book=self.book)
+        self.assertEqual((info.copies, info.available_copies, info.status), (0, 0, False))
+        self.assertFalse(CopyMovement.objects.pending().exists())
+
+    def test_copy_taken_after_validation_rolls_back_the_checkout(self):
+        serializer = CheckOutSerializer(data={'book': self.book.pk})
+        self.assertTrue(serializer.is_valid())
+
+        # Another borrower takes the last copy between validate() and save().
+        CheckOut.objects.create(book=self.book, user=self.other)
+
+        with self.assertRaises(serializers.ValidationError):
+            serializer.save(user=self.user)
+        self.assertFalse(CheckOut.objects.filter(user=self.user).exists())
+        self.assertEqual(BookInfo.objects.get(book=self.book).copies, 0)
+
+    def test_copies_cannot_go_negative(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookInfo.objects.filter(book=self.book).update(copies=-1)
+
+
+class BorrowStatementsTestCase(APITestCase):
+    """
+    Borrowing reads the book and its info with one join, inserts the
+    checkout with its due date already set (the ``set_due_date`` handler
+    finds nothing left to save) and reserves a copy: the three statements
+    the borrow path was cut down to. Two have been added since, one each
+    and however many books a borrow takes: the checkout's row in the copy
+    ledger, which the statistics and recommendations fold from, and the
+    UPDATE of the borrower's loan counters. The savepoint around the
+    writes is not counted.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.book = Book.objects.create(title='Test Book', author='Author A', ISBN=make_isbn(1))
+        self.book.info.copies = 5
+        self.book.info.save()
+        self.client.force_authenticate(user=self.user)
+
+    def assertBorrowStatements(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = method(path=url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        # Book and info, checkout, copy, ledger row, loan counters.
+        self.assertEqual([sql.split()[0] for sql in queries], ['SELECT', 'INSERT', 'UPDATE', 'INSERT', 'UPDATE'])
+        self.assertFalse([sql for sql in queries if sql.startswith('UPDATE "api_checkout"')])
+
+        checkout = CheckOut.objects.get(user=self.user, book=self.book)
+        self.assertEqual(checkout.due_date, checkout.checkout_date + datetime.timedelta(days=15))
+        self.assertEqual(response.data['due_date'], checkout.due_date.isoformat())
+        self.assertEqual(BookInfo.objects.get(book=self.book).copies, 4)
+
+    def test_borrow_book_view(self):
+        self.assertBorrowStatements(self.client.post, reverse('borrow_book', kwargs={'pk': self.book.pk}))
+
+    def test_checkout_viewset_create(self):
+        self.assertBorrowStatements(self.client.post, reverse('checkout-list'), {'book': self.book.pk})
+
+    def test_unavailable_book_is_rejected_without_writes(self):
+        BookInfo.objects.filter(book=self.book).update(copies=0, status=False)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(path=reverse('borrow_book', kwargs={'pk': self.book.pk}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(context.captured_queries), 1)
+
+
+class BatchBorrowTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.books = []
+        for i in range(4):
+            book = Book.objects.create(title=f'Batch Book {i}', author='Author', ISBN=make_isbn(i))
+            book.info.copies = 2
+            book.info.save()
+            self.books.append(book)
+        self.url = reverse('checkout-batch')
+        self.client.force_authenticate(user=self.user)
+
+    def copies(self):
+        return list(
+            BookInfo.objects.filter(book__in=self.books).order_by('book_id').values_list('copies', flat=True)
+        )
+
+    def test_borrow_all_in_one_insert(self):
+        ids = [book.pk for book in self.books]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(path=self.url, data={'books': ids + ids[:1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['borrowed'], 4)
+        self.assertEqual([result['book'] for result in response.data['results']], ids)
+        self.assertEqual(response.data['results'][0]['checkout']['book_title'], 'Batch Book 0')
+        self.assertIsNotNone(response.data['results'][0]['checkout']['due_date'])
+        self.assertEqual(self.copies(), [1, 1, 1, 1])
+        inserts = [query for query in context.captured_queries if query['sql'].startswith('INSERT')]
+        # One for the checkouts, one for their ledger movements.
+        self.assertEqual(len(inserts), 2)
+
+    def test_atomic_batch_borrows_nothing_on_any_failure(self):
+        BookInfo.objects.filter(book=self.books[2]).update(copies=0, status=False)
+        ids = [self.books[0].pk, self.books[2].pk, 999]
+        response = self.client.post(path=self.url, data={'books': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = {result['book']: result['error'] for result in response.data['results']}
+        self.assertEqual(errors[999], 'Book not found.')
+        self.assertEqual(errors[self.books[2].pk], 'Book not available for checkout.')
+        self.assertIn('another book', errors[self.books[0].pk])
+        self.assertFalse(CheckOut.objects.exists())
+        self.assertEqual(self.copies(), [2, 2, 0, 2])
+
+    def test_best_effort_batch_borrows_what_it_can(self):
+        CheckOut.objects.create(book=self.books[1], user=self.user)
+        ids = [book.pk for book in self.books]
+        response = self.client.post(path=self.url, data={'books': ids, 'atomic': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['borrowed'], 3)
+        self.assertEqual(response.data['results'][1]['error'], 'Book already borrowed.')
+        self.assertEqual(CheckOut.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(self.copies(), [1, 1, 1, 1])
+
+    def test_copy_lost_to_a_concurrent_borrower_rolls_back_the_batch(self):
+        ids = [book.pk for book in self.books]
+        original = BookInfoQuerySet.reserve_copy
+
+        # Another borrower takes the last title's copies mid-batch.
+        def reserve_copy(queryset, book_id, **kwargs):
+            if book_id == ids[-1]:
+                return False
+            return original(queryset, book_id, **kwargs)
+
+        with mock.patch.object(BookInfoQuerySet, 'reserve_copy', reserve_copy):
+            checkouts, errors = CheckOut.objects.borrow_many(self.user, ids)
+        self.assertEqual(checkouts, {})
+        self.assertEqual(errors, {ids[-1]: 'No copies available for checkout.'})
+        self.assertEqual(self.copies(), [2, 2, 2, 2])
+
+
+class ReturnStatementsTestCase(APITestCase):
+    """
+    Returning locks the checkout found by (user, book), appends the copy
+    to the ledger (and flips the status of an unavailable book), archives
+    and deletes the checkout: five statements in one transaction.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.other = User.objects.create_user(email='user2@email.com', password='password123')
+        self.book = Book.objects.create(title='Test Book', author='Author A', ISBN=make_isbn(1))
+        self.book.info.copies = 2
+        self.book.info.save()
+        CheckOut.objects.create(book=self.book, user=self.user)
+        CheckOut.objects.create(book=self.book, user=self.other)
+        self.client.force_authenticate(user=self.user)
+
+    def assertReturned(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(path=url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [
+            query['sql'].split()[0] for query in context.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        self.assertEqual(statements, ['SELECT', 'INSERT', 'UPDATE', 'UPDATE', 'INSERT', 'DELETE'])
+
+        self.assertFalse(CheckOut.objects.filter(user=self.user).exists())
+        self.assertTrue(CheckOut.objects.filter(user=self.other).exists())
+        archived = ArchivedCheckOut.objects.get(user=self.user, book=self.book)
+        self.assertEqual(archived.return_date, datetime.date.today())
+        info = BookInfo.objects.with_pending().get(book=self.book)
+        self.assertEqual(info.available_copies, 1)
+        self.assertTrue(info.status)
+
+        response = self.client.post(path=url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(ArchivedCheckOut.objects.count(), 1)
+
+    def test_return_book_view(self):
+        self.assertReturned(reverse('return_book', kwargs={'pk': self.book.pk}))
+
+    def test_checkout_viewset_return(self):
+        self.assertReturned(reverse('checkout-return', kwargs={'pk': self.book.pk}))
+
+
+class MarkOverdueTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email='user1@email.com', password='password123')
+        today = datetime.date.today()
+        due_dates = [
+            today - datetime.timedelta(days=30),
+            today - datetime.timedelta(days=2),
+            today - datetime.timedelta(days=1),
+            today - datetime.timedelta(days=1),
+            today,
+            today + datetime.timedelta(days=5),
+        ]
+        statuses = [CheckOut.Status.PENDING] * 3 + [CheckOut.Status.RETURNED] + [CheckOut.Status.PENDING] * 2
+        books = Book.objects.bulk_create(
+            Book(title=f'Loan {i}', author='Author', ISBN=make_isbn(i), isbn13=make_isbn(i))
+            for i in range(len(due_dates))
+        )
+        CheckOut.objects.bulk_create(
+            CheckOut(book=book, user=user, due_date=due_date, status=checkout_status)
+            for book, due_date, checkout_status in zip(books, due_dates, statuses)
+        )
+
+    def statuses(self):
+        return list(CheckOut.objects.order_by('book_id').values_list('status', flat=True))
+
+    def test_only_pending_loans_past_due_are_flipped_in_chunks(self):
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as context:
+            call_command('mark_overdue', chunk_size=2, stdout=out)
+        statements = [
+            query['sql'].split()[0] for query in context.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        # Each batch: lock the rows, flip them, bump the overdue counters.
+        self.assertEqual(statements, ['SELECT', 'UPDATE', 'UPDATE'] * 2 + ['SELECT'])
+        self.assertIn('Marked 3 checkout(s) overdue in 2 batch(es).', out.getvalue())
+        self.assertEqual(self.statuses(), ['overdue', 'overdue', 'overdue', 'returned', 'pending', 'pending'])
+
+    def test_sweep_is_idempotent(self):
+        self.assertEqual(sum(CheckOut.objects.mark_overdue()), 3)
+        self.assertEqual(sum(CheckOut.objects.mark_overdue()), 0)
+
+    def test_as_of_date(self):
+        as_of = datetime.date.today() - datetime.timedelta(days=1)
+        self.assertEqual(sum(CheckOut.objects.mark_overdue(as_of)), 2)
+
+
+class ConcurrentCheckoutTestCase(TransactionTestCase):
+    """
+    Runs the checkout benchmark against the test database: many threads,
+    each with its own connection, racing for a handful of copies.
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Concurrent writers need a file or server database.')
+
+    def test_no_copy_is_oversold(self):
+        out = io.StringIO()
+        call_command('benchmark_checkout', copies=5, borrowers=40, threads=8, stdout=out)
+        self.assertIn('borrowed=5 ', out.getvalue())
+        self.assertIn('oversold=0 ', out.getvalue())
+        self.assertFalse(Book.objects.exists())
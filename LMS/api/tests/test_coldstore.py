@@ -0,0 +1,192 @@
+import io
+import json
+import datetime
+import tempfile
+from pathlib import Path
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from django.contrib.auth import get_user_model
+from api import exporter, stats
+from api.coldstore import ColdCheckOut, ColdStore, Segment
+from api.models import Book, ArchivedCheckOut, BookStats, MonthlyStats
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class SegmentTestCase(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'history.seg'
+        self.rows = [
+            ColdCheckOut(pk, pk % 4, 100 + pk, datetime.date(2022, 1, 1), datetime.date(2022, 1 + pk % 12, 5))
+            for pk in range(1, 41)
+        ]
+        Segment.write(self.path, self.rows, block_rows=3)
+        self.segment = Segment(self.path)
+        self.addCleanup(self.segment.close)
+
+    def test_sparse_index_has_an_entry_per_block(self):
+        self.assertEqual(len(self.segment.blocks), 14)
+        self.assertEqual(self.segment.last_users, sorted(self.segment.last_users))
+        self.assertEqual(self.segment.newest, datetime.date(2022, 12, 5))
+
+    def test_rows_of_a_user_latest_return_first(self):
+        rows = self.segment.scan(user_id=2)
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(all(row.user_id == 2 for row in rows))
+        self.assertEqual(rows, sorted(rows, key=lambda row: (row.return_date, row.id), reverse=True))
+        self.assertEqual(self.segment.scan(user_id=7), [])
+
+    def test_rows_of_a_month(self):
+        rows = self.segment.scan(start=datetime.date(2022, 3, 1), end=datetime.date(2022, 4, 1))
+        self.assertEqual([row.id for row in rows], [38, 26, 14, 2])
+        self.assertEqual(rows[0], self.rows[37])
+
+    def test_counts_come_from_the_index(self):
+        with mock.patch.object(Segment, 'read_block', side_effect=AssertionError('block inflated')):
+            self.assertEqual(self.segment.count(), 40)
+            self.assertEqual(self.segment.count(user_id=2), 10)
+            self.assertEqual(self.segment.count(user_id=7), 0)
+            self.assertEqual(self.segment.count(month=datetime.date(2022, 3, 1)), 4)
+            self.assertEqual(self.segment.count(user_id=2, month=datetime.date(2022, 3, 1)), 4)
+            self.assertEqual(self.segment.count(user_id=1, month=datetime.date(2022, 3, 1)), 0)
+
+    def test_rejects_other_files(self):
+        other = self.path.with_name('other.seg')
+        other.write_bytes(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            Segment(other)
+
+
+class ColdHistoryTestCase(APITestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(HISTORY_COLD_STORAGE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.other = User.objects.create_user(email='user2@email.com', password='password123')
+        self.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        self.book = Book.objects.create(title='Frozen Book', author='Author', ISBN=make_isbn(1))
+        ArchivedCheckOut.objects.bulk_create(
+            ArchivedCheckOut(
+                book=self.book, user=user,
+                checkout_date=datetime.date(2023, month, 1), return_date=datetime.date(2023, month, 10)
+            )
+            for month in range(1, 13) for user in (self.user, self.other)
+        )
+        self.url = reverse('history-list')
+
+    def freeze(self, *args):
+        out = io.StringIO()
+        call_command('freeze_history', '--as-of=2023-12-20', *args, stdout=out)
+        return out.getvalue()
+
+    def returns(self, response):
+        return [row['return_date'][5:7] for row in response.data['results']]
+
+    def test_old_history_is_moved_to_segments(self):
+        output = self.freeze('--keep-months=4', '--segment-rows=5')
+        self.assertIn('Moved 16 checkout(s) returned before 2023-09-01 into 4 segment(s).', output)
+        self.assertEqual(ArchivedCheckOut.objects.count(), 8)
+        self.assertEqual(len(list(self.directory.glob('*.seg'))), 4)
+        self.assertIn('Moved 0 checkout(s)', self.freeze('--keep-months=4'))
+
+    def test_pages_continue_into_cold_history(self):
+        self.freeze('--keep-months=4')
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, {'page_size': 5})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(self.returns(response), ['12', '11', '10', '09', '08'])
+        response = self.client.get(self.url, {'page_size': 5, 'page': 3})
+        self.assertEqual(self.returns(response), ['02', '01'])
+        self.assertEqual(response.data['results'][0]['book'], 'Frozen Book')
+        self.assertEqual(response.data['results'][0]['user'], self.user.email)
+
+        months, url = [], self.url + '?pagination=cursor&page_size=5'
+        while url:
+            response = self.client.get(url)
+            months += self.returns(response)
+            url = response.data['next']
+        self.assertEqual(months, [f'{month:02d}' for month in range(12, 0, -1)])
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(self.returns(previous), ['07', '06', '05', '04', '03'])
+
+    def test_staff_and_month_filters_reach_cold_history(self):
+        self.freeze('--keep-months=4')
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(self.url).data['count'], 24)
+        response = self.client.get(self.url, {'month': '2023-02'})
+        self.assertEqual(self.returns(response), ['02', '02'])
+
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url, {'month': '2023-02'})
+        self.assertEqual([row['user'] for row in response.data['results']], [self.other.email])
+
+    def test_pages_within_the_database_rows_inflate_no_block(self):
+        self.freeze('--keep-months=4')
+        with mock.patch.object(Segment, 'read_block', side_effect=AssertionError('block inflated')):
+            self.client.force_authenticate(user=self.admin)
+            response = self.client.get(self.url, {'page_size': 5})
+            self.assertEqual((response.data['count'], self.returns(response)[0]), (24, '12'))
+            self.assertEqual(self.client.get(self.url, {'month': '2023-10'}).data['count'], 2)
+
+            self.client.force_authenticate(user=self.user)
+            response = self.client.get(self.client.get(
+                self.url, {'pagination': 'cursor', 'page_size': 1}
+            ).data['next'])
+            self.assertEqual(self.returns(response), ['11'])
+            self.assertEqual(self.returns(self.client.get(response.data['previous'])), ['12'])
+
+    def test_rows_still_in_the_database_are_not_listed_twice(self):
+        store = ColdStore(self.directory)
+        rows = [
+            ColdCheckOut(*row) for row in ArchivedCheckOut.objects.filter(user=self.user).values_list(
+                'pk', 'user_id', 'book_id', 'checkout_date', 'return_date'
+            )[:3]
+        ]
+        Segment.write(store.path / f'history-1{store.suffix}', rows)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(len(self.client.get(self.url, {'page_size': 50}).data['results']), 12)
+
+    def test_rebuilt_stats_count_cold_history(self):
+        self.freeze('--keep-months=4')
+        self.assertEqual(stats.rebuild(), 24)
+        self.assertEqual(BookStats.objects.get(book=self.book).loans, 24)
+        self.assertEqual(
+            MonthlyStats.objects.values_list('loans', 'returns').get(month=datetime.date(2023, 2, 1)), (2, 2)
+        )
+
+    def test_history_export_reads_cold_history(self):
+        self.freeze('--keep-months=4')
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('export', kwargs={'dataset': 'history'})
+        response = self.client.get(url, {'since': '2023-08-01', 'until': '2023-09-10'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['return_date'] for row in rows], ['2023-09-10'] * 2 + ['2023-08-10'] * 2)
+        self.assertEqual(rows[-1]['book__title'], 'Frozen Book')
+        self.assertEqual({row['user__email'] for row in rows}, {self.user.email, self.other.email})
+
+    async def test_async_history_export_reads_cold_history(self):
+        await sync_to_async(self.freeze)('--keep-months=4')
+        lines = [line async for line in exporter.aexport('history', 'csv')]
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(lines, await sync_to_async(list)(exporter.export('history', 'csv')))
+
+    def test_rotation_deletes_expired_segments(self):
+        self.freeze('--keep-months=10', '--segment-rows=2')
+        out = io.StringIO()
+        call_command('rotate_history', '--as-of=2023-12-20', keep_months=11, stdout=out)
+        self.assertIn('1 cold segment(s)', out.getvalue())
@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import datetime
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api import exporter
+from api.models import Book, CheckOut, ArchivedCheckOut
+
+User = get_user_model()
+
+
+class ExportTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        cls.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0205080057')
+        cls.book.info.copies = 5
+        cls.book.info.save()
+        cls.other = Book.objects.create(title='Other Book', author='Author B', ISBN='9780676978124')
+        CheckOut.objects.create(book=cls.book, user=cls.user)
+        for day in range(1, 4):
+            ArchivedCheckOut.objects.create(
+                book=cls.book, user=cls.user,
+                checkout_date=datetime.date(2012, 1, 1),
+                return_date=datetime.date(2012, 1, day)
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin)
+
+    def fetch(self, dataset, **params):
+        response = self.client.get(path=reverse('export', kwargs={'dataset': dataset}), data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_books_ndjson(self):
+        rows = [json.loads(line) for line in self.fetch('books').splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Test Book', 'Other Book'])
+        self.assertEqual(rows[0]['info__copies'], 4)
+
+    def test_books_status_filter(self):
+        rows = self.fetch('books', status='unavailable').splitlines()
+        self.assertEqual([json.loads(row)['title'] for row in rows], ['Other Book'])
+
+    def test_checkouts_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.fetch('checkouts', output='csv'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['user__email'], 'user1@email.com')
+        self.assertEqual(rows[0]['status'], 'pending')
+
+    def test_history_date_range(self):
+        rows = self.fetch('history', since='2012-01-02', until='2012-01-02').splitlines()
+        self.assertEqual([json.loads(row)['return_date'] for row in rows], ['2012-01-02'])
+
+    def test_export_reads_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.fetch('history')
+
+    async def test_async_export_matches_export(self):
+        for output in exporter.OUTPUTS:
+            lines = [line async for line in exporter.aexport('history', output, chunk_size=2)]
+            expected = await sync_to_async(list)(exporter.export('history', output))
+            self.assertEqual(lines, expected)
+            self.assertEqual(len(lines), 3 + (output == 'csv'))
+
+    async def test_export_streams_under_asgi(self):
+        rendered = []
+        ndjson_lines = exporter.RENDERERS['ndjson']
+
+        def counting_lines(columns):
+            header, render = ndjson_lines(columns)
+            return header, lambda row: rendered.append(row) or render(row)
+
+        await self.async_client.aforce_login(self.admin)
+        with mock.patch.dict(exporter.RENDERERS, ndjson=counting_lines):
+            response = await self.async_client.get(reverse('export', kwargs={'dataset': 'history'}))
+            self.assertTrue(response.is_async)
+            content = aiter(response.streaming_content)
+            first = json.loads(await anext(content))
+            # Only the first row has been read so far.
+            self.assertEqual(len(rendered), 1)
+            rest = [json.loads(line) async for line in content]
+        self.assertEqual([row['return_date'] for row in [first, *rest]], ['2012-01-01', '2012-01-02', '2012-01-03'])
+
+    def test_invalid_requests(self):
+        url = reverse('export', kwargs={'dataset': 'history'})
+        self.assertEqual(self.client.get(path=url, data={'status': 'pending'}).status_code, 400)
+        self.assertEqual(self.client.get(path=url, data={'since': 'yesterday'}).status_code, 400)
+        url = reverse('export', kwargs={'dataset': 'users'})
+        self.assertEqual(self.client.get(path=url).status_code, 404)
+
+    def test_non_admin_forbidden(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(path=reverse('export', kwargs={'dataset': 'books'}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_management_command(self):
+        out = io.StringIO()
+        call_command('export_data', 'checkouts', '--output', 'csv', '--status', 'pending', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('id,book_id,book__title'))
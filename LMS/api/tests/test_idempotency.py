@@ -0,0 +1,97 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.idempotency import idempotency_store
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class IdempotencyKeyTestCase(APITestCase):
+
+    def setUp(self):
+        idempotency_store.clear()
+        self.addCleanup(idempotency_store.clear)
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.book = Book.objects.create(title='Retried Book', author='Author', ISBN=make_isbn(1))
+        self.book.info.copies = 2
+        self.book.info.save()
+        self.url_borrow = reverse('borrow_book', kwargs={'pk': self.book.pk})
+        self.url_return = reverse('return_book', kwargs={'pk': self.book.pk})
+        self.client.force_authenticate(user=self.user)
+
+    def post(self, url, key, data=None):
+        return self.client.post(url, data=data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_borrow_is_replayed_without_writes(self):
+        first = self.post(self.url_borrow, 'borrow-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as context:
+            retry = self.post(self.url_borrow, 'borrow-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(context.captured_queries), 0)
+
+        self.assertEqual(CheckOut.objects.filter(book=self.book).count(), 1)
+        self.assertEqual(BookInfo.objects.get(book=self.book).copies, 1)
+
+    def test_retried_return_is_replayed(self):
+        CheckOut.objects.create(book=self.book, user=self.user)
+        for _ in range(2):
+            response = self.post(self.url_return, 'return-1')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ArchivedCheckOut.objects.filter(book=self.book).count(), 1)
+        self.assertEqual(BookInfo.objects.with_pending().get(book=self.book).available_copies, 2)
+
+    def test_without_a_key_a_retry_runs_again(self):
+        self.assertEqual(self.client.post(self.url_borrow).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(self.url_borrow).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_failures_are_not_remembered(self):
+        BookInfo.objects.filter(book=self.book).update(copies=0, status=False)
+        self.assertEqual(self.post(self.url_borrow, 'borrow-1').status_code, status.HTTP_400_BAD_REQUEST)
+
+        BookInfo.objects.filter(book=self.book).update(copies=1, status=True)
+        self.assertEqual(self.post(self.url_borrow, 'borrow-1').status_code, status.HTTP_201_CREATED)
+
+    def test_key_reused_for_another_request(self):
+        other = Book.objects.create(title='Other Book', author='Author', ISBN=make_isbn(2))
+        other.info.copies = 1
+        other.info.save()
+        self.post(self.url_borrow, 'borrow-1')
+        response = self.post(reverse('borrow_book', kwargs={'pk': other.pk}), 'borrow-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(CheckOut.objects.filter(book=other).exists())
+
+    def test_retry_while_first_attempt_runs(self):
+        idempotency_store.begin(idempotency_store.key(self.user.pk, 'borrow-1'))
+        response = self.post(self.url_borrow, 'borrow-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(CheckOut.objects.exists())
+
+    def test_keys_are_scoped_to_the_user(self):
+        other_user = User.objects.create_user(email='user2@email.com', password='password123')
+        self.post(self.url_borrow, 'borrow-1')
+        self.client.force_authenticate(user=other_user)
+        response = self.post(self.url_borrow, 'borrow-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(CheckOut.objects.filter(book=self.book).count(), 2)
+
+    def test_viewset_create_honours_key(self):
+        url = reverse('checkout-list')
+        for _ in range(2):
+            response = self.post(url, 'create-1', {'book': self.book.pk})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CheckOut.objects.filter(book=self.book).count(), 1)
+
+    def test_oversized_key(self):
+        response = self.post(self.url_borrow, 'k' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CheckOut.objects.exists())
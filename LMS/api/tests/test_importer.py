@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, BookInfo
+from api.importer import CatalogImporter
+from api.search import get_search_backend
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+CSV_FEED = """title,author,ISBN,published_date,copies
+things fall apart,chinua achebe,9780435272463,1992-04-02,5
+arrow of god,chinua achebe,0-8436-1072-7,,0
+no title isbn,someone,1234567890123,2001-01-01,1
+,nobody,9781594489501,2001-01-01,1
+things fall apart,someone else,9780676978124,2001-01-01,1
+future book,someone,9780205080052,2999-01-01,1
+"""
+
+
+class CatalogImporterTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing = Book.objects.create(
+            title='half of a yellow sun', author='chimamanda adichie ngozie', ISBN='0676978126'
+        )
+
+    def test_csv_import_reports_every_row(self):
+        report = CatalogImporter(chunk_size=2).run(io.StringIO(CSV_FEED), 'csv')
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['duplicates'], 1)
+        self.assertEqual(report['failed'], 3)
+        self.assertEqual(
+            sorted(error['line'] for error in report['errors']), [4, 5, 6, 7]
+        )
+
+        book = Book.objects.get(isbn13='9780435272463')
+        self.assertEqual(book.title, 'Things Fall Apart')
+        self.assertEqual(book.info.copies, 5)
+        self.assertTrue(book.info.status)
+        self.assertFalse(Book.objects.get(isbn13='9780843610727').info.status)
+
+    def test_import_detects_existing_isbn_in_other_form(self):
+        feed = json.dumps({'title': 'Another', 'author': 'A', 'ISBN': '9780676978124'}) + '\n'
+        report = CatalogImporter().run(io.StringIO(feed), 'jsonl')
+        self.assertEqual(report['duplicates'], 1)
+        self.assertEqual(report['created'], 0)
+
+    def test_jsonl_bad_lines_do_not_abort(self):
+        lines = [
+            json.dumps({'title': 'First', 'author': 'A', 'ISBN': make_isbn(1), 'copies': 2}),
+            '{not json',
+            '[1, 2]',
+            json.dumps({'title': 'Second', 'author': 'B', 'isbn': make_isbn(2), 'book_copies': 'x'}),
+            json.dumps({'title': 'Third', 'author': 'C', 'isbn': make_isbn(3)}),
+            json.dumps({'title': 'Fourth', 'author': 'D', 'isbn': make_isbn(4), 'copies': 10 ** 6}),
+        ]
+        report = CatalogImporter().run(io.StringIO('\n'.join(lines)), 'jsonl')
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 4, 6])
+        self.assertIn('less than or equal to 32767', report['errors'][3]['errors']['copies'])
+
+    def test_import_uses_constant_queries_per_chunk(self):
+        lines = [
+            json.dumps({'title': f'Bulk {i}', 'author': 'A', 'ISBN': make_isbn(100 + i), 'copies': 1})
+            for i in range(50)
+        ]
+        # Duplicate check, savepoint, Book insert, BookInfo insert, ledger
+        # insert, search index delete and insert, savepoint release.
+        with self.assertNumQueries(8):
+            report = CatalogImporter(chunk_size=50).run(io.StringIO('\n'.join(lines)), 'jsonl')
+        self.assertEqual(report['created'], 50)
+        self.assertEqual(BookInfo.objects.filter(book__title__startswith='Bulk').count(), 50)
+
+    def test_imported_books_are_searchable(self):
+        CatalogImporter().run(io.StringIO(CSV_FEED), 'csv')
+        results = get_search_backend().search(Book.objects.all(), 'arrow')
+        self.assertEqual([book.title for book in results], ['Arrow Of God'])
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as feed:
+            feed.write(CSV_FEED)
+        self.addCleanup(os.remove, feed.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_catalog', feed.name, stdout=out, stderr=err)
+        self.assertIn('Created 2 book(s), skipped 1 duplicate(s), 3 row(s) failed.', out.getvalue())
+        self.assertIn('line 4', err.getvalue())
+
+
+class CatalogImportViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@gmail.com', password='adminpassword')
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.url = reverse('book-import')
+
+    def upload(self, name='feed.csv', content=CSV_FEED):
+        return {'file': SimpleUploadedFile(name, content.encode())}
+
+    def test_admin_can_import(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(path=self.url, data=self.upload(), format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(len(response.data['errors']), 4)
+
+    def test_non_admin_cannot_import(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(path=self.url, data=self.upload(), format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_missing_file_or_unknown_format(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(path=self.url, data={}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(path=self.url, data=self.upload('feed.xml'), format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = dict(self.upload('feed.xml'), format='xml')
+        response = self.client.post(path=self.url, data=data, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,127 @@
+import datetime
+from django.db import connection
+from django.db.models.functions import Upper
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.views import BookViewSet
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class IndexPlanTestCase(TestCase):
+    """
+    Seeds a catalog big enough for the planner to prefer indexes, then
+    EXPLAINs the queries behind the main endpoints and fails if any of them
+    reads a table front to back.
+    """
+    BOOKS = 3000
+    USERS = 60
+    HISTORY_PER_USER = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        books = Book.objects.bulk_create(
+            Book(
+                title=f'Plan Book {i}',
+                author=f'Author {i % 50}',
+                ISBN=make_isbn(i),
+                isbn13=make_isbn(i),
+                published_date=datetime.date(1950, 1, 1) + datetime.timedelta(days=i)
+            )
+            for i in range(cls.BOOKS)
+        )
+        BookInfo.objects.bulk_create(
+            BookInfo(book=book, copies=i % 7, status=bool(i % 7))
+            for i, book in enumerate(books)
+        )
+        users = User.objects.bulk_create(
+            User(email=f'plan{i}@email.com', password='!') for i in range(cls.USERS)
+        )
+        cls.user = users[0]
+
+        start = datetime.date(2020, 1, 1)
+        CheckOut.objects.bulk_create(
+            CheckOut(
+                book=books[i], user=users[i % cls.USERS],
+                due_date=start + datetime.timedelta(days=i % 90),
+                status=CheckOut.Status.PENDING if i % 4 else CheckOut.Status.OVERDUE
+            )
+            for i in range(cls.BOOKS)
+        )
+        ArchivedCheckOut.objects.bulk_create(
+            ArchivedCheckOut(
+                book=books[(u * cls.HISTORY_PER_USER + i) % cls.BOOKS], user=user,
+                checkout_date=start, return_date=start + datetime.timedelta(days=i)
+            )
+            for u, user in enumerate(users) for i in range(cls.HISTORY_PER_USER)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertNoSequentialScan(self, queryset):
+        plan = self.explain(queryset)
+        for line in plan.splitlines():
+            line = line.strip(' -')
+            if connection.vendor == 'sqlite':
+                full_scan = line.startswith('SCAN ') and ' USING ' not in line
+            else:
+                full_scan = 'Seq Scan' in line
+            self.assertFalse(full_scan, f'Sequential scan in plan:\n{plan}')
+
+    def test_available_books_by_copies(self):
+        view = BookViewSet(action='list', format_kwarg=None)
+        view.request = Request(APIRequestFactory().get('/api/books/'))
+        queryset = view.filter_queryset(view.get_queryset())
+        keyset_page = queryset.order_by(*view.pagination_class.keyset_ordering)[:10]
+        for page in (queryset[:10], keyset_page):
+            self.assertNoSequentialScan(page)
+            self.assertNotIn('TEMP B-TREE', self.explain(page))
+
+    def test_books_by_published_date(self):
+        self.assertNoSequentialScan(Book.objects.all()[:10])
+
+    def test_title_case_insensitive_lookup(self):
+        self.assertNoSequentialScan(
+            Book.objects.alias(upper_title=Upper('title')).filter(upper_title='PLAN BOOK 42')
+        )
+
+    def test_staff_checkouts(self):
+        self.assertNoSequentialScan(
+            CheckOut.objects.select_related('book', 'user').order_by('-checkout_date', '-id')[:10]
+        )
+
+    def test_user_checkouts(self):
+        self.assertNoSequentialScan(
+            CheckOut.objects.filter(user=self.user).order_by('-checkout_date')[:10]
+        )
+
+    def test_overdue_checkouts(self):
+        self.assertNoSequentialScan(
+            CheckOut.objects.filter(status=CheckOut.Status.PENDING, due_date__lt=datetime.date(2020, 1, 10))
+        )
+
+    def test_staff_history(self):
+        self.assertNoSequentialScan(
+            ArchivedCheckOut.objects.select_related('book', 'user').order_by('-return_date', '-id')[:10]
+        )
+
+    def test_user_history(self):
+        self.assertNoSequentialScan(
+            ArchivedCheckOut.objects.filter(user=self.user).order_by('-return_date')[:10]
+        )
+
+    def test_history_for_a_month(self):
+        self.assertNoSequentialScan(
+            ArchivedCheckOut.objects.returned_in(datetime.date(2020, 1, 1)).order_by('-return_date', '-id')[:10]
+        )
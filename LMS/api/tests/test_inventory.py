@@ -0,0 +1,135 @@
+import io
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, BookInfo, CheckOut, CopyMovement
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class CopyLedgerTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@email.com', password='password123')
+            for i in range(3)
+        ]
+        cls.books = []
+        for i in range(2):
+            book = Book.objects.create(title=f'Ledger Book {i}', author='Author', ISBN=make_isbn(i))
+            BookInfo.objects.set_copies(book.pk, 3)
+            book.info.refresh_from_db()
+            cls.books.append(book)
+
+    def info(self, book):
+        return BookInfo.objects.with_pending().get(book=book)
+
+    def test_return_is_appended_without_touching_copies(self):
+        book = self.books[0]
+        for user in self.users:
+            CheckOut.objects.create(book=book, user=user)
+        self.assertFalse(self.info(book).status)
+
+        CheckOut.objects.get(book=book, user=self.users[0]).return_book()
+        CheckOut.objects.get(book=book, user=self.users[0]).delete()
+        info = self.info(book)
+        self.assertEqual((info.copies, info.pending_copies, info.available_copies), (0, 1, 1))
+        self.assertTrue(info.status)
+        self.assertIsNotNone(info.pending_at)
+
+    def test_compaction_folds_pending_movements(self):
+        for book in self.books:
+            for user in self.users[:2]:
+                CheckOut.objects.create(book=book, user=user)
+                BookInfo.objects.release_copy(book.pk, user.pk)
+
+        out = io.StringIO()
+        call_command('compact_inventory', chunk_size=1, stdout=out)
+        self.assertIn('Folded 4 movement(s) in 2 batch(es).', out.getvalue())
+        self.assertFalse(CopyMovement.objects.pending().exists())
+        for book in self.books:
+            info = self.info(book)
+            self.assertEqual((info.copies, info.pending_copies, info.status), (3, 0, True))
+
+        out = io.StringIO()
+        call_command('compact_inventory', stdout=out)
+        self.assertIn('Folded 0 movement(s) in 0 batch(es).', out.getvalue())
+
+    def test_stock_counts_are_recorded_as_restocks_and_write_offs(self):
+        book = self.books[1]
+        CheckOut.objects.create(book=book, user=self.users[0])
+        BookInfo.objects.release_copy(book.pk, self.users[0].pk)
+
+        BookInfo.objects.set_copies(book.pk, 5, self.users[1].pk)
+        BookInfo.objects.set_copies(book.pk, 5)
+        BookInfo.objects.set_copies(book.pk, 0)
+        info = self.info(book)
+        self.assertEqual((info.copies, info.pending_copies, info.status), (0, 0, False))
+
+        trail = list(
+            CopyMovement.objects.filter(book=book).order_by('pk').values_list('kind', 'delta', 'user_id', 'folded')
+        )
+        self.assertEqual(trail, [
+            (CopyMovement.Kind.RESTOCK, 3, None, True),
+            (CopyMovement.Kind.CHECKOUT, -1, self.users[0].pk, True),
+            (CopyMovement.Kind.RETURN, 1, self.users[0].pk, True),
+            (CopyMovement.Kind.RESTOCK, 2, self.users[1].pk, True),
+            (CopyMovement.Kind.WRITEOFF, -5, None, True),
+        ])
+        self.assertEqual(sum(delta for _, delta, _, _ in trail), info.copies)
+
+
+class PendingAvailabilityViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.book = Book.objects.create(title='Shelved Book', author='Author', ISBN=make_isbn(1))
+        BookInfo.objects.set_copies(self.book.pk, 2)
+        self.detail_url = reverse('book-detail', kwargs={'pk': self.book.pk})
+        self.info_url = reverse('bookinfo-detail', kwargs={'pk': self.book.info.pk})
+
+    def test_reads_include_pending_returns(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('borrow_book', kwargs={'pk': self.book.pk}))
+        # The return leaves the info row alone, so only the pending
+        # movement can change the ETag.
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.post(reverse('return_book', kwargs={'pk': self.book.pk}))
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['book_copies'], 2)
+        self.assertEqual(self.client.get(self.info_url).data['copies'], 2)
+        self.assertEqual(BookInfo.objects.get(book=self.book).copies, 1)
+
+    def test_editing_copies_records_a_restock(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(self.info_url, {'copies': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['copies'], 4)
+        movement = CopyMovement.objects.filter(book=self.book).latest('pk')
+        self.assertEqual((movement.kind, movement.delta, movement.user), (CopyMovement.Kind.RESTOCK, 2, self.admin))
+
+    def test_editing_a_book_keeps_pending_returns_available(self):
+        BookInfo.objects.set_copies(self.book.pk, 1)
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('borrow_book', kwargs={'pk': self.book.pk}))
+        self.client.post(reverse('return_book', kwargs={'pk': self.book.pk}))
+        self.assertEqual(BookInfo.objects.get(book=self.book).copies, 0)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(self.detail_url, {'author': 'Another Author'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        info = BookInfo.objects.get(book=self.book)
+        self.assertEqual((info.copies, info.status), (0, True))
+        self.assertEqual(self.client.get(reverse('book-list')).data['count'], 1)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('borrow_book', kwargs={'pk': self.book.pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,148 @@
+import io
+import datetime
+from unittest import mock
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from accounts.models import LibraryProfile
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.returns import ReturnProcessor
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class LoanCountersTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        cls.other = User.objects.create_user(email='user2@email.com', password='password123')
+        cls.books = []
+        for i in range(4):
+            book = Book.objects.create(title=f'Counted Loan {i}', author='Author', ISBN=make_isbn(i))
+            BookInfo.objects.set_copies(book.pk, 2)
+            book.info.refresh_from_db()
+            cls.books.append(book)
+
+    def counters(self, user):
+        return LibraryProfile.objects.filter(user=user).values_list(
+            'active_loans', 'overdue_loans', 'lifetime_loans'
+        ).get()
+
+    def test_borrowing_and_returning_move_the_counters(self):
+        CheckOut.objects.create(book=self.books[0], user=self.user)
+        checkouts, errors = CheckOut.objects.borrow_many(self.user, [self.books[1].pk, self.books[2].pk])
+        self.assertEqual((len(checkouts), errors), (2, {}))
+        self.assertEqual(self.counters(self.user), (3, 0, 3))
+        self.assertEqual(self.counters(self.other), (0, 0, 0))
+
+        CheckOut.objects.return_and_archive(self.user.pk, self.books[0].pk)
+        checkout = CheckOut.objects.get(user=self.user, book=self.books[1])
+        checkout.return_book()
+        checkout.delete()
+        self.assertEqual(self.counters(self.user), (1, 0, 3))
+
+    def test_overdue_loans_are_counted_until_returned(self):
+        for book in self.books[:3]:
+            CheckOut.objects.create(book=book, user=self.user)
+        CheckOut.objects.create(book=self.books[0], user=self.other)
+        CheckOut.objects.update(due_date=datetime.date.today() - datetime.timedelta(days=1))
+
+        self.assertEqual(sum(CheckOut.objects.mark_overdue(chunk_size=2)), 4)
+        self.assertEqual(self.counters(self.user), (3, 3, 3))
+        self.assertEqual(self.counters(self.other), (1, 1, 1))
+
+        CheckOut.objects.return_and_archive(self.user.pk, self.books[0].pk)
+        checkout = CheckOut.objects.get(user=self.user, book=self.books[1])
+        checkout.set_status(CheckOut.Status.PENDING)
+        self.assertEqual(self.counters(self.user), (2, 1, 3))
+
+        report = ReturnProcessor().run([
+            {'user': self.user.pk, 'book': self.books[2].pk},
+            {'user': self.other.pk, 'book': self.books[0].pk},
+        ])
+        self.assertEqual(report['returned'], 2)
+        self.assertEqual(self.counters(self.user), (1, 0, 3))
+        self.assertEqual(self.counters(self.other), (0, 0, 1))
+
+    def test_overdue_chunk_changed_after_it_was_read_is_redone(self):
+        for book in self.books[:2]:
+            CheckOut.objects.create(book=book, user=self.user)
+        CheckOut.objects.update(due_date=datetime.date.today() - datetime.timedelta(days=1))
+        update, flips = QuerySet.update, []
+
+        def update_after_a_return(queryset, **kwargs):
+            # What a return committing between the chunk's SELECT and its
+            # UPDATE looks like where the SELECT took no lock.
+            if kwargs.get('status') == CheckOut.Status.OVERDUE:
+                flips.append(queryset)
+                if len(flips) == 1:
+                    update(CheckOut.objects.filter(book=self.books[0]), status=CheckOut.Status.RETURNED)
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_after_a_return):
+            self.assertEqual(sum(CheckOut.objects.mark_overdue()), 2)
+        self.assertEqual(len(flips), 2)
+        self.assertEqual(self.counters(self.user), (2, 2, 2))
+        self.assertEqual(CheckOut.objects.filter(status=CheckOut.Status.OVERDUE).count(), 2)
+
+    def test_reconcile_corrects_drift(self):
+        for book in self.books[:2]:
+            CheckOut.objects.create(book=book, user=self.user)
+        CheckOut.objects.filter(book=self.books[0]).update(status=CheckOut.Status.OVERDUE)
+        ArchivedCheckOut.objects.create(
+            book=self.books[3], user=self.user,
+            checkout_date=datetime.date(2024, 1, 1), return_date=datetime.date(2024, 1, 10)
+        )
+        LibraryProfile.objects.filter(user=self.other).update(active_loans=4, lifetime_loans=9)
+
+        out = io.StringIO()
+        call_command('reconcile_loan_counters', chunk_size=1, stdout=out)
+        self.assertIn('Checked 2 profile(s), corrected 2.', out.getvalue())
+        self.assertEqual(self.counters(self.user), (2, 1, 3))
+        # Lifetime loans are only ever raised, since history gets pruned.
+        self.assertEqual(self.counters(self.other), (0, 0, 9))
+
+        out = io.StringIO()
+        call_command('reconcile_loan_counters', stdout=out)
+        self.assertIn('Checked 2 profile(s), corrected 0.', out.getvalue())
+
+
+class LoanSummaryViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.other = User.objects.create_user(email='user2@email.com', password='password123')
+        self.book = Book.objects.create(title='Summarised Book', author='Author', ISBN=make_isbn(1))
+        BookInfo.objects.set_copies(self.book.pk, 2)
+        self.url = reverse('users-summary', kwargs={'pk': self.user.pk})
+
+    def test_summary_is_one_read(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('borrow_book', kwargs={'pk': self.book.pk}))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(response.data['email'], self.user.email)
+        self.assertEqual(
+            (response.data['active_loans'], response.data['overdue_loans'], response.data['lifetime_loans']),
+            (1, 0, 1)
+        )
+
+    def test_only_the_owner_or_staff_can_read_it(self):
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
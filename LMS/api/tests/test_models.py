@@ -137,6 +137,29 @@ class BookTestCase(TestCase):
         with self.assertRaises(BookInfo.DoesNotExist):
             _ = BookInfo.objects.get(book=self.book1.pk)
 
+    def test_canonical_isbn13(self):
+        """
+        Test that ISBN-10 and hyphenated ISBNs are stored as a canonical ISBN-13.
+        """
+        self.assertEqual(self.book1.isbn13, '9780676978124')
+        book = Book.objects.create(
+            title='Another Book',
+            author='Another Author',
+            ISBN='0-8436-1072-7'
+        )
+        self.assertEqual(book.isbn13, '9780843610727')
+
+    def test_unique_canonical_isbn_constraint(self):
+        """
+        Test that the same ISBN cannot be stored twice in different forms.
+        """
+        with self.assertRaises(IntegrityError):
+            Book.objects.create(
+                title='Another Book',
+                author='Another Author',
+                ISBN='978-0-676-97812-4'
+            )
+
     def test_unique_isbn_constraint(self):
         """
         Test the unique constraint on the ISBN field of the Book model.
@@ -171,7 +194,7 @@ class CheckOutTestCase(TestCase):
             password= 'secret1234'
         )
         cls.book1.info.copies = 5
-        cls.book1.save()
+        cls.book1.info.save()
 
         cls.checkout1 = CheckOut.objects.create(
             book = cls.book1,
@@ -214,7 +237,7 @@ class CheckOutTestCase(TestCase):
 
     def test_cannot_checkout_book_unavailable_or_no_copies(self):
         self.book1.info.copies = 0
-        self.book1.save()
+        self.book1.info.save()
         message = 'No copies available for checkout.'
         with self.assertRaises(ValidationError, msg=message):
             CheckOut.objects.create(
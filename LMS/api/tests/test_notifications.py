@@ -0,0 +1,240 @@
+import asyncio
+import json
+from datetime import date
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from api.models import Book, CheckOut
+from api.notifications import AvailabilityHub, PostgresBroadcast, hub
+from api.throttling import TokenBucketThrottle
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+def parse_event(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+    return fields['event'], json.loads(fields['data'])
+
+
+class AvailabilityHubTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        cls.books = [
+            Book.objects.create(title=f'Watched Book {i}', author='Author', ISBN=make_isbn(i))
+            for i in range(2)
+        ]
+        for book in cls.books:
+            book.info.copies = 2
+            book.info.save()
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.hub = AvailabilityHub()
+
+    def drain(self, subscription):
+        events = []
+        self.loop.run_until_complete(asyncio.sleep(0))
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    def test_only_watchers_of_a_changed_book_are_told(self):
+        first = self.hub.subscribe([self.books[0].pk], loop=self.loop)
+        both = self.hub.subscribe([book.pk for book in self.books], loop=self.loop)
+
+        self.books[1].info.copies = 1
+        self.books[1].info.save()
+        self.hub.deliver([self.books[1].pk])
+
+        self.assertEqual(self.drain(first), [])
+        self.assertEqual(self.drain(both), [{'book': self.books[1].pk, 'copies': 1, 'status': True}])
+
+    def test_unchanged_books_and_unwatched_books_cost_nothing(self):
+        subscription = self.hub.subscribe([self.books[0].pk], loop=self.loop)
+        with self.assertNumQueries(0):
+            self.hub.deliver([self.books[1].pk])
+        self.hub.deliver([self.books[0].pk])
+        self.hub.deliver([self.books[0].pk])
+        self.assertEqual(len(self.drain(subscription)), 1)
+
+        self.hub.unsubscribe(subscription)
+        self.assertEqual(dict(self.hub.subscribers), {})
+        with self.assertNumQueries(0):
+            self.hub.deliver([self.books[0].pk])
+
+    def test_slow_clients_keep_only_the_latest_events(self):
+        subscription = self.hub.subscribe([self.books[0].pk], loop=self.loop)
+        subscription.queue = asyncio.Queue(maxsize=2)
+        for copies in (1, 0, 2):
+            self.books[0].info.copies = copies
+            self.books[0].info.save()
+            self.hub.deliver([self.books[0].pk])
+        self.assertEqual([event['copies'] for event in self.drain(subscription)], [0, 2])
+
+    def test_checkouts_and_returns_are_delivered_on_commit(self):
+        subscription = hub.subscribe([self.books[0].pk], loop=self.loop)
+        self.addCleanup(hub.unsubscribe, subscription)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CheckOut.objects.create(book=self.books[0], user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout = CheckOut.objects.get(book=self.books[0], user=self.user)
+            checkout.status = CheckOut.Status.RETURNED
+            checkout.return_date = date.today()
+            checkout.save()
+            checkout.delete()
+
+        self.assertEqual(
+            [event['copies'] for event in self.drain(subscription)], [1, 2]
+        )
+
+
+class Stop(BaseException):
+    """Ends the otherwise endless listening loop."""
+
+
+class PostgresBroadcastTestCase(SimpleTestCase):
+
+    def listener(self, *polls):
+        """A connection whose successive ``poll()`` calls receive ``polls``."""
+        listener = mock.MagicMock(notifies=[])
+        polls = iter(polls)
+
+        def poll():
+            received = next(polls)
+            if not isinstance(received, list):
+                raise received
+            listener.notifies.extend(mock.Mock(payload=payload) for payload in received)
+        listener.poll.side_effect = poll
+        return listener
+
+    def test_listener_reconnects_after_a_failure(self):
+        lost = self.listener(OSError('server closed the connection'))
+        listener = self.listener(['[3]', 'not json'], Stop)
+        fake_hub = mock.Mock(spec=AvailabilityHub)
+        fake_hub.watched.return_value = [3, 4]
+
+        with mock.patch('api.notifications.connection') as connection, \
+                mock.patch('api.notifications.select.select', side_effect=lambda r, w, x, timeout: (r, w, x)), \
+                mock.patch('api.notifications.time.sleep') as sleep, \
+                self.assertLogs('api.notifications', 'ERROR') as logs, \
+                self.assertRaises(Stop):
+            connection.get_new_connection.side_effect = [lost, listener]
+            PostgresBroadcast().listen(fake_hub)
+
+        self.assertIn('reconnecting in 1s', logs.output[0])
+        lost.close.assert_called_once_with()
+        sleep.assert_called_once_with(1)
+        listener.cursor().__enter__().execute.assert_called_once_with('LISTEN book_availability')
+        # Changes missed while disconnected are picked up, then new ones.
+        self.assertEqual(fake_hub.deliver.call_args_list, [mock.call([3, 4]), mock.call({3})])
+
+    def test_reconnecting_backs_off(self):
+        with mock.patch('api.notifications.connection') as connection, \
+                mock.patch('api.notifications.time.sleep', side_effect=[None] * 7 + [Stop]) as sleep, \
+                self.assertLogs('api.notifications', 'ERROR'), \
+                self.assertRaises(Stop):
+            connection.get_new_connection.side_effect = OSError('could not connect to server')
+            PostgresBroadcast().listen(mock.Mock(spec=AvailabilityHub))
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2, 4, 8, 16, 32, 60, 60])
+
+
+class AvailabilityStreamTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        cls.book = Book.objects.create(title='Streamed Book', author='Author', ISBN=make_isbn(1))
+        cls.book.info.copies = 1
+        cls.book.info.save()
+        cls.url = reverse('availability_stream')
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.async_client.force_login(self.user)
+
+    async def disconnect(self, content):
+        # What the ASGI handler does when the client goes away: the pending
+        # read is cancelled inside the stream.
+        read = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+
+    def borrow(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CheckOut.objects.create(book=self.book, user=self.user)
+
+    async def test_stream_sends_a_snapshot_then_changes(self):
+        response = await self.async_client.get(self.url, {'books': str(self.book.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        content = response.streaming_content
+        try:
+            self.assertEqual(
+                parse_event(await anext(content)),
+                ('availability', {'book': self.book.pk, 'copies': 1, 'status': True})
+            )
+            await sync_to_async(self.borrow)()
+            event = await asyncio.wait_for(anext(content), 1)
+            self.assertEqual(
+                parse_event(event), ('availability', {'book': self.book.pk, 'copies': 0, 'status': False})
+            )
+        finally:
+            await self.disconnect(content)
+        self.assertNotIn(self.book.pk, hub.subscribers)
+
+    async def test_idle_stream_sends_keep_alive_comments(self):
+        with self.settings(AVAILABILITY_KEEPALIVE=0.01):
+            response = await self.async_client.get(self.url, {'books': str(self.book.pk)})
+            content = response.streaming_content
+            try:
+                await anext(content)
+                self.assertEqual(await asyncio.wait_for(anext(content), 1), b': keep-alive\n\n')
+            finally:
+                await self.disconnect(content)
+
+    async def test_books_must_be_given(self):
+        for query in ({}, {'books': 'a,b'}, {'books': ','.join(str(i) for i in range(1, 60))}):
+            response = await self.async_client.get(self.url, query)
+            self.assertEqual(response.status_code, 400)
+
+    async def test_streams_need_an_authenticated_user(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get(self.url, {'books': str(self.book.pk)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_streams_are_refused_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'books': str(self.book.pk)})
+        self.assertEqual(response.status_code, 501)
+
+    async def test_open_streams_per_user_are_limited(self):
+        streams = []
+        try:
+            with self.settings(AVAILABILITY_STREAMS_PER_USER=2):
+                for _ in range(2):
+                    response = await self.async_client.get(self.url, {'books': str(self.book.pk)})
+                    streams.append(response.streaming_content)
+                    await anext(streams[-1])
+                response = await self.async_client.get(self.url, {'books': str(self.book.pk)})
+                self.assertEqual(response.status_code, 429)
+        finally:
+            for content in streams:
+                await self.disconnect(content)
+        self.assertEqual(hub.streams_of(self.user.pk), 0)
+
+    async def test_connections_are_throttled(self):
+        with mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', {'stream': '2/min'}):
+            codes = [(await self.async_client.get(self.url)).status_code for _ in range(3)]
+        self.assertEqual(codes, [400, 400, 429])
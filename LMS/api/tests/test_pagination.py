@@ -0,0 +1,92 @@
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, ArchivedCheckOut
+from api.tests.test_queries import make_isbn
+import datetime
+
+User = get_user_model()
+
+
+class KeysetPaginationTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user1@email.com', password='password123')
+        # Only three distinct copy counts so most pages split a run of ties.
+        for i in range(13):
+            book = Book.objects.create(
+                title=f'Paged Book {i}', author='Author A', ISBN=make_isbn(i)
+            )
+            book.info.copies = 1 + i % 3
+            book.info.save()
+            ArchivedCheckOut.objects.create(
+                book=book, user=cls.user,
+                checkout_date=datetime.date(2012, 1, 1),
+                return_date=datetime.date(2012, 1, 2 + i % 2)
+            )
+        cls.book_url = reverse('book-list')
+        cls.history_url = reverse('history-list')
+
+    def walk(self, url, params, link='next'):
+        pages = []
+        response = self.client.get(path=url, data=params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data['results'])
+            if not response.data[link]:
+                return pages
+            response = self.client.get(path=response.data[link])
+
+    def test_default_is_page_number_pagination(self):
+        response = self.client.get(path=self.book_url)
+        self.assertEqual(response.data['count'], 13)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_cursor_walk_visits_every_book_once_in_order(self):
+        pages = self.walk(self.book_url, {'pagination': 'cursor', 'page_size': 4})
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 1])
+        titles = [row['title'] for page in pages for row in page]
+        expected = Book.objects.order_by('-info__copies', '-id').values_list('title', flat=True)
+        self.assertEqual(titles, list(expected))
+
+    def test_cursor_response_has_no_count(self):
+        response = self.client.get(path=self.book_url, data={'pagination': 'cursor'})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('cursor=', response.data['next'])
+        self.assertNotIn('pagination=', response.data['next'])
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get(path=self.book_url, data={'pagination': 'cursor', 'page_size': 4})
+        second = self.client.get(path=first.data['next'])
+        back = self.client.get(path=second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(
+            path=self.book_url, data={'pagination': 'cursor', 'page_size': 10_000}
+        )
+        self.assertEqual(len(response.data['results']), 13)
+        self.assertIsNone(response.data['next'])
+
+    def test_deep_pages_cost_one_query(self):
+        first = self.client.get(path=self.book_url, data={'pagination': 'cursor', 'page_size': 2})
+        response = self.client.get(path=first.data['next'])
+        for _ in range(4):
+            with self.assertNumQueries(1):
+                response = self.client.get(path=response.data['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ['garbage', 'eyJ2IjogWzFdfQ==']:
+            response = self.client.get(path=self.book_url, data={'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_history_cursor_walk(self):
+        self.client.force_authenticate(user=self.user)
+        pages = self.walk(self.history_url, {'pagination': 'cursor', 'page_size': 5})
+        ids = [row['id'] for page in pages for row in page]
+        expected = ArchivedCheckOut.objects.order_by('-return_date', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
@@ -0,0 +1,125 @@
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, CheckOut, ArchivedCheckOut
+import isbnlib
+
+User = get_user_model()
+
+
+def make_isbn(seed):
+    """Builds a valid ISBN-13 from a numeric seed."""
+    body = f"978{seed:09d}"
+    return body + isbnlib.check_digit13(body)
+
+
+class QueryBudgetMixin:
+    """
+    Seeds enough rows to fill a page and asserts that list and detail
+    endpoints stay within a fixed number of queries.
+
+    List endpoints get two queries (COUNT for the paginator plus the page
+    itself), detail endpoints get one. Any serializer field that walks a
+    relation without a matching select_related will blow the budget.
+    """
+    LIST_BUDGET = 2
+    DETAIL_BUDGET = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@email.com', password='password123')
+            for i in range(3)
+        ]
+        cls.books = []
+        for i in range(12):
+            book = Book.objects.create(
+                title=f'Budget Book {i}',
+                author=f'Author {i % 4}',
+                ISBN=make_isbn(i),
+                published_date='2020-01-01'
+            )
+            book.info.copies = 5
+            book.info.save()
+            cls.books.append(book)
+
+        for user in cls.users:
+            for book in cls.books[:6]:
+                CheckOut.objects.create(book=book, user=user)
+                ArchivedCheckOut.objects.create(
+                    book=book, user=user, checkout_date='2012-01-01', return_date='2012-01-03'
+                )
+
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(path=url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+
+class CatalogQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+
+    def test_book_list(self):
+        response = self.assertQueryBudget(reverse('book-list'), self.LIST_BUDGET)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_book_detail(self):
+        self.assertQueryBudget(
+            reverse('book-detail', kwargs={'pk': self.books[0].pk}), self.DETAIL_BUDGET
+        )
+
+    def test_bookinfo_list(self):
+        self.assertQueryBudget(reverse('bookinfo-list'), self.LIST_BUDGET)
+
+    def test_bookinfo_detail(self):
+        self.assertQueryBudget(
+            reverse('bookinfo-detail', kwargs={'pk': self.books[0].info.pk}), self.DETAIL_BUDGET
+        )
+
+    def test_borrow_and_return_views_get(self):
+        self.client.force_authenticate(user=self.users[0])
+        self.assertQueryBudget(
+            reverse('borrow_book', kwargs={'pk': self.books[0].pk}), self.DETAIL_BUDGET
+        )
+        self.assertQueryBudget(
+            reverse('return_book', kwargs={'pk': self.books[0].pk}), self.DETAIL_BUDGET
+        )
+
+
+class CirculationQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+
+    def test_checkout_list_as_user(self):
+        self.client.force_authenticate(user=self.users[0])
+        self.assertQueryBudget(reverse('checkout-list'), self.LIST_BUDGET)
+
+    def test_checkout_list_as_admin(self):
+        self.client.force_authenticate(user=self.admin)
+        self.assertQueryBudget(reverse('checkout-list'), self.LIST_BUDGET)
+
+    def test_checkout_detail(self):
+        self.client.force_authenticate(user=self.admin)
+        checkout = CheckOut.objects.filter(user=self.users[0]).first()
+        self.assertQueryBudget(
+            reverse('checkout-detail', kwargs={'pk': checkout.pk}), self.DETAIL_BUDGET
+        )
+
+    def test_history_list_as_user(self):
+        self.client.force_authenticate(user=self.users[0])
+        self.assertQueryBudget(reverse('history-list'), self.LIST_BUDGET)
+
+    def test_history_list_as_admin(self):
+        self.client.force_authenticate(user=self.admin)
+        self.assertQueryBudget(reverse('history-list'), self.LIST_BUDGET)
+
+
+class UserQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+
+    def test_user_list(self):
+        self.assertQueryBudget(reverse('users-list'), self.LIST_BUDGET)
+
+    def test_user_detail(self):
+        self.assertQueryBudget(
+            reverse('users-detail', kwargs={'pk': self.users[0].pk}), self.DETAIL_BUDGET
+        )
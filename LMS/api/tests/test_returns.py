@@ -0,0 +1,137 @@
+import io
+import os
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.returns import ReturnProcessor, parse_line
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class ReturnProcessorTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@email.com', password='password123')
+            for i in range(3)
+        ]
+        cls.books = []
+        for i in range(3):
+            book = Book.objects.create(title=f'Drop Book {i}', author='Author', ISBN=make_isbn(i))
+            book.info.copies = 3
+            book.info.save()
+            cls.books.append(book)
+        for user in cls.users:
+            for book in cls.books[:2]:
+                CheckOut.objects.create(book=book, user=user)
+        # Only one patron has the third book, so its barcode is unambiguous.
+        CheckOut.objects.create(book=cls.books[2], user=cls.users[0])
+
+    def copies(self):
+        return list(
+            info.available_copies
+            for info in BookInfo.objects.with_pending().filter(book__in=self.books).order_by('book_id')
+        )
+
+    def test_pairs_and_barcodes_are_returned_set_wise(self):
+        items = [
+            {'user': user.pk, 'book': book.pk} for user in self.users for book in self.books[:2]
+        ] + [{'barcode': self.books[2].ISBN}]
+
+        with CaptureQueriesContext(connection) as context:
+            report = ReturnProcessor().run(items)
+        statements = [
+            query['sql'].split()[0] for query in context.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        self.assertEqual(statements, ['SELECT', 'SELECT', 'INSERT', 'UPDATE', 'INSERT', 'DELETE', 'UPDATE'])
+
+        self.assertEqual(report, {'returned': 7, 'failed': 0, 'errors': []})
+        self.assertFalse(CheckOut.objects.exists())
+        self.assertEqual(ArchivedCheckOut.objects.count(), 7)
+        self.assertEqual(self.copies(), [3, 3, 3])
+        self.assertTrue(all(BookInfo.objects.values_list('status', flat=True)))
+
+    def test_bad_items_are_reported_without_stopping_the_rest(self):
+        items = [
+            {'user': self.users[0].pk, 'book': self.books[0].pk},
+            {'user': self.users[0].pk, 'book': self.books[0].pk},
+            {'barcode': self.books[0].ISBN},
+            {'barcode': 'not-an-isbn'},
+            {'barcode': make_isbn(99)},
+            {'user': 'x'},
+            ['nope'],
+        ]
+        report = ReturnProcessor(chunk_size=3).run(items)
+        self.assertEqual(report['returned'], 1)
+        self.assertEqual([error['item'] for error in report['errors']], [2, 3, 4, 5, 6, 7])
+        self.assertIn('Several patrons', report['errors'][1]['error'])
+        self.assertEqual(self.copies(), [1, 0, 2])
+
+    def test_only_the_given_pairs_are_read(self):
+        items = [
+            {'user': self.users[0].pk, 'book': self.books[0].pk},
+            {'user': self.users[1].pk, 'book': self.books[1].pk},
+        ]
+        with CaptureQueriesContext(connection) as context, mock.patch.object(ReturnProcessor, 'write'):
+            ReturnProcessor().run(items)
+        select = next(query['sql'] for query in context.captured_queries if 'api_checkout' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(select)
+            read = [row[0] for row in cursor.fetchall()]
+        self.assertEqual(read, [
+            CheckOut.objects.get(user=self.users[0], book=self.books[0]).pk,
+            CheckOut.objects.get(user=self.users[1], book=self.books[1]).pk,
+        ])
+
+    def test_parse_line(self):
+        self.assertEqual(parse_line('3, 7\n'), {'user': '3', 'book': '7'})
+        self.assertEqual(parse_line('978-0-435-27246-3\n'), {'barcode': '978-0-435-27246-3'})
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as feed:
+            feed.write(f'{self.users[1].pk},{self.books[1].pk}\n\n{self.books[2].ISBN}\n{self.users[1].pk},{self.books[2].pk}\n')
+        self.addCleanup(os.remove, feed.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('process_returns', feed.name, stdout=out, stderr=err)
+        self.assertIn('Returned 2 checkout(s), 1 item(s) failed.', out.getvalue())
+        self.assertIn('item 3: No active checkout', err.getvalue())
+
+
+class BatchReturnViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.book = Book.objects.create(title='Drop Book', author='Author', ISBN=make_isbn(1))
+        self.book.info.copies = 1
+        self.book.info.save()
+        CheckOut.objects.create(book=self.book, user=self.user)
+        self.url = reverse('checkout-batch-return')
+
+    def test_staff_can_process_returns(self):
+        self.client.force_authenticate(user=self.admin)
+        data = {'items': [{'user': self.user.pk, 'book': self.book.pk}, {'user': self.user.pk, 'book': 999}]}
+        response = self.client.post(path=self.url, data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['returned'], 1)
+        self.assertEqual(response.data['errors'], [{'item': 2, 'error': 'No active checkout to return.'}])
+        self.assertTrue(BookInfo.objects.get(book=self.book).status)
+
+    def test_members_cannot_process_returns(self):
+        self.client.force_authenticate(user=self.user)
+        data = {'items': [{'user': self.user.pk, 'book': self.book.pk}]}
+        response = self.client.post(path=self.url, data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(CheckOut.objects.exists())
@@ -0,0 +1,117 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from api.models import Book
+from api.search import get_search_backend, tokenize, SubstringSearchBackend
+from io import StringIO
+
+
+class SearchBackendTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.adichie = Book.objects.create(
+            title='half of a yellow sun',
+            author='chimamanda adichie ngozie',
+            ISBN='9780676978124',
+            published_date='2008-06-03'
+        )
+        cls.hosseini = Book.objects.create(
+            title='a thousand splendid suns',
+            author='khaled hosseini',
+            ISBN='9781594489501',
+            published_date='2007-05-22'
+        )
+        cls.about_adichie = Book.objects.create(
+            title='reading adichie',
+            author='some critic',
+            ISBN='0-8436-1072-7',
+            published_date='2010-01-01'
+        )
+
+    def search(self, query):
+        return list(get_search_backend().search(Book.objects.all(), query))
+
+    def test_tokenize_drops_query_syntax(self):
+        self.assertEqual(tokenize('"Sun"* OR -yellow'), ['sun', 'or', 'yellow'])
+        self.assertEqual(tokenize('  '), [])
+
+    def test_search_matches_title_author_and_isbn(self):
+        self.assertEqual(self.search('yellow'), [self.adichie])
+        self.assertEqual(self.search('hosseini'), [self.hosseini])
+        self.assertEqual(self.search('0843610727'), [self.about_adichie])
+
+    def test_search_matches_prefixes_of_every_term(self):
+        self.assertEqual(self.search('splend thou'), [self.hosseini])
+        self.assertEqual(self.search('splend yellow'), [])
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search('adichie'), [self.about_adichie, self.adichie])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.hosseini.title = 'the kite runner'
+        self.hosseini.save()
+        self.assertEqual(self.search('splendid'), [])
+        self.assertEqual(self.search('kite'), [self.hosseini])
+
+        self.hosseini.delete()
+        self.assertEqual(self.search('kite'), [])
+
+    def test_rebuild_command(self):
+        get_search_backend().clear()
+        self.assertEqual(self.search('yellow'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 book(s)', out.getvalue())
+        self.assertEqual(self.search('yellow'), [self.adichie])
+
+    @override_settings(CATALOG_SEARCH_BACKEND='api.search.SubstringSearchBackend')
+    def test_configured_backend(self):
+        self.assertIsInstance(get_search_backend(), SubstringSearchBackend)
+        self.assertEqual(self.search('yellow'), [self.adichie])
+
+
+class BookSearchViewTestCase(APITestCase):
+
+    def setUp(self):
+        catalog = [
+            ('the river between', '9780676978124'),
+            ('river and sea', '9781594489501'),
+            ('desert', '0205080057'),
+        ]
+        for title, isbn in catalog:
+            book = Book.objects.create(title=title, author='Author A', ISBN=isbn)
+            book.info.copies = 1
+            book.info.save()
+
+    def test_search_endpoint_filters_results(self):
+        response = self.client.get(path=reverse('book-list'), data={'search': 'river'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [result['title'] for result in response.data['results']]
+        self.assertCountEqual(titles, ['The River Between', 'River And Sea'])
+
+    def test_empty_search_lists_everything(self):
+        response = self.client.get(path=reverse('book-list'), data={'search': ''})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_search_results_stay_ranked_across_pages(self):
+        # Title matches rank first however few copies they have.
+        for title, author, isbn, copies in [
+            ('kite runner', 'khaled hosseini', '9780143034902', 1),
+            ('kite season', 'khaled hosseini', '9780307265470', 2),
+            ('plain tales', 'kite reviewer', '9780060935467', 8),
+            ('other tales', 'kite reviewer', '9780316769174', 9),
+        ]:
+            book = Book.objects.create(title=title, author=author, ISBN=isbn)
+            book.info.copies = copies
+            book.info.save()
+
+        for mode in ({}, {'pagination': 'cursor'}):
+            response = self.client.get(reverse('book-list'), {'search': 'kite', 'page_size': 2, **mode})
+            titles = [result['title'] for result in response.data['results']]
+            titles += [result['title'] for result in self.client.get(response.data['next']).data['results']]
+            self.assertCountEqual(titles[:2], ['Kite Runner', 'Kite Season'])
+            self.assertCountEqual(titles[2:], ['Plain Tales', 'Other Tales'])
@@ -1,7 +1,7 @@
 from unittest import mock
 from django.test import TestCase
 from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
-from django.db.models.signals import post_save, post_delete, pre_delete
+from django.db.models.signals import post_save, pre_delete
 from django.contrib.auth import get_user_model
 
 
@@ -78,7 +78,7 @@ class CheckOutSignalTest(TestCase):
             password= 'pass1234'
         )
         cls.book.info.copies = 5
-        cls.book.save()
+        cls.book.info.save()
 
         cls.dummy_checkout = CheckOut.objects.create(
                 book = cls.book,
@@ -127,7 +127,8 @@ class CheckOutSignalTest(TestCase):
                 user= self.user2)
             
             mocked_handler.assert_called()
-            self.assertEqual(mocked_handler.call_count, 2)
+            # The due date is set before the insert, so post_save fires once.
+            self.assertEqual(mocked_handler.call_count, 1)
             self.book.refresh_from_db()
             self.assertEqual(self.book.info.copies, 2)
 
@@ -150,8 +151,8 @@ class CheckOutSignalTest(TestCase):
                     origin=mock.ANY
                 )
             ])
-            self.book.refresh_from_db()
-            self.assertEqual(self.book.info.copies, 4)
+            info = BookInfo.objects.with_pending().get(book=self.book)
+            self.assertEqual(info.available_copies, 4)
 
     def test_create_archived_checkout_signal(self):
         with mock.patch(
@@ -179,31 +180,3 @@ class CheckOutSignalTest(TestCase):
             book=self.book,
             user_id=1).exists()
         self.assertTrue(archived)
-
-    def test_confirm_archived_checkout_instance_signal(self):
-        with mock.patch(
-            'api.signals.confirm_archived_checkout_instance',
-            autospec=True) as mocked_handler:
-            post_delete.connect(mocked_handler, sender=CheckOut)
-
-            # Trigger the signal by deleting the CheckOut
-            self.dummy_checkout.return_book()
-            self.dummy_checkout.delete()
-
-            mocked_handler.assert_called_once()
-            mocked_handler.assert_has_calls([
-                mock.call(
-                    signal=post_delete,
-                    sender=CheckOut,
-                    instance=self.dummy_checkout,
-                    using=mock.ANY,
-                    origin= mock.ANY
-                )
-            ])
-
-        # Ensure the ArchivedCheckOut instance exists
-        archived = ArchivedCheckOut.objects.filter(
-            book=self.book,
-            user_id=1).exists()
-        self.assertTrue(archived)
-
@@ -0,0 +1,133 @@
+import io
+import datetime
+import tempfile
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api import similar
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut, BorrowedBook, CoBorrowing, SimilarBook
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class CoBorrowingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@email.com', password='password123')
+            for i in range(3)
+        ]
+        cls.books = []
+        for i in range(4):
+            book = Book.objects.create(title=f'Paired Book {i}', author='Author', ISBN=make_isbn(i))
+            BookInfo.objects.set_copies(book.pk, 5)
+            book.info.refresh_from_db()
+            cls.books.append(book)
+
+    def borrow(self, user, *indexes):
+        for index in indexes:
+            CheckOut.objects.create(book=self.books[index], user=self.users[user])
+
+    def fold(self, **options):
+        return sum(similar.fold(settle=timedelta(0), **options))
+
+    def recommendations(self, index):
+        return [
+            (self.books.index(row.similar), row.borrowed_together)
+            for row in similar.similar_to(self.books[index].pk)
+        ]
+
+    def borrow_everything(self):
+        self.borrow(0, 0, 1, 2)
+        self.borrow(1, 0, 1)
+        self.borrow(2, 0, 3)
+
+    def test_fold_builds_the_matrix_incrementally(self):
+        self.borrow_everything()
+        self.assertEqual(self.fold(chunk_size=2), 7)
+        self.assertEqual(self.recommendations(0), [(1, 2), (2, 1), (3, 1)])
+        self.assertEqual(self.recommendations(3), [(0, 1)])
+        self.assertEqual(CoBorrowing.objects.count(), 8)
+
+        # Borrowing a book again is not a new co-occurrence.
+        CheckOut.objects.return_and_archive(self.users[2].pk, self.books[0].pk)
+        self.borrow(2, 0)
+        self.borrow(1, 3)
+        self.assertEqual(self.fold(), 2)
+        self.assertEqual(self.recommendations(3), [(0, 2), (1, 1)])
+        self.assertEqual(self.recommendations(0), [(1, 2), (3, 2), (2, 1)])
+        self.assertEqual(self.fold(), 0)
+
+    def test_recent_checkouts_wait_for_the_next_fold(self):
+        self.borrow_everything()
+        self.assertEqual(sum(similar.fold()), 0)
+        self.assertFalse(SimilarBook.objects.exists())
+
+    def test_only_the_top_k_are_kept(self):
+        self.borrow_everything()
+        self.fold(top_k=2)
+        self.assertEqual(self.recommendations(0), [(1, 2), (2, 1)])
+
+    def test_rebuild_matches_the_fold(self):
+        self.borrow_everything()
+        self.fold()
+        folded = {index: self.recommendations(index) for index in range(4)}
+
+        out = io.StringIO()
+        with override_settings(HISTORY_COLD_STORAGE_DIR=tempfile.gettempdir() + '/lms-no-cold-history'):
+            call_command('rebuild_similar', chunk_size=2, stdout=out)
+        self.assertIn('Rebuilt recommendations from 7 patron and book pair(s).', out.getvalue())
+        self.assertEqual({index: self.recommendations(index) for index in range(4)}, folded)
+        self.assertEqual(BorrowedBook.objects.count(), 7)
+        self.assertEqual(self.fold(), 0)
+
+    def test_rebuild_reads_archived_history(self):
+        ArchivedCheckOut.objects.bulk_create(
+            ArchivedCheckOut(
+                book=self.books[index], user=self.users[0],
+                checkout_date=datetime.date(2023, 1, 1), return_date=datetime.date(2023, 1, 10)
+            )
+            for index in (1, 3)
+        )
+        with override_settings(HISTORY_COLD_STORAGE_DIR=tempfile.gettempdir() + '/lms-no-cold-history'):
+            similar.rebuild()
+        self.assertEqual(self.recommendations(1), [(3, 1)])
+
+
+class SimilarBooksViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.books = [
+            Book.objects.create(title=f'Shelf Book {i}', author='Author', ISBN=make_isbn(i))
+            for i in range(3)
+        ]
+        SimilarBook.objects.bulk_create([
+            SimilarBook(book=self.books[0], similar=self.books[2], rank=1, borrowed_together=5),
+            SimilarBook(book=self.books[0], similar=self.books[1], rank=2, borrowed_together=3),
+        ])
+
+    def test_recommendations_in_one_query(self):
+        url = reverse('book-similar', kwargs={'pk': self.books[0].pk})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(row['title'], row['borrowed_together']) for row in response.data['results']],
+            [('Shelf Book 2', 5), ('Shelf Book 1', 3)]
+        )
+
+    def test_books_without_recommendations(self):
+        response = self.client.get(reverse('book-similar', kwargs={'pk': self.books[1].pk}))
+        self.assertEqual((response.status_code, response.data['count']), (status.HTTP_200_OK, 0))
+        response = self.client.get(reverse('book-similar', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,149 @@
+import io
+import datetime
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api import stats
+from api.models import (
+    Book, BookInfo, CheckOut, ArchivedCheckOut, AuthorStats, BookDailyStats, BookStats,
+    MonthlyStats, StatsWatermark, UserMonthlyStats,
+)
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class CirculationStatsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@email.com', password='password123')
+            for i in range(3)
+        ]
+        cls.books = []
+        for i, author in enumerate(['Chinua Achebe', 'Chinua Achebe', 'Ama Ata Aidoo']):
+            book = Book.objects.create(title=f'Counted Book {i}', author=author, ISBN=make_isbn(i))
+            BookInfo.objects.set_copies(book.pk, 5)
+            book.info.refresh_from_db()
+            cls.books.append(book)
+
+    def borrow(self, book, user):
+        return CheckOut.objects.create(book=book, user=user)
+
+    def give_back(self, book, user):
+        CheckOut.objects.return_and_archive(user.pk, book.pk)
+
+    def fold(self):
+        return sum(stats.fold(settle=timedelta(0)))
+
+    def test_fold_adds_new_movements_once(self):
+        for user in self.users:
+            self.borrow(self.books[0], user)
+        self.borrow(self.books[2], self.users[0])
+        self.give_back(self.books[0], self.users[1])
+        self.assertEqual(self.fold(), 5)
+        self.assertEqual(self.fold(), 0)
+
+        self.borrow(self.books[1], self.users[1])
+        self.assertEqual(self.fold(), 1)
+
+        today = datetime.date.today()
+        month = today.replace(day=1)
+        self.assertEqual(
+            BookDailyStats.objects.values_list('loans', 'returns').get(book=self.books[0], day=today), (3, 1)
+        )
+        self.assertEqual(BookStats.objects.get(book=self.books[0]).loans, 3)
+        self.assertEqual(UserMonthlyStats.objects.get(user=self.users[1], month=month).loans, 2)
+        self.assertEqual(MonthlyStats.objects.values_list('loans', 'returns').get(month=month), (5, 1))
+        self.assertEqual(AuthorStats.objects.get(author='Chinua Achebe').loans, 4)
+
+    def test_young_movements_wait_for_the_next_fold(self):
+        self.borrow(self.books[0], self.users[0])
+        self.assertEqual(sum(stats.fold()), 0)
+        self.assertEqual(StatsWatermark.objects.get().position, 0)
+
+    def test_rebuild_matches_folding(self):
+        for user in self.users:
+            self.borrow(self.books[0], user)
+            self.borrow(self.books[1], user)
+        for user in self.users[:2]:
+            self.give_back(self.books[0], user)
+        ArchivedCheckOut.objects.create(
+            book=self.books[2], user=self.users[2],
+            checkout_date=datetime.date(2020, 1, 30), return_date=datetime.date(2020, 2, 3)
+        )
+        self.fold()
+        folded = stats.summary()
+
+        out = io.StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('Rebuilt circulation statistics from 7 checkout(s).', out.getvalue())
+        rebuilt = stats.summary()
+        self.assertEqual(rebuilt['most_borrowed'][:2], folded['most_borrowed'][:2])
+        self.assertEqual(
+            rebuilt['loans_per_month'][0], {'month': '2020-01', 'loans': 1, 'returns': 0}
+        )
+        self.assertEqual(rebuilt['loans_per_month'][1], {'month': '2020-02', 'loans': 0, 'returns': 1})
+        self.assertEqual(rebuilt['loans_per_month'][-1], folded['loans_per_month'][-1])
+        # Everything in the ledger is in the rebuilt tables already.
+        self.assertEqual(self.fold(), 0)
+
+    def test_fold_command(self):
+        self.borrow(self.books[0], self.users[0])
+        out = io.StringIO()
+        call_command('fold_stats', settle_seconds=0, chunk_size=1, stdout=out)
+        self.assertIn('Folded 1 movement(s) in 1 batch(es).', out.getvalue())
+
+
+class StatsEndpointTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.url = reverse('stats')
+
+    def seed(self, books):
+        rows = [
+            Book(title=f'Stat Book {i}', author=f'Author {i % 4}', ISBN=make_isbn(i)) for i in range(books)
+        ]
+        for book in rows:
+            book.isbn13 = book.ISBN
+        rows = Book.objects.bulk_create(rows)
+        BookStats.objects.bulk_create(BookStats(book=book, loans=i) for i, book in enumerate(rows))
+        AuthorStats.objects.bulk_create(AuthorStats(author=f'Author {i}', loans=i) for i in range(4))
+        MonthlyStats.objects.bulk_create(
+            MonthlyStats(month=datetime.date(2020 + i // 12, i % 12 + 1, 1), loans=i, returns=i)
+            for i in range(books)
+        )
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        return response, len(context.captured_queries)
+
+    def test_answers_from_summary_tables_in_constant_queries(self):
+        self.client.force_authenticate(user=self.admin)
+        self.seed(5)
+        small, small_queries = self.get(limit=3, months=2)
+        self.assertEqual(small.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['loans'] for row in small.data['most_borrowed']], [4, 3, 2])
+        self.assertEqual(small.data['busiest_authors'][0], {'author': 'Author 3', 'loans': 3})
+        self.assertEqual([row['month'] for row in small.data['loans_per_month']], ['2020-04', '2020-05'])
+
+        _, queries = self.get(limit=100, months=120)
+        self.assertEqual(queries, small_queries)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_limit(self):
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
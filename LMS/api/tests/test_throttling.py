@@ -0,0 +1,160 @@
+import io
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from api.models import Book, CheckOut
+from api.throttling import TokenBucketThrottle, UserTokenBucketThrottle, IPTokenBucketThrottle
+from api.tests.test_queries import make_isbn
+
+User = get_user_model()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTestCase(SimpleTestCase):
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.clock = Clock()
+        request = Request(APIRequestFactory().get('/api/books/', REMOTE_ADDR='203.0.113.9'))
+        request.user = User(pk=1, email='user1@email.com')
+        self.request = request
+
+    def throttle(self, rate='3/min'):
+        throttle = UserTokenBucketThrottle.__new__(UserTokenBucketThrottle)
+        throttle.timer = self.clock
+        throttle.rate = rate
+        throttle.num_requests, throttle.duration = throttle.parse_rate(rate)
+        return throttle
+
+    def allowed(self, count):
+        return [self.throttle().allow_request(self.request, None) for _ in range(count)]
+
+    def test_bursts_up_to_the_rate_then_refills_one_token_at_a_time(self):
+        self.assertEqual(self.allowed(4), [True, True, True, False])
+
+        throttle = self.throttle()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertAlmostEqual(throttle.wait(), 20.0)
+
+        self.clock.now += 20
+        self.assertEqual(self.allowed(2), [True, False])
+
+    def test_refused_requests_do_not_use_tokens(self):
+        self.allowed(3)
+        self.allowed(50)
+        self.clock.now += 20
+        self.assertEqual(self.allowed(1), [True])
+
+    def test_idle_bucket_is_full_again(self):
+        self.allowed(3)
+        self.clock.now += 3600
+        self.assertEqual(self.allowed(4), [True, True, True, False])
+
+    def test_no_rate_means_no_limit(self):
+        throttle = self.throttle(rate=None)
+        self.assertTrue(all(throttle.allow_request(self.request, None) for _ in range(10)))
+
+    def test_users_and_anonymous_clients_have_separate_buckets(self):
+        self.assertIsNone(IPTokenBucketThrottle.get_cache_key(None, self.request, None))
+        self.request.user = mock.Mock(is_authenticated=False)
+        self.assertIsNone(UserTokenBucketThrottle.get_cache_key(None, self.request, None))
+        self.assertEqual(
+            IPTokenBucketThrottle().get_cache_key(self.request, None), 'throttle:ip:203.0.113.9'
+        )
+
+
+RATES = {'user': '100/min', 'ip': '100/min', 'checkout': '2/min', 'auth': '2/min', 'search': '2/min'}
+
+
+@mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', RATES)
+class EndpointThrottleTestCase(APITestCase):
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.user = User.objects.create_user(email='user1@email.com', password='password123')
+        self.books = [
+            Book.objects.create(title=f'Throttled Book {i}', author='Author', ISBN=make_isbn(i))
+            for i in range(3)
+        ]
+        for book in self.books:
+            book.info.copies = 5
+            book.info.save()
+
+    def test_checkouts_are_limited_per_user(self):
+        self.client.force_authenticate(user=self.user)
+        codes = [
+            self.client.post(reverse('borrow_book', kwargs={'pk': book.pk})).status_code
+            for book in self.books
+        ]
+        self.assertEqual(codes, [201, 201, 429])
+        self.assertEqual(CheckOut.objects.count(), 2)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('borrow_book', kwargs={'pk': self.books[2].pk}))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data['status_code'], 429)
+        self.assertIn('Retry-After', response)
+
+    def test_checkout_scope_is_shared_across_checkout_endpoints(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('borrow_book', kwargs={'pk': self.books[0].pk}))
+        self.client.post(reverse('checkout-list'), data={'book': self.books[1].pk}, format='json')
+        response = self.client.post(reverse('return_book', kwargs={'pk': self.books[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_unscoped_endpoints_are_not_held_by_the_scope(self):
+        self.client.force_authenticate(user=self.user)
+        for book in self.books:
+            self.client.post(reverse('borrow_book', kwargs={'pk': book.pk}))
+        response = self.client.get(reverse('history-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_listing_checkouts_does_not_use_the_checkout_scope(self):
+        admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
+        self.client.force_authenticate(user=admin)
+        codes = [self.client.get(reverse('checkout-list')).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 200])
+        response = self.client.post(reverse('borrow_book', kwargs={'pk': self.books[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_only_book_searches_use_the_search_scope(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('book-list')
+        codes = [self.client.get(url).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 200])
+        codes = [self.client.get(url, {'search': 'Throttled'}).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_token_endpoints_are_limited_per_client(self):
+        data = {'email': 'user1@email.com', 'password': 'wrong-password'}
+        codes = [self.client.post(reverse('jwt_obtain_pair'), data).status_code for _ in range(3)]
+        self.assertEqual(codes[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+        data = {'username': 'user1@email.com', 'password': 'wrong-password'}
+        codes = [self.client.post(reverse('basic_token'), data).status_code for _ in range(3)]
+        self.assertEqual(codes[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class ThrottleBenchmarkTestCase(SimpleTestCase):
+
+    def test_benchmark_reports_overhead(self):
+        out = io.StringIO()
+        # The 50us budget is checked by running the command on its own; a
+        # shared CI box is too noisy to enforce it here.
+        call_command('benchmark_throttle', requests=2000, clients=200, max_us=5000, stdout=out)
+        self.assertIn('throttles=3 requests=2000 refused=0', out.getvalue())
@@ -56,12 +56,92 @@ class BookViewSetTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class ISBNLookupTestCase(APITestCase):
+    def setUp(self):
+        self.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0-8436-1072-7')
+        self.other = Book.objects.create(title='Other Book', author='Author B', ISBN='9780676978124')
+        self.url = reverse('book-isbn')
+
+    def test_lookup_single_isbn_in_any_form(self):
+        for isbn in ['0843610727', '978-0-8436-1072-7', '9780843610727']:
+            response = self.client.get(path=self.url, data={'isbn': isbn})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], 1)
+            self.assertEqual(response.data['results'][0]['book']['title'], 'Test Book')
+
+    def test_lookup_batch_in_one_query(self):
+        isbns = ['9780676978124', '0-8436-1072-7', '9781594489501', 'not-an-isbn']
+        with self.assertNumQueries(1):
+            response = self.client.post(path=self.url, data={'isbns': isbns}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        results = response.data['results']
+        self.assertEqual([result['isbn'] for result in results], isbns)
+        self.assertEqual(results[0]['book']['title'], 'Other Book')
+        self.assertIsNone(results[2]['book'])
+        self.assertIsNone(results[3]['isbn13'])
+
+    def test_lookup_without_isbn(self):
+        response = self.client.get(path=self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_duplicate_isbn_in_other_form(self):
+        admin = User.objects.create_superuser(email='admin@gmail.com', password='adminpassword')
+        self.client.force_authenticate(user=admin)
+        data = {'title': 'Copy Book', 'author': 'Author C', 'ISBN': '9780843610727'}
+        response = self.client.post(path=reverse('book-list'), data=data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0205080057')
+        self.book.info.copies = 5
+        self.book.info.save()
+        self.list_url = reverse('book-list')
+        self.detail_url = reverse('book-detail', kwargs={'pk': self.book.pk})
+        self.info_url = reverse('bookinfo-detail', kwargs={'pk': self.book.info.pk})
+
+    def test_unchanged_list_returns_304(self):
+        response = self.client.get(path=self.list_url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        response = self.client.get(path=self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_changes_with_copies(self):
+        etag = self.client.get(path=self.detail_url)['ETag']
+        self.book.info.copies = 4
+        self.book.info.save()
+
+        response = self.client.get(path=self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['book_copies'], 4)
+
+    def test_etag_differs_per_query(self):
+        etag = self.client.get(path=self.list_url)['ETag']
+        response = self.client.get(path=self.list_url, data={'search': 'test'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_last_modified(self):
+        response = self.client.get(path=self.info_url)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(
+            path=self.info_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
 class CheckOutViewSetTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(email='user1@email1.com', password='password123')
         self.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0205080057')
         self.book.info.copies = 5
-        self.book.save()
+        self.book.info.save()
         self.checkout = CheckOut.objects.create(book=self.book, user=self.user)
         self.client.force_authenticate(user=self.user)
         self.url_list = reverse('checkout-list')
@@ -92,7 +172,7 @@ class BorrowReturnBookTestCase(APITestCase):
         self.user = User.objects.create_user(email='user1@email.com', password='password123')
         self.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0205080057')
         self.book.info.copies = 5
-        self.book.save()
+        self.book.info.save()
         self.checkout = CheckOut.objects.create(book=self.book, user=self.user)
         self.url_return = reverse('return_book', kwargs={"pk": self.book.id})
         self.url_borrow = reverse('borrow_book', kwargs={"pk": self.book.id})
@@ -115,7 +195,7 @@ class TransactionHistoryViewSetTestCase(APITestCase):
         self.admin = User.objects.create_superuser(email='admin@email.com', password='adminpassword')
         self.book = Book.objects.create(title='Test Book', author='Author A', ISBN='0205080057')
         self.book.info.copies = 5
-        self.book.save()
+        self.book.info.save()
         self.checkout = CheckOut.objects.create(book=self.book, user=self.user)
         self.archived_checkout = ArchivedCheckOut.objects.create(
             user=self.user, book=self.book, checkout_date='2012-01-01', return_date='2012-01-03'
@@ -131,3 +211,15 @@ class TransactionHistoryViewSetTestCase(APITestCase):
         self.client.force_authenticate(user=self.admin)
         response = self.client.get(path=self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_history_for_a_month(self):
+        ArchivedCheckOut.objects.create(
+            user=self.user, book=self.book, checkout_date='2012-01-20', return_date='2012-02-01'
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(path=self.url, data={'month': '2012-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['return_date'] for row in response.data['results']], ['2012-01-03'])
+
+        response = self.client.get(path=self.url, data={'month': '2012-13'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,160 @@
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+_handles = threading.local()
+
+
+@lru_cache(maxsize=None)
+def parse_bucket(rate):
+    """
+    Parses a DRF rate such as ``30/min`` into the number of requests, the
+    period in seconds, the microseconds between tokens and the depth of
+    the bucket in microseconds.
+    """
+    num_requests, duration = SimpleRateThrottle.parse_rate(None, rate)
+    if not num_requests:
+        return num_requests, duration, None, None
+    interval = duration * 1_000_000 // num_requests
+    return num_requests, duration, interval, interval * num_requests
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle kept in the ``throttle`` cache. A rate of
+    ``30/min`` is a bucket of 30 tokens refilled at one token every two
+    seconds, so clients may burst up to the full rate and are then held to
+    its average.
+
+    Each bucket is a single integer, its theoretical arrival time in
+    microseconds (the "GCRA" form of a token bucket), moved forward with
+    the cache's atomic ``incr``. A request usually costs a single cache
+    call and never a database query. Requests that are refused do not use
+    up a token.
+    """
+    cache_alias = 'throttle'
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    @property
+    def cache(self):
+        # ``caches[...]`` goes through an asgiref Local on every lookup,
+        # which costs as much as the cache call itself; keep a handle per
+        # thread instead.
+        handles = _handles.__dict__
+        if self.cache_alias not in handles:
+            handles[self.cache_alias] = caches[self.cache_alias]
+        return handles[self.cache_alias]
+
+    def parse_rate(self, rate):
+        num_requests, duration, self.interval, self.capacity = parse_bucket(rate)
+        return num_requests, duration
+
+    def identify(self, request) -> str:
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = int(self.timer() * 1_000_000)
+        cache = self.cache
+        try:
+            arrival = cache.incr(self.key, self.interval)
+        except ValueError:
+            # A new bucket starts full. If another request created it in
+            # the meantime, take a token from that one instead.
+            if cache.add(self.key, now + self.interval):
+                return True
+            try:
+                arrival = cache.incr(self.key, self.interval)
+            except ValueError:
+                return True
+        if arrival - self.interval < now:
+            # The bucket had refilled completely; restart it from now.
+            cache.set(self.key, now + self.interval)
+            return True
+        if arrival - now <= self.capacity:
+            return True
+        cache.decr(self.key, self.interval)
+        self.retry_in = (arrival - now - self.capacity) / 1_000_000
+        return False
+
+    def wait(self):
+        return getattr(self, 'retry_in', None)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Limits each authenticated user across every endpoint.
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Limits anonymous requests across every endpoint per client IP, which
+    is all there is to tell them apart by.
+    """
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Gives expensive endpoints their own, tighter bucket per user (or IP).
+    The scope of an endpoint is its ``throttle_scope`` attribute, or else
+    looked up by URL name in the ``THROTTLE_ENDPOINT_SCOPES`` setting, so
+    function views and third party views can be scoped too. Endpoints
+    without a scope are not limited by this throttle.
+
+    A scope can also be a dict of scopes by HTTP method, where ``search``
+    stands for GETs with a search query, so that e.g. only the borrows
+    posted to a list share the checkout bucket and not the reads of it.
+    """
+
+    def __init__(self):
+        # The rate depends on the view, so it is read in allow_request.
+        pass
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            match = getattr(request, 'resolver_match', None)
+            if match is not None:
+                scope = getattr(settings, 'THROTTLE_ENDPOINT_SCOPES', {}).get(match.url_name)
+        if isinstance(scope, dict):
+            method = request.method
+            if method == 'GET' and request.query_params.get(api_settings.SEARCH_PARAM):
+                method = 'search'
+            scope = scope.get(method)
+        return scope
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.identify(request)}
@@ -1,7 +1,8 @@
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
-from rest_framework.authtoken.views import obtain_auth_token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.settings import api_settings
 
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 
@@ -33,6 +34,9 @@ router.register(r'checkout', a_views.CheckOutViewSet, basename='checkout')
 router.register(r'checkout_history', a_views.TransactionHistoryViewSet, basename='history')
 
 urlpatterns = [
+   # Ahead of the router, whose book detail route would claim it
+   path('books/availability/stream/', a_views.availability_stream, name='availability_stream'),
+
    # API routes from the router
    path('', include(router.urls)),
 
@@ -40,7 +44,9 @@ urlpatterns = [
    path('endpoints/', a_views.endpoints, name='endpoints'),
 
    # Token obtain routes
-   path('token/basic/', obtain_auth_token, name='basic_token'), 
+   # ObtainAuthToken turns throttling off by default; password checks are
+   # exactly what needs it.
+   path('token/basic/', ObtainAuthToken.as_view(throttle_classes=api_settings.DEFAULT_THROTTLE_CLASSES), name='basic_token'), 
    
    path('token/jwt/', TokenObtainPairView.as_view(), name='jwt_obtain_pair'), 
    path('token/jwt/refresh/', TokenRefreshView.as_view(), name='jwt_refresh'),
@@ -50,6 +56,12 @@ urlpatterns = [
    path('books/<int:pk>/return/', a_views.return_book, name='return_book'),
    path('books/<int:pk>/checkout/', a_views.borrow_book, name='borrow_book'),
 
+   # Bulk data export
+   path('export/<str:dataset>/', a_views.export_data, name='export'),
+
+   # Circulation statistics
+   path('stats/', a_views.circulation_stats, name='stats'),
+
    #swagger docs
    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
    path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -1,18 +1,48 @@
-from rest_framework import viewsets, status, permissions, filters
+from rest_framework import viewsets, status, permissions, filters, parsers, exceptions
 from rest_framework.decorators import api_view, action, permission_classes
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
 
 from api.serializers import (
     BookSerializer,
     BookInfoSerializer,
+    ISBNLookupSerializer,
+    AutocompleteSerializer,
+    ExportFilterSerializer,
     CheckOutSerializer,
+    BatchCheckOutSerializer,
+    BatchReturnSerializer,
     TransactionHistorySerializer,
+    HistoryFilterSerializer,
+    StatsFilterSerializer,
 )
-from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut
+from api.models import Book, BookInfo, CheckOut, ArchivedCheckOut, canonical_isbn13
+from api.search import CatalogSearchFilter
+from api.pagination import BookPagination, CheckOutPagination, TransactionHistoryPagination
+from api.cache import book_fragments
+from api.autocomplete import book_autocomplete
+from api.notifications import notify_availability, hub as availability_hub, snapshot, format_event
+from api.mixins import ConditionalGetMixin
+from api.importer import CatalogImporter, FORMATS, detect_format
+from api.returns import ReturnProcessor
+from api.coldstore import get_cold_store
+from api.idempotency import idempotent
+from api.throttling import ScopedTokenBucketThrottle
+from api import exporter, similar, stats
 from utils.custom_permissions import IsOwnerOrAdmin
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
 
 from drf_yasg.utils import swagger_auto_schema
+import asyncio
+import io
+import math
 
 User = get_user_model()
 
@@ -28,6 +58,7 @@ def endpoints(request):
     'user-create': 'api/users/',  
     'user-delete': 'api/users/<int:pk>/',  
     'user-change_password': 'api/users/<int:pk>/change_password/', 
+    'user-summary': 'api/users/<int:pk>/summary/',  # Active, overdue and lifetime loans
     
     'basic-token': 'api/token/basic/',  # Basic authentication token
     'jwt-token-create': 'api/token/jwt/',  # JWT token create
@@ -36,43 +67,73 @@ def endpoints(request):
 
     'book-list': 'api/books/',  # List all books
     'book-detail': 'api/books/<int:pk>/',
+    'book-isbn-lookup': 'api/books/isbn/?isbn=<isbn>',  # Exact lookup of one or many ISBNs
+    'book-autocomplete': 'api/books/autocomplete/?q=<prefix>',  # Title/author suggestions for a search box
+    'book-import': 'api/books/import/',  # Bulk load a CSV/JSONL catalog file (admin)
+    'book-similar': 'api/books/<int:pk>/similar/',  # Books the same patrons also borrowed
     'book-info-list': 'api/booksinfo/',  # List all book information
     'book-info-detail': 'api/booksinfo/<int:pk>/',  # Book information detail by ID
     'borrow-book': 'api/books/<int:pk>/checkout/',  #Borrow Book by ID
     'return-book': 'api/books/<int:pk>/return/', #Return Book by Id
+    'book-availability-stream': 'api/books/availability/stream/?books=<id,id>',  # Server-Sent Events as copies change
 
     'checkout-list': 'api/checkout/',  # List all active checkouts
     'checkout-detail': 'api/checkout/<int:pk>/',  
+    'checkout-batch': 'api/checkout/batch/',  # Borrow several books in one request
+    'checkout-batch-return': 'api/checkout/batch-return/',  # Process many returns at once (admin)
     'checkout-return': 'api/checkout/<int:pk>/return_book/',  # Return books, pk field is the id of the book
 
     'history-list': 'api/checkout_history/',  #list user checkout history
+    'export': 'api/export/<books|checkouts|history>/',  # Stream a full table as NDJSON or CSV (admin)
+    'stats': 'api/stats/',  # Most borrowed titles, busiest authors, loans per month (admin)
     'endpoints': 'api/endpoints/', 
 }
 
     return Response(end_points, status=status.HTTP_200_OK)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A viewset for managing Book instances.
     """
+    version_relations = ('info',)
+    version_annotations = ('pending_at',)
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    queryset = Book.objects.all()
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    queryset = Book.objects.select_related('info')
+    pagination_class = BookPagination
+    filter_backends = [filters.OrderingFilter, CatalogSearchFilter]
     filterset_fields = ['author', 'published_date']
     search_fields = ['title', 'author', 'ISBN']
     ordering_fields = ['published_date']
 
     def get_queryset(self):
         if self.request.method == 'GET':
-            return self.queryset.filter(info__status=True).order_by('-info__copies')
+            # Sorted on the stored count, which bookinfo_available_copies_idx
+            # returns in order, so the pending returns are only summed for
+            # the rows of the page.
+            return self.queryset.with_pending().filter(info__status=True).order_by(
+                '-info__copies', '-info__book_id'
+            )
         return super().get_queryset()
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [permissions.IsAdminUser]
         return super().get_permissions()
+
+    def render(self, books):
+        """
+        Representations of ``books`` served from the fragment cache, only
+        serializing the books that are not cached yet or that changed since,
+        by the same versions as the ETag.
+        """
+        return book_fragments.render_many(
+            books,
+            lambda misses: self.get_serializer(misses, many=True).data,
+            self.request,
+            version=lambda book: tuple(self.get_versions(book))
+        )
     
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()  
@@ -83,15 +144,132 @@ class BookViewSet(viewsets.ModelViewSet):
             status=status.HTTP_204_NO_CONTENT
         )
 
+    @swagger_auto_schema(method='post', request_body=ISBNLookupSerializer)
+    @action(detail=False, methods=['get', 'post'], url_path='isbn', url_name='isbn', permission_classes=[permissions.AllowAny])
+    def lookup_isbn(self, request):
+        """
+        Resolves ISBNs (10 or 13 digits, with or without hyphens) to books with
+        one indexed query on the canonical ISBN-13. GET takes ``?isbn=``,
+        repeated or comma separated; POST takes ``{"isbns": [...]}`` for
+        larger batches. Results follow the order of the requested ISBNs and
+        include unavailable books.
+        """
+        if request.method == 'GET':
+            isbns = [
+                isbn.strip()
+                for value in request.query_params.getlist('isbn')
+                for isbn in value.split(',') if isbn.strip()
+            ]
+            serializer = ISBNLookupSerializer(data={'isbns': isbns})
+        else:
+            serializer = ISBNLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        isbns = serializer.validated_data['isbns']
+
+        canonical = {isbn: canonical_isbn13(isbn) for isbn in isbns}
+        books = Book.objects.select_related('info').with_pending().in_bulk(
+            {isbn13 for isbn13 in canonical.values() if isbn13}, field_name='isbn13'
+        )
+
+        results = []
+        for isbn in isbns:
+            book = books.get(canonical[isbn])
+            results.append({
+                'isbn': isbn,
+                'isbn13': canonical[isbn] or None,
+                'book': self.get_serializer(book).data if book else None,
+            })
+        return Response(
+            {'count': sum(1 for result in results if result['book']), 'results': results},
+            status=status.HTTP_200_OK
+        )
 
-class BookInfoViewSet(viewsets.ModelViewSet):
+    @swagger_auto_schema(query_serializer=AutocompleteSerializer)
+    @action(detail=False, methods=['get'], url_path='autocomplete', url_name='autocomplete', permission_classes=[permissions.AllowAny])
+    def autocomplete(self, request):
+        """
+        Suggests books whose title or author contains a word starting with
+        ``q``, served from the in-memory prefix index without a database
+        query. ``limit`` caps the number of suggestions (default 10).
+        """
+        serializer = AutocompleteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matches = book_autocomplete.lookup(
+            serializer.validated_data['q'], serializer.validated_data['limit']
+        )
+        results = [
+            {
+                'id': pk,
+                'title': title,
+                'author': author,
+                'url': reverse('book-detail', kwargs={'pk': pk}, request=request),
+            }
+            for pk, title, author in matches
+        ]
+        return Response({'count': len(results), 'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='similar', url_name='similar', permission_classes=[permissions.AllowAny])
+    def similar_books(self, request, pk=None):
+        """
+        "Patrons who borrowed this also borrowed": the books most often
+        borrowed by the patrons of this one, read in one indexed query from
+        the recommendations ``fold_similar`` keeps ranked.
+        """
+        not_found = Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not str(pk).isdigit():
+            return not_found
+        recommendations = similar.similar_to(int(pk))
+        if not recommendations and not Book.objects.filter(pk=pk).exists():
+            return not_found
+        results = [
+            {
+                'id': row.similar_id,
+                'title': row.similar.title,
+                'author': row.similar.author,
+                'url': reverse('book-detail', kwargs={'pk': row.similar_id}, request=request),
+                'borrowed_together': row.borrowed_together,
+            }
+            for row in recommendations
+        ]
+        return Response({'count': len(results), 'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', permission_classes=[permissions.IsAdminUser], parser_classes=[parsers.MultiPartParser])
+    def import_catalog(self, request):
+        """
+        Bulk loads books from an uploaded CSV or JSON Lines ``file``. The
+        format is taken from ``format`` or the file name. The file is read
+        in chunks and every chunk is written with bulk inserts; rows that
+        are invalid or duplicates are reported by line without stopping the
+        import.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload a CSV or JSONL file as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({"error": f"Unsupported format: {fmt}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+        report = CatalogImporter().run(stream, fmt)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class BookInfoViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A view for managing extra information about Books in the database.
     """
+    version_relations = ('book',)
+    version_annotations = ('pending_at',)
     serializer_class = BookInfoSerializer
-    queryset = BookInfo.objects.all()
+    queryset = BookInfo.objects.select_related('book')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return self.queryset.with_pending()
+        return super().get_queryset()
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [permissions.IsAdminUser]
@@ -115,12 +293,16 @@ class CheckOutViewSet(viewsets.ModelViewSet):
     A viewset for managing book checkouts.
     """
     serializer_class = CheckOutSerializer
-    queryset = CheckOut.objects.all().order_by('-checkout_date')
+    queryset = CheckOut.objects.select_related('book', 'user').order_by('-checkout_date')
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CheckOutPagination
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        return super().perform_create(serializer)
     
     def get_permissions(self):
         if self.action in ['update','partial_update','destroy']:
@@ -157,37 +339,78 @@ class CheckOutViewSet(viewsets.ModelViewSet):
             status=status.HTTP_204_NO_CONTENT
         )
 
+    @swagger_auto_schema(method='post', request_body=BatchCheckOutSerializer)
+    @action(detail=False, methods=['post'], url_path='batch', url_name='batch')
+    def batch(self, request):
+        """
+        Borrows several books for the requesting user at once. ``books`` is a
+        list of book ids; with ``atomic`` (the default) nothing is borrowed
+        unless every book can be. Each book gets a result with the created
+        checkout or the reason it was not borrowed.
+        """
+        serializer = BatchCheckOutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        book_ids = serializer.validated_data['books']
+        atomic = serializer.validated_data['atomic']
+
+        checkouts, errors = CheckOut.objects.borrow_many(request.user, book_ids, atomic=atomic)
+        book_fragments.invalidate(*checkouts)
+        notify_availability(*checkouts)
+
+        results = []
+        for book_id in book_ids:
+            checkout = checkouts.get(book_id)
+            if checkout is not None:
+                results.append({'book': book_id, 'borrowed': True, 'checkout': self.get_serializer(checkout).data})
+                continue
+            results.append({
+                'book': book_id,
+                'borrowed': False,
+                'error': errors.get(book_id, "Not borrowed because another book in the batch could not be."),
+            })
+        return Response(
+            {'borrowed': len(checkouts), 'failed': len(book_ids) - len(checkouts), 'results': results},
+            status=status.HTTP_201_CREATED if checkouts else status.HTTP_400_BAD_REQUEST
+        )
+
+    @swagger_auto_schema(method='post', request_body=BatchReturnSerializer)
+    @action(detail=False, methods=['post'], url_path='batch-return', url_name='batch-return', permission_classes=[permissions.IsAdminUser])
+    def batch_return(self, request):
+        """
+        Processes a pile of returns (e.g. from the book drop) at once.
+        ``items`` holds ``{"user": id, "book": id}`` pairs or
+        ``{"barcode": isbn}`` scans. Returns are written set-wise; items that
+        cannot be returned are reported by position.
+        """
+        serializer = BatchReturnSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = ReturnProcessor().run(serializer.validated_data['items'])
+        return Response(report, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['get', 'post'], url_name='return', permission_classes=[IsOwnerOrAdmin, permissions.IsAuthenticated])
+    @idempotent
     def return_book(self, request, pk=None):
         """
         Handle book returns. The id supplied is that of the Book that was 
         Borrowed Instead of the checkout id. If a checkout exists for that 
         book by the user making the request then they can return the book.
         """
-        try:
-            # Retrieve the book instance
-            book = Book.objects.get(id=pk)
-
-            # Retrieve the checkout instance for the specific user and book
-            checkout = CheckOut.objects.filter(book__id=book.pk, user__email=request.user.email).get()
-        except CheckOut.DoesNotExist:
-            return Response({"error": "Checkout record not found."}, status=status.HTTP_404_NOT_FOUND)
-
         if request.method == 'GET':
+            try:
+                checkout = self.queryset.get(book_id=pk, user=request.user)
+            except CheckOut.DoesNotExist:
+                return Response({"error": "Checkout record not found."}, status=status.HTTP_404_NOT_FOUND)
             # Serialize the checkout data that was retrieved
             serializer = self.serializer_class(checkout)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
-        if request.method == 'POST':
-            if checkout.status == 'Returned':
-                # If the book is already marked as returned, delete the record
-                checkout.delete()
-                return Response({"detail": "Book already returned and record deleted."}, status=status.HTTP_200_OK)
-
-            # Mark the book as returned 
-            checkout.return_book()  
-            checkout.delete()
-            return Response({"detail": "Borrowed book returned successfully."}, status=status.HTTP_200_OK)
+        try:
+            CheckOut.objects.return_and_archive(request.user.pk, pk)
+        except CheckOut.DoesNotExist:
+            return Response({"error": "Checkout record not found."}, status=status.HTTP_404_NOT_FOUND)
+        book_fragments.invalidate(pk)
+        notify_availability(pk)
+        return Response({"detail": "Borrowed book returned successfully."}, status=status.HTTP_200_OK)
 
 @swagger_auto_schema(
         method='get',
@@ -203,36 +426,26 @@ class CheckOutViewSet(viewsets.ModelViewSet):
 )
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def return_book(request, pk=None):
     """
     Standalone view to return a borrowed book. Takes the primary key of the book then finds a checkout instance per the user if it exists. Before proceeding to return the book.
     """
-    try:
-        book = Book.objects.get(pk=pk)
-        user = request.user
-    except Book.DoesNotExist:
-        return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
-    
-    
-
     if request.method == "GET":
+        try:
+            book = Book.objects.select_related('info').get(pk=pk)
+        except Book.DoesNotExist:
+            return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
         serializer = BookSerializer(book, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
-    
-    elif request.method == 'POST':
-        try:
-            checkout = CheckOut.objects.get(book=book.pk, user=user.pk)
-        except CheckOut.DoesNotExist:
-            return Response({"error": "Checkout record not found or Book Returned"}, status=status.
-HTTP_404_NOT_FOUND)
-
-        if checkout.Status == 'Returned':
-            checkout.delete()
-            return Response({"detail": "Book already returned and record deleted."}, status=status.HTTP_200_OK)
 
-        checkout.return_book()
-        checkout.delete()
-        return Response({"detail": "Borrowed Book returned successfully."}, status=status.HTTP_200_OK)
+    try:
+        CheckOut.objects.return_and_archive(request.user.pk, pk)
+    except CheckOut.DoesNotExist:
+        return Response({"error": "Checkout record not found or Book Returned"}, status=status.HTTP_404_NOT_FOUND)
+    book_fragments.invalidate(pk)
+    notify_availability(pk)
+    return Response({"detail": "Borrowed Book returned successfully."}, status=status.HTTP_200_OK)
 
 @swagger_auto_schema(
         method='get',
@@ -248,13 +461,14 @@ HTTP_404_NOT_FOUND)
 )
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated, IsOwnerOrAdmin])
+@idempotent
 def borrow_book(request, pk=None):
     """
     Standalone view to borrow a book. Takes the id of the book and checks it's 
     status. If the book is available then proceed to borrow the book. 
     """
     try:
-        book = Book.objects.get(pk=pk)
+        book = Book.objects.select_related('info').get(pk=pk)
     except Book.DoesNotExist:
         return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -263,8 +477,10 @@ def borrow_book(request, pk=None):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     elif request.method == 'POST':
+        # The book was loaded with its info above; hand it to the serializer
+        # so borrowing costs one SELECT, the INSERT and the copy UPDATE.
         data = {"book": book.pk, "user": request.user.pk}
-        serializer = CheckOutSerializer(data=data)
+        serializer = CheckOutSerializer(data=data, context={'book': book})
         if serializer.is_valid(raise_exception=True):
             serializer.save(user=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -272,13 +488,156 @@ def borrow_book(request, pk=None):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@swagger_auto_schema(
+    method='get',
+    operation_summary='Export a table',
+    operation_description='Streams every book, active checkout or archived checkout as NDJSON or CSV.',
+    query_serializer=ExportFilterSerializer
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_data(request, dataset):
+    """
+    Streams a whole dataset (``books``, ``checkouts`` or ``history``) as NDJSON
+    or CSV, chosen with ``?output=``. ``since``/``until`` bound the date the
+    dataset is keyed on and ``status`` filters by availability or checkout
+    status. Rows are read from the database in chunks while the response
+    is sent; under ASGI through the async exporter, as the server would
+    otherwise buffer a synchronous iterator whole.
+    """
+    if dataset not in exporter.DATASETS:
+        return Response({"error": f"Unknown export: {dataset}"}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = ExportFilterSerializer(
+        data=request.query_params, context={'statuses': exporter.STATUSES[dataset]}
+    )
+    serializer.is_valid(raise_exception=True)
+    filters = dict(serializer.validated_data)
+    output = filters.pop('output')
+
+    export = exporter.aexport if isinstance(request._request, ASGIRequest) else exporter.export
+    response = StreamingHttpResponse(
+        export(dataset, output, **filters),
+        content_type=exporter.CONTENT_TYPES[output]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+    return response
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary='Circulation statistics',
+    operation_description='Most borrowed titles, busiest authors and loans and returns per month.',
+    query_serializer=StatsFilterSerializer
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def circulation_stats(request):
+    """
+    Returns the most borrowed titles, the busiest authors and the loans and
+    returns per month from the summary tables kept by ``fold_stats``, so
+    the response costs the same however long the history is. Checkouts
+    and returns show up once the next fold has run; ``updated_at`` says
+    when that was.
+    """
+    serializer = StatsFilterSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return Response(stats.summary(**serializer.validated_data), status=status.HTTP_200_OK)
+
+
+MAX_WATCHED_BOOKS = 50
+
+
+def admit_stream(request):
+    """
+    Authenticates an availability stream request the way the API views do
+    and takes a token from its ``stream`` throttle bucket. Returns the
+    user and ``None``, or ``None`` and the error response.
+    """
+    api_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        if not permissions.IsAuthenticated().has_permission(api_request, None):
+            raise exceptions.NotAuthenticated()
+        throttle = ScopedTokenBucketThrottle()
+        if not throttle.allow_request(api_request, None):
+            raise exceptions.Throttled(throttle.wait())
+    except exceptions.APIException as exc:
+        response = JsonResponse({"error": str(exc.detail)}, status=exc.status_code)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(math.ceil(exc.wait))
+        return None, response
+    return api_request.user, None
+
+
+@require_GET
+async def availability_stream(request):
+    """
+    Streams the availability of the books in ``?books=1,2,3`` as
+    Server-Sent Events: the current copies and status of each book first,
+    then an ``availability`` event whenever a checkout or return changes
+    them. Comment lines are sent while idle to keep proxies from closing
+    the connection.
+
+    Each client holds its connection open, so streams are refused under
+    the WSGI server, where they would tie up a worker each, and a user
+    may only keep ``AVAILABILITY_STREAMS_PER_USER`` of them open per
+    worker process.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Availability streams need the ASGI server."}, status=501)
+    user, error = await sync_to_async(admit_stream)(request)
+    if error is not None:
+        return error
+    if availability_hub.streams_of(user.pk) >= settings.AVAILABILITY_STREAMS_PER_USER:
+        return JsonResponse({"error": "Too many open availability streams."}, status=429)
+
+    try:
+        book_ids = sorted({int(book_id) for book_id in request.GET.get('books', '').split(',') if book_id.strip()})
+    except ValueError:
+        return JsonResponse({"error": "books must be a comma separated list of book ids."}, status=400)
+    if not book_ids:
+        return JsonResponse({"error": "Give the books to watch with ?books=<id,id>."}, status=400)
+    if len(book_ids) > MAX_WATCHED_BOOKS:
+        return JsonResponse({"error": f"At most {MAX_WATCHED_BOOKS} books can be watched at once."}, status=400)
+
+    keepalive = getattr(settings, 'AVAILABILITY_KEEPALIVE', 15)
+
+    async def events():
+        # Subscribed before the snapshot is read, so no change in between is missed.
+        subscription = availability_hub.subscribe(book_ids, user_id=user.pk)
+        try:
+            for book_id, copies, book_status in await sync_to_async(snapshot)(book_ids):
+                yield format_event({'book': book_id, 'copies': copies, 'status': book_status})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(event)
+        finally:
+            availability_hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class TransactionHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     This view returns the checkout history of an authenticated user.
+    ``?month=YYYY-MM`` narrows the list to one month of returns, which
+    PostgreSQL answers from that month's partition alone. History moved
+    to the cold store by ``freeze_history`` follows the database rows in
+    the list, but is no longer retrievable on its own.
     """
     serializer_class = TransactionHistorySerializer
-    queryset = ArchivedCheckOut.objects.all().order_by('-return_date')
+    queryset = ArchivedCheckOut.objects.select_related('book', 'user').order_by('-return_date')
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
+    pagination_class = TransactionHistoryPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -286,7 +645,20 @@ class TransactionHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         elif self.request.user.is_authenticated:
             return self.queryset.filter(user=self.request.user)
         return self.queryset.filter(user=self.request.user)
-    
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        filters = HistoryFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        month = filters.validated_data.get('month')
+        if month:
+            queryset = queryset.returned_in(month)
+        user_id = None if self.request.user.is_staff else self.request.user.pk
+        return get_cold_store().attach(queryset, user_id, month)
+
+    @swagger_auto_schema(query_serializer=HistoryFilterSerializer)
     def list(self, request, *args, **kwargs):
         if self.request.user.is_anonymous:
             return Response("Sorry Anonymous Users not Allowed", status=status.HTTP_401_UNAUTHORIZED)
@@ -10,10 +10,12 @@ def customexceptionhandler(exc, context):
     handlers = {
         'ValidationError': _handle_generic_error,
         'Http404': _handle_generic_error,
+        'NotFound': _handle_generic_error,
         'PermissionDenied': _handle_generic_error,
         'NotAuthenticated': _handle_authentication_error,
         'ValueError': _handle_generic_error,
         'IntegrityError': _handle_generic_error,
+        'Throttled': _handle_generic_error,
     }
 
     # Get the standard DRF response